@@ -0,0 +1,44 @@
+import argparse
+import sys
+import time
+from forest.forest import SCALAR_ENGINE, BATCHED_ENGINE
+from forest.simulation import simulate_many
+from forest.stats import PHASES
+
+
+def batch(seeds, width, height, iterations, processes, output_dir, cache_dir, engine, snapshot_dir, stats_dir):
+    start = time.perf_counter()
+    for result in simulate_many(seeds, width, height, iterations, processes, output_dir, cache_dir, engine,
+                                snapshot_dir, stats_dir):
+        print("seed %(seed)s: %(trees)d trees after %(iterations)d iterations "
+              "(setup %(setup_time).2fs, simulation %(simulation_time).2fs)" % result)
+        if "stats" in result:
+            print("    " + ", ".join("%s %.2fs" % (phase, result["stats"][phase]) for phase in PHASES))
+
+    print("%d forests in %.2fs" % (len(seeds), time.perf_counter() - start))
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate procedural forests without displaying them')
+    parser.add_argument('--seeds', '-s', type=int, nargs='+', help='The seeds of the forests to generate')
+    parser.add_argument('--seed-range', type=int, nargs=2, metavar=('FIRST', 'LAST'), help='Generate a forest for every seed from FIRST to LAST inclusive')
+    parser.add_argument('--iterations', '-n', type=int, default=1000)
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--processes', '-p', type=int, help='Number of worker processes, defaults to one per CPU')
+    parser.add_argument('--output-dir', '-o', help='Directory to write each final forest to')
+    parser.add_argument('--cache-dir', help='Directory in which generated terrain is cached between runs')
+    parser.add_argument('--engine', choices=[SCALAR_ENGINE, BATCHED_ENGINE], default=SCALAR_ENGINE)
+    parser.add_argument('--snapshot-dir', help='Directory to save each final forest to, later runs resume from these instead of starting again')
+    parser.add_argument('--stats-dir', help='Directory to write the time taken by each phase of every iteration to')
+    args = parser.parse_args()
+
+    seeds = list(args.seeds or [])
+    if args.seed_range:
+        seeds += list(range(args.seed_range[0], args.seed_range[1] + 1))
+    if not seeds:
+        parser.error("Specify --seeds or --seed-range")
+
+    sys.exit(batch(seeds, args.width, args.height, args.iterations, args.processes, args.output_dir,
+                   args.cache_dir, args.engine, args.snapshot_dir, args.stats_dir))
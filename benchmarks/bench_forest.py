@@ -0,0 +1,54 @@
+"""
+    Times Forest.iterate on forests with an increasing number of trees.
+
+    python -m benchmarks.bench_forest --trees 1000 10000 100000
+"""
+import argparse
+import random
+import time
+from forest.forest import Forest, SCALAR_ENGINE, BATCHED_ENGINE, PARALLEL_ENGINE
+from forest.terrain import TerrainGenerator
+from forest.tree import Tree
+from forest.treespecies import TreeSpecies
+
+SPECIES = [TreeSpecies("oak", 0.1, 10, 1, 0.2, 100, 5, 0.030),
+           TreeSpecies("birch", 0.3, 5, 1, 0.2, 30, 5, 0.033),
+           TreeSpecies("pine", 0.2, 6, 1, 0.1, 50, 3, 0.05)]
+
+
+def create_forest(seed, width, height, trees, cell_size=10, engine=SCALAR_ENGINE):
+    """
+        A forest with the given number of trees scattered uniformly over it.
+    """
+    terrain = TerrainGenerator(seed).generate(width, height)
+    forest = Forest(seed, terrain, width, height, cell_size=cell_size, engine=engine)
+
+    r = random.Random(seed)
+    for _ in range(trees):
+        forest.add_tree(Tree(r.choice(SPECIES), r.randint(0, width - 1), r.randint(0, height - 1)))
+
+    return forest
+
+
+def bench(forest, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        forest.iterate()
+
+    return (time.perf_counter() - start) / iterations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark Forest.iterate')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--trees', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--density', type=float, default=0.001, help='Trees per pixel')
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--cell-size', type=int, default=10, help='0 to choose automatically')
+    parser.add_argument('--engine', choices=[SCALAR_ENGINE, BATCHED_ENGINE, PARALLEL_ENGINE], default=SCALAR_ENGINE)
+    args = parser.parse_args()
+
+    for n in args.trees:
+        side = int((n / args.density) ** 0.5)
+        forest = create_forest(args.seed, side, side, n, args.cell_size or None, args.engine)
+        print("%d trees on %dx%d: %.4fs per iteration" % (n, side, side, bench(forest, args.iterations)))
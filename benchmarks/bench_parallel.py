@@ -0,0 +1,56 @@
+"""
+    Times the parallel engine on a large forest with an increasing number of worker processes,
+    reporting the speed up over a single process and checking that every run gives the same forest.
+
+    python -m benchmarks.bench_parallel --size 4000 --trees 100000 --processes 1 2 4 8
+"""
+import argparse
+import hashlib
+import time
+from benchmarks.bench_forest import create_forest
+from forest.forest import PARALLEL_ENGINE
+from forest.parallelengine import ParallelEngine
+
+
+def bench(seed, size, trees, processes, iterations):
+    """
+        Returns the mean time per iteration and a hash of the final trees. The first iteration
+        starts the worker processes so isn't timed.
+    """
+    forest = create_forest(seed, size, size, trees, engine=PARALLEL_ENGINE)
+    forest.engine = ParallelEngine(forest, processes)
+    try:
+        forest.iterate()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            forest.iterate()
+        elapsed = (time.perf_counter() - start) / iterations
+    finally:
+        forest.engine.close()
+
+    store = forest.trees
+    digest = hashlib.sha1(b"".join(getattr(store, name).tobytes() for name in ("uid", "x", "y", "size"))).hexdigest()
+
+    return elapsed, digest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the parallel engine with different numbers of processes')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--size', type=int, default=4000, help='Width and height of the forest')
+    parser.add_argument('--trees', type=int, default=100000)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    baseline = None
+    digests = set()
+    for processes in args.processes:
+        elapsed, digest = bench(args.seed, args.size, args.trees, processes, args.iterations)
+        baseline = baseline or elapsed
+        digests.add(digest)
+        print("%2d processes: %.4fs per iteration, %.2fx" % (processes, elapsed, baseline / elapsed))
+
+    if len(digests) > 1:
+        print("The forests differ between runs")
+        raise SystemExit(1)
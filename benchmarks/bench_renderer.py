@@ -0,0 +1,129 @@
+"""
+    Times the first frame drawn by the renderer, which builds the heightmap or slope map surface,
+    the time to draw a frame while panning around forests with an increasing number of trees and
+    the time to redraw a window full of trees, both as it is and after its trees have grown.
+
+    python -m benchmarks.bench_renderer --sizes 800x600 3840x2160 --trees 10000 100000 1000000
+"""
+import argparse
+import os
+import random
+import time
+from forest.forest import Forest
+from forest.terrain import Terrain
+from forest.tree import Tree
+from forest.treespecies import TreeSpecies
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+from forest.renderer import Renderer, HEIGHTMAP_MODE, SLOPE_MODE
+
+WINDOW = (800, 600)
+SPECIES = TreeSpecies("oak", 0.1, 10, 1, 0.2, 100, 5, 0.030)
+
+
+def bench_first_frame(seed, width, height, mode):
+    r = random.Random(seed)
+    terrain = Terrain([[r.random() for _ in range(width)] for _ in range(height)])
+    forest = Forest(seed, terrain, width, height)
+
+    renderer = Renderer(width, height)
+    renderer.mode = mode
+    start = time.perf_counter()
+    renderer.render(forest)
+
+    return time.perf_counter() - start
+
+
+def bench_panning(seed, trees, zoom, frames=50):
+    """
+        Mean time to draw a frame while panning across a forest with about one tree per 400 square
+        units, so the world grows with the number of trees.
+    """
+    r = random.Random(seed)
+    side = int((trees * 400) ** 0.5)
+    terrain = Terrain([[r.random() for _ in range(1000)] for _ in range(1000)])
+    forest = Forest(seed, terrain, side, side, cell_size=20)
+    for _ in range(trees):
+        forest.add_tree(Tree(SPECIES, r.uniform(0, side), r.uniform(0, side)))
+    forest.get_index()
+
+    renderer = Renderer(*WINDOW)
+    renderer.camera.zoom_at(zoom, 0, 0)
+    renderer.render(forest)
+    start = time.perf_counter()
+    for _ in range(frames):
+        renderer.camera.pan(7, 5)
+        renderer.render(forest)
+
+    return (time.perf_counter() - start) / frames
+
+
+def create_dense_forest(seed, trees):
+    r = random.Random(seed)
+    width, height = WINDOW
+    forest = Forest(seed, Terrain([[0.0] * width for _ in range(height)]), width, height)
+    for _ in range(trees):
+        tree = Tree(SPECIES, r.uniform(0, width), r.uniform(0, height))
+        tree.size = r.uniform(1, 4)
+        forest.add_tree(tree)
+
+    return forest
+
+
+def bench_dense(seed, trees, frames=20):
+    """
+        Mean time to redraw every tree of a forest which fits in the window.
+    """
+    forest = create_dense_forest(seed, trees)
+    renderer = Renderer(*WINDOW)
+    renderer.render(forest)
+    start = time.perf_counter()
+    for _ in range(frames):
+        renderer.drawn_version = None
+        renderer.render(forest)
+
+    return (time.perf_counter() - start) / frames
+
+
+def bench_dense_growing(seed, trees, frames=20):
+    """
+        Mean time to draw a frame after every tree of a forest which fits in the window has grown,
+        as happens after each iteration, so the tiles of the trees which are drawn bigger are drawn
+        again.
+    """
+    forest = create_dense_forest(seed, trees)
+    size = forest.trees.size
+    renderer = Renderer(*WINDOW)
+    renderer.render(forest)
+    total = 0
+    for _ in range(frames):
+        for slot in range(len(size)):
+            size[slot] += SPECIES.growth_rate
+        forest.trees.changed()
+        start = time.perf_counter()
+        renderer.render(forest)
+        total += time.perf_counter() - start
+
+    return total / frames
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark drawing with the renderer')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--sizes', nargs='*', default=["800x600", "3840x2160"])
+    parser.add_argument('--trees', type=int, nargs='*', default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    pygame.display.init()
+    for size in args.sizes:
+        width, height = [int(v) for v in size.split("x")]
+        for (name, mode) in (("heightmap", HEIGHTMAP_MODE), ("slopes", SLOPE_MODE)):
+            print("first frame %s %s: %.3fs" % (size, name, bench_first_frame(args.seed, width, height, mode)))
+
+    for trees in args.trees:
+        for zoom in (1, 0.05):
+            print("%d trees at zoom %s: %.2fms per frame" % (trees, zoom, 1000 * bench_panning(args.seed, trees, zoom)))
+        print("%d trees in the window: %.2fms per frame" % (trees, 1000 * bench_dense(args.seed, trees)))
+        print("%d trees in the window after growing: %.2fms per frame" % (trees, 1000 * bench_dense_growing(args.seed, trees)))
@@ -0,0 +1,31 @@
+"""
+    Times terrain generation with an increasing number of worker processes.
+
+    python -m benchmarks.bench_terrain --width 4000 --height 4000 --workers 1 2 4 8
+"""
+import argparse
+import time
+from forest.terrain import TerrainGenerator
+
+
+def bench(seed, width, height, workers):
+    generator = TerrainGenerator(seed)
+    start = time.perf_counter()
+    generator.generate(width, height, workers=workers)
+
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark parallel terrain generation')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=4000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    baseline = None
+    for n in args.workers:
+        t = bench(args.seed, args.width, args.height, n)
+        baseline = baseline or t
+        print("%d worker(s): %.3fs (%.2fx)" % (n, t, baseline / t))
@@ -0,0 +1,216 @@
+"""
+    Runs every benchmark with fixed seeds at a given scale, reporting the throughput and peak
+    memory of each. The results can be saved as a baseline and later runs compared against it,
+    failing if anything has become slower or uses more memory by more than the threshold.
+
+    python -m benchmarks.suite --scale small --save baseline.json
+    python -m benchmarks.suite --scale small --baseline baseline.json --threshold 0.2
+
+    Timings are the best of --repeat runs. Peak memory is measured with tracemalloc on a separate
+    run, since tracing slows everything down, and covers python and numpy allocations. Timings are
+    only comparable between runs on the same machine.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+from forest import terrain
+from forest.forest import SCALAR_ENGINE, BATCHED_ENGINE
+from forest.renderer import Renderer
+from forest.simulation import create_base_forest
+from forest.terrain import Terrain, TerrainGenerator, calculate_max_slopes
+
+SEED = 1
+
+# Differences smaller than these are never regressions, however big they are in proportion, as
+# very short timings and very small allocations are mostly noise.
+TIME_SLACK = 0.001
+MEMORY_SLACK = 256 * 1024
+
+# The map sizes used at each scale. The pure python max slope calculation is much slower than the
+# rest so has its own size.
+SCALES = {
+    "small": {"terrain": (200, 150), "python_terrain": (100, 75), "forest": (200, 150), "render": (400, 300)},
+    "medium": {"terrain": (800, 600), "python_terrain": (200, 150), "forest": (400, 300), "render": (800, 600)},
+    "large": {"terrain": (2000, 2000), "python_terrain": (400, 300), "forest": (800, 600), "render": (1920, 1080)},
+}
+
+
+class Case:
+    """
+        A single benchmark. setup is called before every run and isn't timed, run is passed
+        whatever it returns. work is the amount of work done by a run, in units.
+    """
+
+    def __init__(self, name, setup, run, work, unit):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.work = work
+        self.unit = unit
+
+
+def get_cases(scale):
+    sizes = SCALES[scale]
+    cases = []
+
+    width, height = sizes["terrain"]
+    cases.append(Case("terrain_generate", lambda: TerrainGenerator(SEED),
+                      lambda generator: generator.generate(width, height), width * height, "points"))
+
+    if terrain.numpy is not None:
+        points = TerrainGenerator(SEED).generate(width, height).points
+        cases.append(Case("terrain_max_slope", lambda: points, calculate_max_slopes, width * height, "points"))
+
+    python_width, python_height = sizes["python_terrain"]
+    python_points = [list(row) for row in TerrainGenerator(SEED).generate(python_width, python_height).points]
+
+    def python_max_slopes(t):
+        t._calculate_max_slopes()
+
+    def python_terrain():
+        t = Terrain.__new__(Terrain)
+        t.points = python_points
+        t.max_slope = [[0.0 for _ in row] for row in python_points]
+        return t
+
+    cases.append(Case("terrain_max_slope_python", python_terrain, python_max_slopes,
+                      python_width * python_height, "points"))
+
+    forest_width, forest_height = sizes["forest"]
+    engines = [SCALAR_ENGINE] + ([BATCHED_ENGINE] if terrain.numpy is not None else [])
+    for engine in engines:
+        for iterations in (100, 1000):
+            def forest(engine=engine):
+                return create_base_forest(SEED, forest_width, forest_height, engine=engine)
+
+            def simulate(f, iterations=iterations):
+                for _ in range(iterations):
+                    f.iterate()
+
+            cases.append(Case("simulate_%s_%d" % (engine, iterations), forest, simulate, iterations, "iterations"))
+
+    render_width, render_height = sizes["render"]
+    pygame.display.init()
+    renderer = Renderer(render_width, render_height)
+    rendered_forest = create_base_forest(SEED, render_width, render_height)
+    render_terrain = rendered_forest.terrain
+    for _ in range(100):
+        rendered_forest.iterate()
+
+    cases.append(Case("render_terrain_surface", lambda: render_terrain.normalized_points,
+                      lambda points: renderer._create_surface_from_2d_array(points, 1),
+                      render_width * render_height, "pixels"))
+
+    def full_frame():
+        renderer.cache.clear()
+        renderer.tiles.clear()
+        renderer.drawn_version = None
+
+    cases.append(Case("render_frame", full_frame, lambda _: renderer.render(rendered_forest), 1, "frames"))
+
+    return cases
+
+
+def run_case(case, repeat):
+    """
+        The peak memory run comes first so that it also warms up any caches before the timed runs.
+    """
+    state = case.setup()
+    tracemalloc.start()
+    try:
+        case.run(state)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    best = None
+    for _ in range(repeat):
+        state = case.setup()
+        start = time.perf_counter()
+        case.run(state)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return {"seconds": best, "throughput": case.work / best, "unit": case.unit, "peak_memory": peak}
+
+
+def compare(results, baseline, threshold, memory_threshold):
+    """
+        Returns a list of (name, measure, baseline value, value) for everything which is worse than
+        the baseline by more than the threshold.
+    """
+    regressions = []
+    for (name, result) in results.items():
+        if name not in baseline:
+            continue
+
+        before = baseline[name]
+        if result["seconds"] > max(before["seconds"] * (1 + threshold), before["seconds"] + TIME_SLACK):
+            regressions.append((name, "seconds", before["seconds"], result["seconds"]))
+        if result["peak_memory"] > max(before["peak_memory"] * (1 + memory_threshold), before["peak_memory"] + MEMORY_SLACK):
+            regressions.append((name, "peak_memory", baseline[name]["peak_memory"], result["peak_memory"]))
+
+    return regressions
+
+
+def suite(scale, repeat, only=None, save=None, baseline=None, threshold=0.2, memory_threshold=0.2):
+    previous = None
+    if baseline is not None:
+        with open(baseline) as f:
+            previous = json.load(f)
+        if previous["scale"] != scale:
+            print("Baseline is for scale %s, not %s" % (previous["scale"], scale))
+            return 2
+
+    results = {}
+    for case in get_cases(scale):
+        if only and not any(name in case.name for name in only):
+            continue
+
+        result = results[case.name] = run_case(case, repeat)
+        line = "%-28s %10.4fs %14.1f %s/s %10.1f MiB peak" % (
+            case.name, result["seconds"], result["throughput"], result["unit"], result["peak_memory"] / 2 ** 20)
+        if previous is not None and case.name in previous["results"]:
+            line += " %+7.1f%%" % (100 * (result["seconds"] / previous["results"][case.name]["seconds"] - 1))
+        print(line)
+
+    if save is not None:
+        with open(save, "w") as f:
+            json.dump({
+                "scale": scale,
+                "python": sys.version.split()[0],
+                "numpy": terrain.numpy is not None,
+                "platform": platform.platform(),
+                "results": results,
+            }, f, indent=2)
+
+    if previous is None:
+        return 0
+
+    regressions = compare(results, previous["results"], threshold, memory_threshold)
+    for (name, measure, before, after) in regressions:
+        print("REGRESSION %s %s: %.4g -> %.4g" % (name, measure, before, after))
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run the benchmark suite')
+    parser.add_argument('--scale', choices=sorted(SCALES), default="small")
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs of each benchmark, the best is kept')
+    parser.add_argument('--only', nargs='+', help='Only run the benchmarks whose names contain one of these')
+    parser.add_argument('--save', help='Write the results to this file, e.g. to use as a baseline')
+    parser.add_argument('--baseline', help='Compare against results saved with --save')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Fraction slower than the baseline which counts as a regression')
+    parser.add_argument('--memory-threshold', type=float, default=0.2, help='Fraction more peak memory than the baseline which counts as a regression')
+    args = parser.parse_args()
+
+    sys.exit(suite(args.scale, args.repeat, args.only, args.save, args.baseline, args.threshold, args.memory_threshold))
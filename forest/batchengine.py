@@ -0,0 +1,352 @@
+import heapq
+import math
+from forest.tree import Tree
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class BatchEngine:
+    """
+        An alternative to the tree by tree loop in Forest.iterate which grows every tree in a single
+        array operation and finds the trees which overlap in bulk from the tree positions, so that
+        python code only runs for the trees which are actually involved in a collision.
+
+        An iteration follows a slightly different, but still deterministic, rule to the scalar
+        engine:
+
+        1. Every tree grows.
+        2. Each tree in turn (in slot order) is checked against every other tree close enough to
+           reach it, nearest first, using the sizes at that moment. The larger tree absorbs the
+           smaller and the tree being checked is absorbed on a tie, exactly as in the scalar engine.
+        3. Absorbed trees are removed and every surviving mature tree spreads its seeds, see
+           _spread_seeds.
+
+        Whereas the scalar engine grows each tree just before checking it and spreads seeds
+        before the trees after it have grown or been absorbed.
+    """
+
+    def __init__(self, forest):
+        if numpy is None:
+            raise ImportError("The batched engine requires numpy")
+
+        self.forest = forest
+        r = forest.create_random("batched seeds")
+        self.seed_key = numpy.array([r.getrandbits(64), r.getrandbits(64)], dtype=numpy.uint64)
+
+    def iterate(self):
+        forest = self.forest
+        store = forest.trees
+
+        species_index = numpy.frombuffer(store.species_index, dtype=numpy.int16)
+        live = numpy.flatnonzero(species_index >= 0)
+        max_size = numpy.array([species.max_size for species in store.species], dtype=numpy.float64)
+
+        stats = forest.stats
+
+        self._grow(live, species_index[live])
+        if stats is not None:
+            stats.lap("grow")
+
+        removed = self._resolve_collisions(self._find_overlaps(live))
+        if stats is not None:
+            stats.lap("collisions")
+
+        mature = live[numpy.frombuffer(store.size)[live] == max_size[species_index[live]]]
+        mature = mature[~numpy.isin(mature, list(removed))]
+        del species_index  # The store's arrays can't grow while there is a view onto them
+
+        for slot in sorted(removed):
+            forest.remove_tree(store.get_tree(slot))
+        if stats is not None:
+            stats.count("trees_removed", len(removed))
+            stats.lap("bookkeeping")
+
+        seeds = self._spread_seeds(mature)
+        if stats is not None:
+            stats.lap("seeds")
+
+        for (species, x, y) in seeds:
+            forest.add_tree(Tree(species, x, y))
+        if stats is not None:
+            stats.count("trees_added", len(seeds))
+            stats.lap("bookkeeping")
+
+    def seed_generator(self, tick):
+        """
+            The random number generator used for spreading seeds on a given tick. Philox is a
+            counter based generator so each tick has its own independent stream which depends only
+            on the forest's seed and the tick.
+        """
+        return numpy.random.Generator(numpy.random.Philox(key=self.seed_key, counter=tick))
+
+    def _grow(self, live, species_index):
+        """
+            Grow every tree at once, computing min(size + growth_rate, max_size) exactly as
+            Tree.grow does.
+        """
+        species = self.forest.trees.species
+        growth_rate = numpy.array([s.growth_rate for s in species], dtype=numpy.float64)
+        max_size = numpy.array([s.max_size for s in species], dtype=numpy.float64)
+
+        size = numpy.frombuffer(self.forest.trees.size)
+        size[live] = numpy.minimum(size[live] + growth_rate[species_index], max_size[species_index])
+
+    def _grid(self, x, y):
+        return create_grid(x, y, self.forest.cell_size, self.forest.width, self.forest.height)
+
+    def _nearby(self, grid, x, y, reach):
+        return find_nearby(grid, x, y, reach, self.forest.cell_size)
+
+    def _find_overlaps(self, live):
+        """
+            Find every pair of trees which overlap at their current sizes by comparing each tree
+            with the trees in the grid cells around it.
+
+            Returns a dict from the slot of each tree which overlaps any other to the slots of the
+            trees it overlaps, nearest first with ties broken by slot.
+        """
+        store = self.forest.trees
+        x, y, size = numpy.frombuffer(store.x)[live], numpy.frombuffer(store.y)[live], numpy.frombuffer(store.size)[live]
+
+        # Two trees can't overlap if they're further apart than twice the size of the largest tree
+        a, b = self._nearby(self._grid(x, y), x, y, 2 * self.forest.max_tree_size)
+
+        dx, dy = x[a] - x[b], y[a] - y[b]
+        d2 = dx * dx + dy * dy
+        overlap = (a != b) & (numpy.sqrt(d2) <= size[a] + size[b])
+        if self.forest.stats is not None:
+            self.forest.stats.count("neighbour_candidates", len(a))
+            self.forest.stats.count("overlap_tests", int(numpy.count_nonzero(a != b)))
+        first, second, d2 = live[a[overlap]], live[b[overlap]], d2[overlap]
+
+        order = numpy.lexsort((second, d2, first))
+        first, second = first[order], second[order]
+        slots, index = numpy.unique(first, return_index=True)
+
+        return dict(zip(slots.tolist(), [s.tolist() for s in numpy.split(second, index[1:])]))
+
+    def _spread_seeds(self, mature):
+        """
+            Every mature tree attempts to spread species.seed_rate seeds, all drawn at once from
+            the generator for the current tick. Each seed survives with the species'
+            seed_survivability and lands a uniform distance between the tree's size and
+            seed_spread_distance away in a uniform direction.
+
+            A seed is planted if it lands inside the forest, on a slope the species can grow on and
+            not too close to an existing tree (see Forest._is_point_too_close_to_tree) or to an
+            earlier seed from this tick, ordered by parent slot and then seed number.
+
+            Returns a list of (species, x, y) for the seeds which are planted.
+        """
+        forest = self.forest
+        store = forest.trees
+        species = store.species
+        if len(mature) == 0:
+            return []
+
+        species_index = numpy.frombuffer(store.species_index, dtype=numpy.int16)[mature]
+        size = numpy.frombuffer(store.size)[mature]
+        seed_rate = numpy.array([s.seed_rate for s in species])[species_index]
+        survivability = numpy.array([s.seed_survivability for s in species])[species_index]
+        spread = numpy.array([s.seed_spread_distance for s in species], dtype=numpy.float64)[species_index]
+        initial_size = numpy.array([s.initial_size for s in species], dtype=numpy.float64)
+
+        draws = self.seed_generator(forest.tick).random((len(mature), int(seed_rate.max()), 3))
+        survived = ((numpy.arange(draws.shape[1]) < seed_rate[:, numpy.newaxis]) &
+                    (draws[:, :, 0] < survivability[:, numpy.newaxis]))
+        parent, _ = numpy.nonzero(survived)
+        d = size[parent] + (spread[parent] - size[parent]) * draws[:, :, 1][survived]
+        direction = 2 * math.pi * draws[:, :, 2][survived]
+
+        x = numpy.frombuffer(store.x)[mature][parent].astype(numpy.int64) + numpy.rint(d * numpy.cos(direction)).astype(numpy.int64)
+        y = numpy.frombuffer(store.y)[mature][parent].astype(numpy.int64) + numpy.rint(d * numpy.sin(direction)).astype(numpy.int64)
+        seed_species = species_index[parent]
+
+        inside = (x >= 0) & (x < forest.width) & (y >= 0) & (y < forest.height)
+        x, y, seed_species = x[inside], y[inside], seed_species[inside]
+
+        shallow = self._plantable(x, y, seed_species)
+        x, y, seed_species = x[shallow], y[shallow], seed_species[shallow]
+        if forest.stats is not None:
+            forest.stats.count("seeds_attempted", len(inside))
+            forest.stats.count("seeds_outside", len(inside) - len(shallow))
+            forest.stats.count("seeds_too_steep", len(shallow) - len(x))
+
+        # Spacing against the existing trees
+        padding = self._padding(x, y)
+        radius = forest.max_tree_size + initial_size[seed_species] + padding
+        live = numpy.flatnonzero(numpy.frombuffer(store.species_index, dtype=numpy.int16) >= 0)
+        tx, ty = numpy.frombuffer(store.x)[live], numpy.frombuffer(store.y)[live]
+        a, b = self._nearby(self._grid(tx, ty), x, y, radius.max(initial=0))
+        total = numpy.frombuffer(store.size)[live][b] + initial_size[seed_species[a]] + padding[a]
+        too_close = numpy.zeros(len(x), dtype=bool)
+        too_close[a[self._too_close(x[a] - tx[b], y[a] - ty[b], radius[a], total)]] = True
+        x, y, seed_species = x[~too_close], y[~too_close], seed_species[~too_close]
+        radius, padding = radius[~too_close], padding[~too_close]
+
+        # Spacing against the other seeds, where the earliest seed wins
+        a, b = self._nearby(self._grid(x, y), x, y, radius.max(initial=0))
+        total = initial_size[seed_species[b]] + initial_size[seed_species[a]] + padding[a]
+        conflict = (b < a) & self._too_close(x[a] - x[b], y[a] - y[b], radius[a], total)
+        earlier = {}
+        for (later, seed) in zip(a[conflict].tolist(), b[conflict].tolist()):
+            earlier.setdefault(later, []).append(seed)
+
+        planted = numpy.ones(len(x), dtype=bool)
+        for seed in sorted(earlier):
+            planted[seed] = not any(planted[e] for e in earlier[seed])
+        if forest.stats is not None:
+            forest.stats.count("seeds_too_close", int(numpy.count_nonzero(too_close)) + int(numpy.count_nonzero(~planted)))
+
+        return [(species[s], x_, y_) for (s, x_, y_) in
+                zip(seed_species[planted].tolist(), x[planted].tolist(), y[planted].tolist())]
+
+    @staticmethod
+    def _too_close(dx, dy, radius, total):
+        return (dx * dx + dy * dy <= radius * radius) & ((numpy.abs(dx) < total) | (numpy.abs(dy) < total))
+
+    def _plantable(self, x, y, seed_species):
+        """
+            Whether each seed landed on a pixel its species can grow on, looked up in the forest's
+            plantability maps one species at a time.
+        """
+        species = self.forest.trees.species
+        plantable = numpy.zeros(len(x), dtype=bool)
+        for s in numpy.unique(seed_species).tolist():
+            seeds = seed_species == s
+            plantability = self.forest.get_plantability(species[s])
+            if plantability is not None:
+                plantable[seeds] = plantability.are_plantable(x[seeds], y[seeds])
+            else:
+                plantable[seeds] = self._slopes(x[seeds], y[seeds]) <= species[s].slope_threshhold
+
+        return plantable
+
+    def _padding(self, x, y):
+        padding = self.forest.get_padding()
+        if padding is not None:
+            return numpy.frombuffer(padding, dtype=padding.typecode)[y * self.forest.width + x].astype(numpy.int64)
+
+        return (10 * self._slopes(x, y) / 0.05).astype(numpy.int64)
+
+    def _slopes(self, x, y):
+        max_slope = self.forest.terrain.max_slope
+        if isinstance(max_slope, numpy.ndarray):
+            return max_slope[y, x]
+
+        return numpy.array([max_slope[y_][x_] for (x_, y_) in zip(x.tolist(), y.tolist())], dtype=numpy.float64)
+
+    def _resolve_collisions(self, overlaps):
+        """
+            Visit each tree in slot order, absorbing overlapping trees as described in the class
+            docstring. Returns the set of slots of the trees which were absorbed.
+
+            A tree's overlaps from _find_overlaps are only valid while neither it nor anything near
+            it has grown by absorbing another tree. Once that happens the trees nearby are marked
+            dirty and are checked against all trees within reach instead.
+        """
+        forest = self.forest
+        store = forest.trees
+        x, y, size, species_index = store.x, store.y, store.size, store.species_index
+        species = store.species
+        index = forest.get_index()
+
+        removed = set()
+        dirty = set()
+        visited = set()
+        pending = list(overlaps)
+        heapq.heapify(pending)
+
+        def overlapping(a, b):
+            return math.sqrt(math.pow(x[b] - x[a], 2) + math.pow(y[b] - y[a], 2)) <= size[a] + size[b]
+
+        def candidates(a):
+            return index.query(x[a], y[a], species[species_index[a]].max_size + forest.max_tree_size)
+
+        def grown(a, current):
+            for b in index.query(x[a], y[a], 2 * forest.max_tree_size):
+                if b > current and b not in removed:
+                    dirty.add(b)
+                    heapq.heappush(pending, b)
+
+        while pending:
+            tree = heapq.heappop(pending)
+            if tree in visited or tree in removed:
+                continue
+            visited.add(tree)
+
+            full = tree in dirty
+            others = candidates(tree) if full else overlaps[tree]
+            position = 0
+            while position < len(others):
+                other = others[position]
+                position += 1
+                if other in removed or other == tree or not overlapping(tree, other):
+                    continue
+
+                if size[other] < size[tree]:
+                    size[tree] = min(size[tree] + size[other], species[species_index[tree]].max_size)
+                    removed.add(other)
+                    grown(tree, tree)
+
+                    if not full:
+                        # Now that this tree is bigger, carry on through every tree within reach
+                        # of it which comes after the one just absorbed.
+                        others = candidates(tree)
+                        position = others.index(other) + 1
+                        full = True
+                else:
+                    size[other] = min(size[other] + size[tree], species[species_index[other]].max_size)
+                    removed.add(tree)
+                    grown(other, tree)
+                    break
+
+        return removed
+
+
+def create_grid(x, y, cell_size, width, height):
+    """
+        Sort a set of points into a grid of cells of cell_size over an area of width x height so
+        that find_nearby can find the ones close to other points.
+    """
+    rows, cols = int(math.ceil(height / cell_size)), int(math.ceil(width / cell_size))
+    cell = (y / cell_size).astype(numpy.int64) * cols + (x / cell_size).astype(numpy.int64)
+
+    counts = numpy.bincount(cell, minlength=rows * cols)
+
+    return numpy.argsort(cell, kind="stable"), counts, numpy.cumsum(counts) - counts, rows, cols
+
+
+def find_nearby(grid, x, y, reach, cell_size):
+    """
+        Find all pairs (i, j) where point j of the grid is in a cell within reach of the cell
+        containing (x[i], y[i]). This includes every point within reach along with some which
+        are further away.
+    """
+    order, counts, starts, rows, cols = grid
+    row, col = (y / cell_size).astype(numpy.int64), (x / cell_size).astype(numpy.int64)
+    index = numpy.arange(len(x))
+
+    first, second = [], []
+    reach = int(math.ceil(reach / cell_size))
+    for i in range(-reach, reach + 1):
+        for j in range(-reach, reach + 1):
+            r, c = row + j, col + i
+            valid = (r >= 0) & (r < rows) & (c >= 0) & (c < cols)
+            neighbour_cell = (r * cols + c)[valid]
+            n = counts[neighbour_cell]
+            total = int(n.sum())
+            if total == 0:
+                continue
+
+            offsets = numpy.arange(total) - numpy.repeat(numpy.cumsum(n) - n, n)
+            first.append(numpy.repeat(index[valid], n))
+            second.append(order[numpy.repeat(starts[neighbour_cell], n) + offsets])
+
+    if not first:
+        return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64)
+
+    return numpy.concatenate(first), numpy.concatenate(second)
@@ -0,0 +1,63 @@
+import math
+
+MIN_ZOOM = 1 / 64
+MAX_ZOOM = 16
+
+
+class Camera:
+    """
+        The part of the world which is shown in a window of width x height pixels. (x, y) is the
+        point in the world at the top left of the window and zoom is the number of pixels per unit
+        of the world, so at a zoom of 1 with the camera at (0, 0) the world is drawn as it is.
+    """
+
+    def __init__(self, width, height, x=0, y=0, zoom=1):
+        self.width = width
+        self.height = height
+        self.x = x
+        self.y = y
+        self.zoom = zoom
+
+    @property
+    def view(self):
+        """
+            Everything which affects what is drawn, two cameras with the same view draw the same.
+        """
+        return self.x, self.y, self.zoom, self.width, self.height
+
+    def get_world_rect(self):
+        """
+            The (left, top, right, bottom) of the visible part of the world.
+        """
+        return self.x, self.y, self.x + self.width / self.zoom, self.y + self.height / self.zoom
+
+    def to_screen(self, x, y):
+        return (x - self.x) * self.zoom, (y - self.y) * self.zoom
+
+    def to_world(self, x, y):
+        return self.x + x / self.zoom, self.y + y / self.zoom
+
+    def pan(self, dx, dy):
+        """
+            Move the camera by a number of pixels.
+        """
+        self.x += dx / self.zoom
+        self.y += dy / self.zoom
+
+    def zoom_at(self, factor, x, y):
+        """
+            Zoom in (factor > 1) or out around a point on the screen, which stays where it is.
+        """
+        world_x, world_y = self.to_world(x, y)
+        self.zoom = min(MAX_ZOOM, max(MIN_ZOOM, self.zoom * factor))
+        self.x, self.y = world_x - x / self.zoom, world_y - y / self.zoom
+
+    def get_mip_level(self, levels):
+        """
+            The level of a mip pyramid with the given number of levels, each half the size of the
+            one before, which has at least one pixel for each pixel on the screen.
+        """
+        if self.zoom >= 1:
+            return 0
+
+        return min(levels - 1, int(math.floor(math.log2(1 / self.zoom))))
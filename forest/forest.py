@@ -1,35 +1,138 @@
 import math
 import random
+from forest.batchengine import BatchEngine
+from forest.parallelengine import ParallelEngine
+from forest.plantability import PlantabilityMap, calculate_padding
+from forest.scheduler import EventScheduler
+from forest.spatialindex import SpatialIndex
+from forest.tiledterrain import TiledTerrain
 from forest.tree import Tree
+from forest.treestore import TreeStore
+
+SCALAR_ENGINE = "scalar"
+BATCHED_ENGINE = "batched"
+PARALLEL_ENGINE = "parallel"
 
 
 class Forest:
 
-    def __init__(self, random_seed, terrain, width, height):
+    def __init__(self, random_seed, terrain, width, height, cell_size=10, engine=SCALAR_ENGINE, processes=None):
+        """
+            The trees are partitioned into a grid of cells of cell_size x cell_size. If cell_size
+            is None then it is chosen automatically based on the largest species in the forest.
+
+            The engine decides how iterate works, either tree by tree (SCALAR_ENGINE) or with the
+            numpy based BatchEngine (BATCHED_ENGINE), or split between processes by the
+            ParallelEngine (PARALLEL_ENGINE) using the given number of processes, one per CPU by
+            default.
+        """
         self.terrain = terrain
-        self.trees = []
+        self.trees = TreeStore()
         self.width = width
         self.height = height
-        random.seed(random_seed)
-        self.cell_size = 10
-        self.cells = [[] for _ in range(int(math.ceil(self.height / self.cell_size)))]
-        for row in range(len(self.cells)):
-            self.cells[row] = [[] for _ in range(int(math.ceil(self.width / self.cell_size)))]
+        self.random_seed = random_seed
+        self.seed_random = self.create_random("seeds")
+        self.tick = 0
+        self.auto_cell_size = cell_size is None
+        self.cell_size = cell_size or 10
+        self.max_tree_size = 0
+        self.index = None
+        self.plantability = {}
+        self.padding = None
+        if engine == BATCHED_ENGINE:
+            self.engine = BatchEngine(self)
+        elif engine == PARALLEL_ENGINE:
+            self.engine = ParallelEngine(self, processes)
+        else:
+            self.engine = None
+        self.engine_name = engine if self.engine is not None else SCALAR_ENGINE
+        self.scheduler = EventScheduler(self)
+        self.recorder = None
+        self.stats = None
+
+    def create_random(self, stream):
+        """
+            Every part of the forest which needs random numbers has its own named stream, derived
+            from the forest's seed, so that forests never share or disturb one another's random
+            numbers (or those of the global random module) and adding a new use of random numbers
+            doesn't change the existing streams.
+        """
+        if self.random_seed is None:
+            return random.Random()
+
+        return random.Random("%s/%s" % (self.random_seed, stream))
+
+    @property
+    def cells(self):
+        """
+            The trees in each cell as a list of rows of cells. This is built on demand so should
+            only be used for debugging, use the spatial index for anything else.
+        """
+        index = self.get_index()
+
+        return [[[self.trees.get_tree(slot) for slot in index.get_cell(row, col)] for col in range(index.cols)]
+                for row in range(index.rows)]
+
+    def get_index(self):
+        """
+            The spatial index of the trees, which is rebuilt the first time it is needed after the
+            trees have changed.
+        """
+        if self.index is None:
+            self.index = SpatialIndex(self.width, self.height, self.cell_size, self.trees)
+
+        return self.index
+
+    def get_plantability(self, species):
+        """
+            The PlantabilityMap of the pixels a species can grow on, built the first time a tree of
+            the species is added and shared by every species with the same slope threshold.
+
+            Returns None for a TiledTerrain since building a map would generate the whole terrain,
+            the terrain's slopes are read directly instead.
+        """
+        if isinstance(self.terrain, TiledTerrain):
+            return None
+
+        try:
+            return self.plantability[species.slope_threshhold]
+        except KeyError:
+            plantability = PlantabilityMap(self.terrain.max_slope, self.width, self.height, species.slope_threshhold)
+            self.plantability[species.slope_threshhold] = plantability
+
+            return plantability
+
+    def get_padding(self):
+        """
+            The extra space a seed needs around it on each pixel as a flat array in row order (see
+            calculate_padding), or None for a TiledTerrain.
+        """
+        if self.padding is None and not isinstance(self.terrain, TiledTerrain):
+            self.padding = calculate_padding(self.terrain.max_slope, self.width, self.height)
+
+        return self.padding
 
     def add_tree(self, tree):
         """
             Used to add trees so that they are maintained correctly in the space partitioned cells.
         """
-        self.trees.append(tree)
-        self.get_cell(tree).append(tree)
+        self.trees.attach(tree)
+        self.max_tree_size = max(self.max_tree_size, tree.species.max_size)
+        self.index = None
+        if self.terrain is not None and tree.species.slope_threshhold not in self.plantability:
+            self.get_plantability(tree.species)
+
+        if self.auto_cell_size:
+            # Cells as big as the largest collision distance so collisions span at most 3x3 cells
+            self.cell_size = int(math.ceil(2 * self.max_tree_size))
 
     def remove_tree(self, tree):
         """
             Used to remove trees so that they are maintained correctly in the space partitioned
             cells.
         """
-        self.trees.remove(tree)
-        self.get_cell(tree).remove(tree)
+        self.trees.detach(tree)
+        self.index = None
 
     def get_cell(self, tree):
         """
@@ -47,10 +150,9 @@ class Forest:
         """
             Get the cell that a single point lives in.
         """
-        col = int(x / self.cell_size)
-        row = int(y / self.cell_size)
+        index = self.get_index()
 
-        return self.cells[row][col]
+        return [self.trees.get_tree(slot) for slot in index.get_cell(int(y / index.cell_size), int(x / index.cell_size))]
 
     def get_all_nboring_cells_by_point(self, x, y):
         """
@@ -59,26 +161,32 @@ class Forest:
             This allows us to check if any of the 9 cells contain a tree which will overlap this
             point.
         """
-        col = int(x / self.cell_size)
-        row = int(y / self.cell_size)
+        index = self.get_index()
+        col = int(x / index.cell_size)
+        row = int(y / index.cell_size)
 
         cells = []
         for i in range(-1, 2):
             for j in range(-1, 2):
-                if len(self.cells) > row + i >= 0 and len(self.cells[0]) > col + j >= 0:
-                    cells.append(self.cells[row + i][col + j])
+                if index.rows > row + i >= 0 and index.cols > col + j >= 0:
+                    cells.append([self.trees.get_tree(slot) for slot in index.get_cell(row + i, col + j)])
 
         return cells
 
+    def get_trees_near_point(self, x, y, radius):
+        """
+            Get all trees which begin within radius of a point, nearest first.
+        """
+        return [self.trees.get_tree(slot) for slot in self.get_index().query(x, y, radius)]
+
     def _is_point_in_tree(self, x, y):
         """
-            Check if a given point is contained within a tree. Only need to check current cell plus
-            neighboring.
+            Check if a given point is contained within a tree. Only need to check the trees which
+            begin within the largest tree size of the point.
         """
-        for cell in self.get_all_nboring_cells_by_point(x, y):
-            for tree in cell:
-                if tree.contains_point(x, y):
-                    return True
+        for tree in self.get_trees_near_point(x, y, self.max_tree_size):
+            if tree.contains_point(x, y):
+                return True
 
         return False
 
@@ -89,10 +197,13 @@ class Forest:
             This is based on the slope of the terrain at that point (hence the magic numbers) in
             this function.
         """
-        s = self.terrain.max_slope[y][x]
-        d = int(10 * s / 0.05)
+        padding = self.get_padding()
+        if padding is not None:
+            d = padding[y * self.width + x]
+        else:
+            d = int(10 * self.terrain.max_slope[y][x] / 0.05)
 
-        for tree in [t for cell in self.get_all_nboring_cells_by_point(x, y) for t in cell]:
+        for tree in self.get_trees_near_point(x, y, self.max_tree_size + species.initial_size + d):
             total_distance = tree.size + species.initial_size + d
             if abs(tree.x - x) < total_distance or abs(tree.y - y) < total_distance:
                 return True
@@ -107,18 +218,24 @@ class Forest:
             This function performs that and is therefore responsible for attempting to grow new
             trees.
         """
-        to_be_added = set()
+        to_be_added = []
 
         for i in range(tree.species.seed_rate):
-            if random.random() < tree.species.seed_survivability:
-                d = random.uniform(tree.size, tree.species.seed_spread_distance)
-                direction = random.uniform(0, 2 * math.pi)
+            if self.seed_random.random() < tree.species.seed_survivability:
+                d = self.seed_random.uniform(tree.size, tree.species.seed_spread_distance)
+                direction = self.seed_random.uniform(0, 2 * math.pi)
 
-                x = tree.x + round(d * math.cos(direction))
-                y = tree.y + round(d * math.sin(direction))
+                x = int(tree.x) + round(d * math.cos(direction))
+                y = int(tree.y) + round(d * math.sin(direction))
 
-                if self._can_plant_seed(x, y, tree.species):
-                    to_be_added.add(Tree(tree.species, x, y))
+                rejection = self._get_seed_rejection(x, y, tree.species)
+                if rejection is None:
+                    to_be_added.append(Tree(tree.species, x, y))
+
+                if self.stats is not None:
+                    self.stats.count("seeds_attempted")
+                    if rejection is not None:
+                        self.stats.count(rejection)
 
         return to_be_added
 
@@ -126,48 +243,140 @@ class Forest:
         """
             Returns true if this location is a valid seed point and false otherwise.
         """
+        return self._get_seed_rejection(x, y, species) is None
+
+    def _get_seed_rejection(self, x, y, species):
+        """
+            Returns None if this location is a valid seed point, otherwise the name of the stats
+            counter for the reason it isn't.
+        """
         if x < 0 or x >= self.width or y < 0 or y >= self.height:  # Outside of the forest
-            return False
+            return "seeds_outside"
 
-        if self.terrain.max_slope[y][x] > species.slope_threshhold:  # Slope too steep for this tree type
-            return False
+        plantability = self.get_plantability(species)
+        if plantability is not None:
+            if not plantability.is_plantable(x, y):  # Slope too steep for this tree type
+                return "seeds_too_steep"
+        elif self.terrain.max_slope[y][x] > species.slope_threshhold:
+            return "seeds_too_steep"
 
         if self._is_point_too_close_to_tree(x, y, species):  # Don't seed a tree too close to another tree
-            return False
+            return "seeds_too_close"
+
+        return None
 
-        return True
+    def snapshot(self):
+        """
+            An immutable copy of the forest's current state, e.g. for rendering while the forest
+            continues to be simulated on another thread.
+        """
+        return ForestSnapshot(self.terrain, self.width, self.height, self.tick, self.trees.copy(), self.cell_size)
 
     def iterate(self):
         """
-            Perform a single iteration of the forest generation routine.
+            Perform a single iteration of the forest generation routine, passing the result to the
+            recorder if there is one and timing it if stats are being collected.
+        """
+        self.tick += 1
+        if self.stats is not None:
+            self.stats.start(self.tick)
+
+        if self.engine is not None:
+            self.engine.iterate()
+        else:
+            self._iterate()
+        self.trees.changed()
+
+        if self.stats is not None:
+            self.stats.finish()
+
+        if self.recorder is not None:
+            self.recorder.record(self)
+
+    def advance(self, n):
+        """
+            Perform n iterations, leaving the forest exactly as calling iterate n times would but
+            jumping straight over the ticks on which the trees only grow (see EventScheduler).
+
+            Every tick is iterated while there is a recorder or stats are being collected, since
+            they need to see each one.
+        """
+        if self.recorder is not None or self.stats is not None:
+            for _ in range(n):
+                self.iterate()
+        else:
+            self.scheduler.advance(n)
 
+    def _iterate(self):
+        """
             This acts on each tree in turn; growing, handling collisions post growth and then
             spreading the trees seeds.
         """
+        stats = self.stats
         to_be_removed = set()
-        to_be_added = set()
+        to_be_added = []
 
         for tree in self.trees:
             if tree not in to_be_removed:
                 tree.grow()
-
-                # Complex - only care about the adjacent cells for collision purposes so flatten trees
-                # from those into a list to iterate over.
-                for collide_tree in [t for cell in self.get_all_nboring_cells_by_tree(tree) for t in cell]:
-                    if collide_tree not in to_be_removed and collide_tree != tree and collide_tree.overlapping(tree):
-                        if collide_tree.smaller_than(tree):
-                            tree.absorb(collide_tree)
-                            to_be_removed.add(collide_tree)
-                        else:
-                            collide_tree.absorb(tree)
-                            to_be_removed.add(tree)
-                            break
+                if stats is not None:
+                    stats.lap("grow")
+
+                # Only trees which begin close enough that they could overlap this one once it has
+                # reached full size can collide with it.
+                candidates = self.get_trees_near_point(tree.x, tree.y, tree.species.max_size + self.max_tree_size)
+                tests = 0
+                for collide_tree in candidates:
+                    if collide_tree not in to_be_removed and collide_tree != tree:
+                        tests += 1
+                        if collide_tree.overlapping(tree):
+                            if collide_tree.smaller_than(tree):
+                                tree.absorb(collide_tree)
+                                to_be_removed.add(collide_tree)
+                            else:
+                                collide_tree.absorb(tree)
+                                to_be_removed.add(tree)
+                                break
+
+                if stats is not None:
+                    stats.count("neighbour_candidates", len(candidates))
+                    stats.count("overlap_tests", tests)
+                    stats.lap("collisions")
 
                 if tree.is_mature() and tree not in to_be_removed:
-                    to_be_added |= self.spread_tree_seed(tree)
+                    to_be_added += self.spread_tree_seed(tree)
+                    if stats is not None:
+                        stats.lap("seeds")
 
         for tree in to_be_removed:
             self.remove_tree(tree)
 
         for tree in to_be_added:
             self.add_tree(tree)
+
+        if stats is not None:
+            stats.count("trees_removed", len(to_be_removed))
+            stats.count("trees_added", len(to_be_added))
+            stats.lap("bookkeeping")
+
+
+class ForestSnapshot:
+    """
+        The state of a forest at a single tick. Has the same terrain, width, height, tick and trees
+        attributes and get_index method as Forest so can be rendered in the same way.
+    """
+
+    def __init__(self, terrain, width, height, tick, trees, cell_size=10):
+        self.terrain = terrain
+        self.width = width
+        self.height = height
+        self.tick = tick
+        self.trees = trees
+        self.cell_size = cell_size
+        self.index = None
+
+    def get_index(self):
+        if self.index is None:
+            self.index = SpatialIndex(self.width, self.height, self.cell_size, self.trees)
+
+        return self.index
@@ -0,0 +1,194 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from forest import terrain
+from forest.forest import Forest
+from forest.terrain import TerrainGenerator
+from forest.terraincache import TerrainCache
+from forest.tiledterrain import TiledTerrain
+from forest.treespecies import TreeSpecies
+from forest.treestore import TreeStore
+
+# File layout: a fixed size header, a json description of the forest and then the tree store's
+# arrays, each stored as little endian values and starting on an 8 byte boundary.
+MAGIC = b"PFFS"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHIqqI")
+ARRAYS = (("x", "d"), ("y", "d"), ("size", "d"), ("species_index", "h"), ("uid", "q"), ("free", "q"))
+SPECIES_FIELDS = ("name", "growth_rate", "max_size", "initial_size", "seed_survivability",
+                  "seed_spread_distance", "seed_rate", "slope_threshhold")
+
+
+def save(forest, path):
+    """
+        Write everything needed to continue a forest exactly where it left off to a file. The
+        trees are written straight from the store's arrays so the file is never held in memory.
+
+        The terrain isn't stored, only the seed and size it was generated with (and the tile size
+        of a TiledTerrain). A terrain which wasn't generated from a seed is left out, so it has to
+        be passed to load. The file is written to a temporary location first and then moved into
+        place.
+    """
+    store = forest.trees
+    description = json.dumps({
+        "seed": forest.random_seed,
+        "width": forest.width,
+        "height": forest.height,
+        "tick": forest.tick,
+        "cell_size": forest.cell_size,
+        "auto_cell_size": forest.auto_cell_size,
+        "max_tree_size": forest.max_tree_size,
+        "engine": forest.engine_name,
+        "seed_random": forest.seed_random.getstate(),
+        "seed_key": None if forest.engine is None else [int(k) for k in forest.engine.seed_key],
+        "next_uid": store.next_uid,
+        "species": [[getattr(species, field) for field in SPECIES_FIELDS] for species in store.species],
+        "terrain": _get_terrain_reference(forest.terrain),
+    }).encode("utf-8")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.seek(HEADER.size)
+            f.write(description)
+            crc = 0
+            for (name, typecode) in ARRAYS:
+                f.write(bytes(-f.tell() % 8))
+                data = memoryview(_to_file_order(getattr(store, name), typecode)).cast("B")
+                crc = zlib.crc32(data, crc)
+                f.write(data)
+
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(description), len(store.species_index), len(store.free), crc))
+
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def load(path, t=None, cache_dir=None, verify=True, processes=None):
+    """
+        Load a forest written by save. It is given the terrain t if there is one, otherwise the
+        terrain is generated again (or loaded from the terrain cache in cache_dir) from the seed
+        stored in the file. A ValueError is raised if there is no seed to generate it from. processes is passed on to the parallel engine if the forest used it.
+
+        The file is memory mapped and the trees are copied straight from it into the store.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if len(data) < HEADER.size:
+            raise ValueError("%s is not a forest file" % path)
+        magic, version, description_size, slots, free, crc = HEADER.unpack_from(data)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("%s is not a forest file or was written by a different version" % path)
+
+        description = json.loads(bytes(data[HEADER.size:HEADER.size + description_size]).decode("utf-8"))
+        store = TreeStore()
+        offset = HEADER.size + description_size
+        actual_crc = 0
+        with memoryview(data) as view:
+            for (name, typecode) in ARRAYS:
+                offset += -offset % 8
+                count = free if name == "free" else slots
+                values = array(typecode)
+                end = offset + count * values.itemsize
+                if end > len(data):
+                    raise ValueError("%s is truncated" % path)
+                values.frombytes(view[offset:end])
+                actual_crc = zlib.crc32(view[offset:end], actual_crc)
+                offset = end
+                setattr(store, name, _from_file_order(values, name))
+
+    if verify and actual_crc != crc:
+        raise ValueError("%s is corrupt" % path)
+
+    for fields in description["species"]:
+        store.get_species_index(TreeSpecies(*fields))
+    store.next_uid = description["next_uid"]
+
+    if t is None:
+        t = _load_terrain(description["terrain"], cache_dir, path)
+
+    forest = Forest(description["seed"], t, description["width"], description["height"],
+                    cell_size=None if description["auto_cell_size"] else description["cell_size"],
+                    engine=description["engine"], processes=processes)
+    forest.trees = store
+    forest.tick = description["tick"]
+    forest.cell_size = description["cell_size"]
+    forest.max_tree_size = description["max_tree_size"]
+    version, state, gauss_next = description["seed_random"]
+    forest.seed_random.setstate((version, tuple(state), gauss_next))
+    if forest.engine is not None:
+        forest.engine.seed_key = terrain.numpy.array(description["seed_key"], dtype=terrain.numpy.uint64)
+
+    return forest
+
+
+def _get_terrain_reference(t):
+    """
+        What's needed to generate the terrain again. The seed is None if it can't be.
+    """
+    if t is None:
+        return None
+
+    if isinstance(t, TiledTerrain):
+        return {
+            "type": "tiled",
+            "seed": getattr(t.generator, "seed", None),
+            "width": t.width,
+            "height": t.height,
+            "tile_size": t.tile_size,
+            "max_tiles": t.max_tiles,
+            "algorithm_version": terrain.ALGORITHM_VERSION,
+        }
+
+    return {
+        "type": "generated",
+        "seed": t.seed,
+        "width": len(t.points[0]),
+        "height": len(t.points),
+        "algorithm_version": terrain.ALGORITHM_VERSION,
+    }
+
+
+def _load_terrain(reference, cache_dir, path):
+    if reference is None:
+        return None
+    if reference["seed"] is None:
+        raise ValueError("The terrain of %s wasn't generated from a seed so it must be passed to load" % path)
+    if reference["algorithm_version"] != terrain.ALGORITHM_VERSION:
+        raise ValueError("The terrain was generated by a different version of the terrain generator")
+
+    if reference.get("type") == "tiled":
+        return TiledTerrain(TerrainGenerator(reference["seed"]), reference["width"], reference["height"],
+                            reference["tile_size"], reference["max_tiles"])
+    if cache_dir is None:
+        return TerrainGenerator(reference["seed"]).generate(reference["width"], reference["height"])
+
+    return TerrainCache(cache_dir).get_or_generate(reference["seed"], reference["width"], reference["height"])
+
+
+def _to_file_order(values, typecode):
+    if values.typecode != typecode:
+        values = array(typecode, values)
+    if sys.byteorder == "big":
+        values = values[:]
+        values.byteswap()
+
+    return values
+
+
+def _from_file_order(values, name):
+    if sys.byteorder == "big":
+        values.byteswap()
+    if name == "free":
+        values = array("l", values)
+
+    return values
+
@@ -0,0 +1,158 @@
+import collections
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+import pygame
+from forest.renderer import Renderer
+
+DEFAULT_QUEUE_SIZE = 16
+
+
+class FrameExporter:
+    """
+        Draws a forest offscreen every interval ticks to make timelapses without a display or
+        screen recording. It is attached to a forest like a HistoryRecorder and called after every
+        iteration.
+
+        Only a snapshot of the forest is taken on the simulation's thread. Snapshots go onto a
+        bounded queue and a writer thread draws them. Each frame is then written to pipe as raw 24
+        bit RGB, e.g. to the stdin of `ffmpeg -f rawvideo -pix_fmt rgb24 -s <width>x<height> -i -`.
+        It is also PNG encoded into output_dir as frame_000000.png, frame_000001.png and so on by a
+        pool of processes.
+
+        If frames are captured faster than they can be drawn and encoded, the queue fills up. The
+        simulation then waits for a space so that memory use stays bounded. blocked_time is the
+        total time it has waited.
+    """
+
+    def __init__(self, width, height, interval=1, output_dir=None, pipe=None, processes=None,
+                 queue_size=DEFAULT_QUEUE_SIZE, colours=None):
+        """
+            At most queue_size frames wait to be drawn and as many again to be encoded. processes
+            is the number of PNG encoding processes, one per CPU by default.
+        """
+        if not pygame.display.get_init():
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+            pygame.display.init()
+
+        self.size = (width, height)
+        self.interval = interval
+        self.output_dir = output_dir
+        self.pipe = pipe
+        self.queue_size = queue_size
+        self.renderer = Renderer(width, height, colours=colours, surface=pygame.Surface((width, height)))
+        self.frames = 0
+        self.blocked_time = 0.0
+        self.error = None
+        self.closed = False
+
+        self.pool = None
+        self.pending = collections.deque()
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+            self.pool = multiprocessing.Pool(processes, _init_encoder)
+
+        self.queue = queue.Queue(queue_size)
+        self.writer = threading.Thread(target=self._write_frames, daemon=True)
+        self.writer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def attach(self, forest):
+        """
+            Capture the forest as it is now and then every interval ticks.
+        """
+        forest.recorder = self
+        self.capture(forest)
+
+    def detach(self, forest):
+        forest.recorder = None
+
+    def record(self, forest):
+        if forest.tick % self.interval == 0:
+            self.capture(forest)
+
+    def capture(self, forest):
+        """
+            Queue a frame of the forest as it is now, waiting for a space if the queue is full.
+        """
+        snapshot = forest.snapshot()
+        start = time.perf_counter()
+        while True:
+            self._raise_error()
+            try:
+                self.queue.put(snapshot, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self.blocked_time += time.perf_counter() - start
+
+    def close(self):
+        """
+            Wait for every queued frame to be written, then raise any error in writing them.
+        """
+        if self.closed:
+            return
+
+        self.closed = True
+        while self.writer.is_alive():
+            try:
+                self.queue.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self.writer.join()
+
+        if self.pool is not None:
+            if self.error is None:
+                self.pool.close()
+            else:
+                self.pool.terminate()
+            self.pool.join()
+        if self.pipe is not None and self.error is None:
+            self.pipe.flush()
+
+        self._raise_error()
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise RuntimeError("Failed to export a frame") from self.error
+
+    def _write_frames(self):
+        try:
+            while True:
+                snapshot = self.queue.get()
+                if snapshot is None:
+                    break
+
+                self.renderer.render(snapshot)
+                data = pygame.image.tostring(self.renderer.surface, "RGB")
+                if self.pipe is not None:
+                    self.pipe.write(data)
+                if self.pool is not None:
+                    path = os.path.join(self.output_dir, "frame_%06d.png" % self.frames)
+                    self.pending.append(self.pool.apply_async(_save_png, (path, data, self.size)))
+                    while self.pending and (len(self.pending) > self.queue_size or self.pending[0].ready()):
+                        self.pending.popleft().get()
+                self.frames += 1
+
+            while self.pending:
+                self.pending.popleft().get()
+        except BaseException as e:
+            self.error = e
+
+
+def _init_encoder():
+    # Otherwise SDL's handler, inherited since the display is initialised, stops terminate working
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def _save_png(path, data, size):
+    pygame.image.save(pygame.image.frombuffer(data, size, "RGB"), path)
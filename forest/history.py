@@ -0,0 +1,324 @@
+import bisect
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+from forest.forestfile import SPECIES_FIELDS
+from forest.treespecies import TreeSpecies
+from forest.treestore import TreeStore
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# File layout: a file header followed by one record per recorded tick. Each record is a record
+# header and then a zlib compressed payload of a json list of any species which are new since the
+# last record and then groups of arrays. Each group is a count followed by that many little endian
+# values for each of the group's arrays.
+MAGIC = b"PFHS"
+FORMAT_VERSION = 1
+FILE_HEADER = struct.Struct("<4sH")
+RECORD_HEADER = struct.Struct("<BqI")
+COUNT = struct.Struct("<q")
+
+KEYFRAME = 0
+DELTA = 1
+
+# Keyframe: every tree as uid, species, x, y, size
+# Delta: removed trees as uid, added trees as uid, species, x, y, size, resized trees as uid, size
+TREE = ("q", "h", "d", "d", "d")
+TREE_ARRAYS = ("uid", "species_index", "x", "y", "size")
+GROUPS = {
+    KEYFRAME: (TREE,),
+    DELTA: (("q",), TREE, ("q", "d")),
+}
+
+
+class HistoryRecorder:
+    """
+        Records a forest on every iteration to an append only file, so that how it evolved can be
+        analysed afterwards without keeping a copy of every tick in memory.
+
+        Each tick is recorded as the trees which were added, removed (including by being absorbed)
+        or changed size since the last one. Every keyframe_interval ticks, and when the recorder is
+        attached, the whole forest is recorded instead so that a HistoryReader can rebuild any tick
+        by starting from the keyframe before it.
+    """
+
+    def __init__(self, path, keyframe_interval=100, level=6):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.level = level
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION))
+        self.species = 0
+        self.previous = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def attach(self, forest):
+        """
+            Record the forest as it is now and then after every iteration.
+        """
+        forest.recorder = self
+        self._write_keyframe(forest)
+
+    def detach(self, forest):
+        forest.recorder = None
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def record(self, forest):
+        if self.previous is None or forest.tick % self.keyframe_interval == 0:
+            self._write_keyframe(forest)
+        else:
+            self._write_delta(forest)
+
+    def _write_keyframe(self, forest):
+        store = forest.trees
+        slots = [slot for slot in range(len(store.species_index)) if store.species_index[slot] >= 0]
+        if numpy is not None:
+            slots = numpy.array(slots, dtype=numpy.int64)
+
+        self.species = 0
+        self._write(KEYFRAME, forest.tick, store, [_gather(store, slots, TREE_ARRAYS)])
+
+    def _write_delta(self, forest):
+        store = forest.trees
+        removed, added, resized = _diff(self.previous, store)
+        self._write(DELTA, forest.tick, store,
+                    [[removed], _gather(store, added, TREE_ARRAYS), _gather(store, resized, ("uid", "size"))])
+
+    def _write(self, kind, tick, store, groups):
+        species = json.dumps([[getattr(s, field) for field in SPECIES_FIELDS] for s in store.species[self.species:]])
+        payload = [COUNT.pack(len(species.encode("utf-8"))), species.encode("utf-8")]
+        for (typecodes, values) in zip(GROUPS[kind], groups):
+            payload.append(COUNT.pack(len(values[0])))
+            payload += [_encode(typecode, v) for (typecode, v) in zip(typecodes, values)]
+
+        data = zlib.compress(b"".join(payload), self.level)
+        self.file.write(RECORD_HEADER.pack(kind, tick, len(data)))
+        self.file.write(data)
+
+        self.species = len(store.species)
+        self.previous = (store.uid[:], store.size[:], store.species_index[:])
+
+
+class HistoryReader:
+    """
+        Reads a file written by a HistoryRecorder. Opening the file only reads the record headers,
+        a tick is rebuilt by decompressing the keyframe before it and the deltas between the two.
+
+        If a file has been appended to by a run which went back to an earlier tick, the records
+        from that run replace the ones it overlaps. A partly written final record is ignored.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = []
+
+        with open(path, "rb") as f:
+            header = f.read(FILE_HEADER.size)
+            if len(header) != FILE_HEADER.size or FILE_HEADER.unpack(header) != (MAGIC, FORMAT_VERSION):
+                raise ValueError("%s is not a forest history or was written by a different version" % path)
+
+            size = os.fstat(f.fileno()).st_size
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) != RECORD_HEADER.size:
+                    break
+                kind, tick, length = RECORD_HEADER.unpack(header)
+                if f.tell() + length > size:
+                    break
+
+                if kind == KEYFRAME:
+                    while self.records and self.records[-1][0] >= tick:
+                        self.records.pop()
+                self.records.append((tick, kind, f.tell(), length))
+                f.seek(length, os.SEEK_CUR)
+
+        self.ticks = [tick for (tick, _, _, _) in self.records]
+
+    def seek(self, tick):
+        """
+            A TreeStore holding the trees as they were after the given tick.
+        """
+        end = bisect.bisect_right(self.ticks, tick)
+        if end == 0:
+            raise ValueError("Tick %d is before the start of the history" % tick)
+
+        start = end - 1
+        while self.records[start][1] != KEYFRAME:
+            start -= 1
+
+        state = _State()
+        with open(self.path, "rb") as f:
+            for record in self.records[start:end]:
+                state.apply(record, f)
+
+        return state.store
+
+    def replay(self, start=None, stop=None):
+        """
+            Yields (tick, trees) for every recorded tick from start to stop inclusive. The same
+            TreeStore is updated in place each time so should be copied if it is to be kept.
+        """
+        first = 0 if start is None else bisect.bisect_left(self.ticks, start)
+        end = len(self.records) if stop is None else bisect.bisect_right(self.ticks, stop)
+        if first >= end:
+            return
+
+        begin = first
+        while self.records[begin][1] != KEYFRAME:
+            begin -= 1
+
+        state = _State()
+        with open(self.path, "rb") as f:
+            for i in range(begin, end):
+                state.apply(self.records[i], f)
+                if i >= first:
+                    yield self.records[i][0], state.store
+
+
+class _State:
+    """
+        The trees at a tick while a history is being read, along with the slot of each uid.
+    """
+
+    def __init__(self):
+        self.store = None
+        self.species = []
+        self.slots = {}
+
+    def apply(self, record, f):
+        tick, kind, offset, length = record
+        f.seek(offset)
+        data = memoryview(zlib.decompress(f.read(length)))
+
+        size = COUNT.unpack_from(data)[0]
+        new_species = [TreeSpecies(*fields) for fields in json.loads(bytes(data[COUNT.size:COUNT.size + size]))]
+        position = COUNT.size + size
+        groups = []
+        for typecodes in GROUPS[kind]:
+            count = COUNT.unpack_from(data, position)[0]
+            position += COUNT.size
+            values = []
+            for typecode in typecodes:
+                values.append(_decode(typecode, data[position:position + count * struct.calcsize("<" + typecode)]))
+                position += count * struct.calcsize("<" + typecode)
+            groups.append(values)
+
+        if kind == KEYFRAME:
+            self.species = new_species
+            self._load(*groups[0])
+        else:
+            self.species += new_species
+            (removed,), added, resized = groups
+            self._update(removed, added, resized)
+
+    def _load(self, uid, species_index, x, y, size):
+        store = TreeStore()
+        for species in self.species:
+            store.get_species_index(species)
+        store.uid, store.species_index, store.x, store.y, store.size = uid, species_index, x, y, size
+        store.next_uid = max(uid, default=-1) + 1
+
+        self.store = store
+        self.slots = {u: slot for (slot, u) in enumerate(uid)}
+
+    def _update(self, removed, added, resized):
+        store = self.store
+        for species in self.species[len(store.species):]:
+            store.get_species_index(species)
+
+        for uid in removed:
+            store.remove(self.slots.pop(uid))
+
+        next_uid = store.next_uid
+        for (uid, species_index, x, y, size) in zip(*added):
+            slot = store.add(store.species[species_index], x, y, size)
+            store.uid[slot] = uid
+            self.slots[uid] = slot
+            next_uid = max(next_uid, uid + 1)
+        store.next_uid = next_uid
+
+        for (uid, size) in zip(*resized):
+            store.size[self.slots[uid]] = size
+        store.changed()
+
+
+def _gather(store, slots, names):
+    """
+        The values of the named arrays of a store for the given slots.
+    """
+    if numpy is not None:
+        return [numpy.frombuffer(getattr(store, name), dtype=getattr(store, name).typecode)[slots] for name in names]
+
+    return [[getattr(store, name)[slot] for slot in slots] for name in names]
+
+
+def _diff(previous, store):
+    """
+        The uids of the trees which have been removed since the previous arrays were copied and
+        the slots of the trees which have been added and of those which have changed size.
+    """
+    old_uid, old_size, old_species_index = previous
+    if numpy is not None:
+        slots = max(len(old_uid), len(store.uid))
+        old_uid, new_uid = _pad(old_uid, slots, -1), _pad(store.uid, slots, -1)
+        old_alive, new_alive = _pad(old_species_index, slots, -1) >= 0, _pad(store.species_index, slots, -1) >= 0
+        same = old_alive & new_alive & (old_uid == new_uid)
+        resized = same & (_pad(old_size, slots, 0) != _pad(store.size, slots, 0))
+
+        return old_uid[old_alive & ~same], numpy.flatnonzero(new_alive & ~same), numpy.flatnonzero(resized)
+
+    removed, added, resized = [], [], []
+    for slot in range(max(len(old_uid), len(store.uid))):
+        old_alive = slot < len(old_uid) and old_species_index[slot] >= 0
+        new_alive = slot < len(store.uid) and store.species_index[slot] >= 0
+        same = old_alive and new_alive and old_uid[slot] == store.uid[slot]
+        if old_alive and not same:
+            removed.append(old_uid[slot])
+        if new_alive and not same:
+            added.append(slot)
+        if same and old_size[slot] != store.size[slot]:
+            resized.append(slot)
+
+    return removed, added, resized
+
+
+def _pad(values, length, empty):
+    a = numpy.full(length, empty, dtype=values.typecode)
+    a[:len(values)] = numpy.frombuffer(values, dtype=values.typecode)
+
+    return a
+
+
+def _encode(typecode, values):
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        return values.astype(numpy.dtype(typecode).newbyteorder("<")).tobytes()
+
+    values = array(typecode, values)
+    if sys.byteorder == "big":
+        values.byteswap()
+
+    return values.tobytes()
+
+
+def _decode(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+
+    return values
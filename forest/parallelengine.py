@@ -0,0 +1,362 @@
+import math
+import multiprocessing
+import os
+import signal
+import time
+import weakref
+from forest.batchengine import BatchEngine, create_grid, find_nearby
+from forest.tiledterrain import TiledTerrain
+from forest.tree import Tree
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SPECIES_FIELDS = ("growth_rate", "max_size", "initial_size", "seed_survivability", "seed_spread_distance",
+                  "seed_rate", "slope_threshhold")
+
+# Constants of the splitmix64 hash used by _uniform
+GOLDEN = 0x9E3779B97F4A7C15
+MIX = (0xBF58476D1CE4E5B9, 0x94D049BB133111EB)
+
+# The terrain maps of a worker process, set by _init_worker
+_maps = None
+
+
+class ParallelEngine:
+    """
+        An engine which splits the forest into horizontal strips and simulates each strip in a
+        separate worker process.
+
+        Each worker is sent the trees in its strip along with a halo of the trees around it, and
+        works out what happens to the trees and seeds in its strip. The results are merged in a
+        fixed order, so the forest after each tick is the same whatever the number of workers or
+        strips. That only works because what happens to each tree and seed is decided by the
+        trees near it, so the rules differ from the other engines:
+
+        1. Every tree grows.
+        2. Every tree which overlaps a tree larger than itself (or as large with a smaller uid) is
+           absorbed by the largest such tree. Each tree which absorbs others gains the sizes they
+           had after growing, added in uid order, up to its max_size. A tree can absorb trees and
+           be absorbed on the same tick.
+        3. Every surviving mature tree spreads its seeds. The random numbers for each seed come
+           from a hash of the forest's seed, the tick, the parent's uid and the seed's number
+           rather than from a shared stream. A seed is planted if it lands inside the forest, on
+           a slope the species can grow on and not too close to a tree (as in BatchEngine) or to
+           an earlier seed (by parent uid and then seed number) which passed those tests, whether
+           or not that seed is planted itself.
+
+        With these rules the fate of a tree depends on the trees within 4 * max_tree_size of it,
+        and that of a seed on the earlier seeds within the seed spacing of it, the trees within
+        the seed spacing of those and the parents within the spread distance of them, which sets
+        the size of the halo.
+
+        With a single process the strips are simulated in this process rather than a pool.
+    """
+
+    def __init__(self, forest, processes=None, strips=None):
+        if numpy is None:
+            raise ImportError("The parallel engine requires numpy")
+        if isinstance(forest.terrain, TiledTerrain):
+            raise ValueError("The parallel engine needs the whole terrain, it can't use a TiledTerrain")
+
+        self.forest = forest
+        self.processes = processes or os.cpu_count() or 1
+        self.strips = strips or self.processes
+        r = forest.create_random("parallel seeds")
+        self.seed_key = numpy.array([r.getrandbits(64)], dtype=numpy.uint64)
+        self.maps = None
+        self.pool = None
+        self.finalizer = None
+
+    def close(self):
+        """
+            Stop the worker processes. They're started again if the forest is iterated.
+        """
+        if self.finalizer is not None:
+            self.finalizer()
+        self.pool = None
+        self.finalizer = None
+
+    def iterate(self):
+        forest = self.forest
+        store = forest.trees
+        stats = forest.stats
+
+        tasks = self._create_tasks()
+        if stats is not None:
+            stats.lap("bookkeeping")
+
+        if self.processes == 1:
+            results = [_simulate_strip(task, self.maps) for task in tasks]
+        else:
+            results = self.pool.map(_simulate_strip, tasks)
+
+        if stats is not None:
+            for result in results:
+                for (name, value) in result["stats"].items():
+                    stats.add(name, value)
+
+        size = numpy.frombuffer(store.size)
+        for result in results:
+            size[result["slots"]] = result["size"]
+        del size  # The store's arrays can't grow while there is a view onto them
+
+        removed = sorted(slot for result in results for slot in result["removed"].tolist())
+        for slot in removed:
+            forest.remove_tree(store.get_tree(slot))
+
+        seeds = sorted(seed for result in results for seed in zip(*[s.tolist() for s in result["seeds"]]))
+        for (_, _, species_index, x, y) in seeds:
+            forest.add_tree(Tree(store.species[species_index], x, y))
+
+        if stats is not None:
+            stats.count("trees_removed", len(removed))
+            stats.count("trees_added", len(seeds))
+            stats.lap("bookkeeping")
+
+    def _create_tasks(self):
+        """
+            The work for each strip: the trees in the strip and its halo, sorted by y, along with
+            everything else the workers need to know about the forest.
+        """
+        forest = self.forest
+        store = forest.trees
+        self._update_maps()
+
+        species = {field: numpy.array([getattr(s, field) for s in store.species],
+                                      dtype=numpy.int64 if field == "seed_rate" else numpy.float64)
+                   for field in SPECIES_FIELDS}
+        spacing = self._get_spacing(species)
+        spread = species["seed_spread_distance"].max(initial=0) + 1
+        halo = max(2 * spacing, spacing + spread) + 4 * forest.max_tree_size
+
+        species_index = numpy.frombuffer(store.species_index, dtype=numpy.int16)
+        live = numpy.flatnonzero(species_index >= 0)
+        y = numpy.frombuffer(store.y)[live]
+        order = numpy.argsort(y, kind="stable")
+        live, y = live[order], y[order]
+
+        tasks = []
+        bounds = [forest.height * i // self.strips for i in range(self.strips + 1)]
+        for (top, bottom) in zip(bounds, bounds[1:]):
+            slots = live[numpy.searchsorted(y, top - halo):numpy.searchsorted(y, bottom + halo)]
+            tasks.append({
+                "tick": forest.tick,
+                "key": int(self.seed_key[0]),
+                "width": forest.width,
+                "height": forest.height,
+                "cell_size": forest.cell_size,
+                "max_tree_size": forest.max_tree_size,
+                "species": species,
+                "top": top,
+                "bottom": bottom,
+                "halo": halo,
+                "spacing": spacing,
+                "spread": spread,
+                "slots": slots,
+                "uid": numpy.frombuffer(store.uid, dtype=numpy.int64)[slots],
+                "species_index": species_index[slots],
+                "x": numpy.frombuffer(store.x)[slots],
+                "y": numpy.frombuffer(store.y)[slots],
+                "size": numpy.frombuffer(store.size)[slots],
+            })
+
+        return tasks
+
+    def _get_spacing(self, species):
+        """
+            The furthest a tree or seed can be from a seed and still stop it from being planted.
+        """
+        return self.forest.max_tree_size + species["initial_size"].max(initial=0) + int(self.maps["padding"].max(initial=0))
+
+    def _update_maps(self):
+        """
+            Make sure the workers have the padding map and the plantability map of every species,
+            starting the pool again with the new maps if a species has been added.
+        """
+        forest = self.forest
+        thresholds = {s.slope_threshhold for s in forest.trees.species}
+        if self.maps is not None and thresholds <= set(self.maps["bits"]):
+            if self.processes > 1 and self.pool is None:
+                self._start_pool()
+            return
+
+        padding = forest.get_padding()
+        self.maps = {
+            "padding": numpy.frombuffer(padding, dtype=padding.typecode),
+            "bits": {t: numpy.frombuffer(forest.get_plantability(s).bits, dtype=numpy.uint8)
+                     for (t, s) in {s.slope_threshhold: s for s in forest.trees.species}.items()},
+        }
+
+        if self.processes > 1:
+            self.close()
+            self._start_pool()
+
+    def _start_pool(self):
+        self.pool = multiprocessing.Pool(self.processes, _init_worker, (self.maps,))
+        self.finalizer = weakref.finalize(self, self.pool.terminate)
+
+
+def _init_worker(maps):
+    global _maps
+    _maps = maps
+    # SDL's handler is inherited if pygame's display was initialised, and stops terminate working
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def _simulate_strip(task, maps=None):
+    """
+        Grow the trees, resolve the collisions and spread the seeds of one strip, returning the
+        new size of each tree in the strip, the slots of those which were absorbed and the seeds
+        planted in the strip as arrays of (parent uid, seed number, species index, x, y).
+    """
+    maps = maps or _maps
+    p = task["species"]
+    top, bottom, width, cell_size = task["top"], task["bottom"], task["width"], task["cell_size"]
+    max_tree_size = task["max_tree_size"]
+    x, y, uid, species_index = task["x"], task["y"], task["uid"], task["species_index"]
+    counts = {}
+    start = time.perf_counter()
+
+    max_size = p["max_size"][species_index]
+    size = numpy.minimum(task["size"] + p["growth_rate"][species_index], max_size)
+    grow_time = time.perf_counter()
+
+    # Trees are sorted into a grid over just the strip and its halo
+    origin = max(0, top - task["halo"])
+    area = (width, min(task["height"], bottom + task["halo"]) - origin)
+    own = (y >= top) & (y < bottom)
+    a, b = find_nearby(create_grid(x, y - origin, cell_size, *area), x, y - origin, 2 * max_tree_size, cell_size)
+    counts["neighbour_candidates"] = int(numpy.count_nonzero(own[a]))
+    a, b = a[a != b], b[a != b]
+    counts["overlap_tests"] = int(numpy.count_nonzero(own[a]))
+    dx, dy = x[a] - x[b], y[a] - y[b]
+    overlap = numpy.sqrt(dx * dx + dy * dy) <= size[a] + size[b]
+    a, b = a[overlap], b[overlap]
+    larger = (size[b] > size[a]) | ((size[b] == size[a]) & (uid[b] < uid[a]))
+    a, b = a[larger], b[larger]
+
+    # The largest of the trees which can absorb each tree does so
+    order = numpy.lexsort((uid[b], -size[b], a))
+    victims, first = numpy.unique(a[order], return_index=True)
+    absorbers = b[order][first]
+    removed = numpy.zeros(len(x), dtype=bool)
+    removed[victims] = True
+
+    new_size = size.copy()
+    if len(victims):
+        order = numpy.lexsort((uid[victims], absorbers))
+        victims, absorbers = victims[order], absorbers[order]
+        absorbers, first = numpy.unique(absorbers, return_index=True)
+        gain = numpy.add.reduceat(size[victims], first)
+        new_size[absorbers] = numpy.minimum(size[absorbers] + gain, max_size[absorbers])
+    collisions_time = time.perf_counter()
+
+    seeds = _spread_seeds(task, maps, x, y, uid, species_index, new_size, removed, origin, area, counts)
+    seeds_time = time.perf_counter()
+
+    counts["grow"] = grow_time - start
+    counts["collisions"] = collisions_time - grow_time
+    counts["seeds"] = seeds_time - collisions_time
+
+    return {
+        "slots": task["slots"][own],
+        "size": new_size[own],
+        "removed": task["slots"][own & removed],
+        "seeds": seeds,
+        "stats": counts,
+    }
+
+
+def _spread_seeds(task, maps, x, y, uid, species_index, size, removed, origin, area, counts):
+    p = task["species"]
+    top, bottom, width, cell_size = task["top"], task["bottom"], task["width"], task["cell_size"]
+    spacing = task["spacing"]
+    reach = spacing + task["spread"]
+
+    alive = ~removed
+    mature = alive & (size == p["max_size"][species_index]) & (y >= top - reach) & (y < bottom + reach)
+    parents = numpy.flatnonzero(mature)
+    rate = p["seed_rate"][species_index[parents]]
+    parent = numpy.repeat(parents, rate)
+    number = numpy.arange(len(parent)) - numpy.repeat(numpy.cumsum(rate) - rate, rate)
+
+    draws = [_uniform(task["key"], task["tick"], uid[parent], number, draw) for draw in range(3)]
+    survived = draws[0] < p["seed_survivability"][species_index[parent]]
+    parent, number, d, direction = parent[survived], number[survived], draws[1][survived], draws[2][survived]
+    d = size[parent] + (p["seed_spread_distance"][species_index[parent]] - size[parent]) * d
+    direction = 2 * math.pi * direction
+
+    sx = x[parent].astype(numpy.int64) + numpy.rint(d * numpy.cos(direction)).astype(numpy.int64)
+    sy = y[parent].astype(numpy.int64) + numpy.rint(d * numpy.sin(direction)).astype(numpy.int64)
+    seed_species = species_index[parent]
+
+    inside = (sx >= 0) & (sx < width) & (sy >= 0) & (sy < task["height"])
+    own_parent = (y[parent] >= top) & (y[parent] < bottom)
+    counts["seeds_attempted"] = int(numpy.count_nonzero(own_parent))
+    counts["seeds_outside"] = int(numpy.count_nonzero(own_parent & ~inside))
+
+    near = inside & (sy >= top - spacing) & (sy < bottom + spacing)
+    parent, number, sx, sy, seed_species = parent[near], number[near], sx[near], sy[near], seed_species[near]
+
+    i = sy * width + sx
+    plantable = numpy.zeros(len(sx), dtype=bool)
+    for s in numpy.unique(seed_species).tolist():
+        seeds = seed_species == s
+        bits = maps["bits"][p["slope_threshhold"][s]]
+        plantable[seeds] = (bits[i[seeds] >> 3] & (0x80 >> (i[seeds] & 7))) != 0
+    own = (sy >= top) & (sy < bottom)
+    counts["seeds_too_steep"] = int(numpy.count_nonzero(own & ~plantable))
+    parent, number, sx, sy, seed_species, i, own = (
+        v[plantable] for v in (parent, number, sx, sy, seed_species, i, own))
+
+    # Spacing against the trees which survived this tick
+    initial_size = p["initial_size"]
+    padding = maps["padding"][i].astype(numpy.int64)
+    radius = task["max_tree_size"] + initial_size[seed_species] + padding
+    trees = numpy.flatnonzero(alive)
+    tx, ty = x[trees], y[trees]
+    a, b = find_nearby(create_grid(tx, ty - origin, cell_size, *area), sx, sy - origin, radius.max(initial=0), cell_size)
+    total = size[trees][b] + initial_size[seed_species[a]] + padding[a]
+    too_close = numpy.zeros(len(sx), dtype=bool)
+    too_close[a[BatchEngine._too_close(sx[a] - tx[b], sy[a] - ty[b], radius[a], total)]] = True
+    keep = ~too_close
+    parent, number, sx, sy, seed_species, radius, padding = (
+        v[keep] for v in (parent, number, sx, sy, seed_species, radius, padding))
+
+    # Spacing against every earlier seed which got this far
+    parent_uid = uid[parent]
+    a, b = find_nearby(create_grid(sx, sy - origin, cell_size, *area), sx, sy - origin, radius.max(initial=0), cell_size)
+    earlier = (parent_uid[b] < parent_uid[a]) | ((parent_uid[b] == parent_uid[a]) & (number[b] < number[a]))
+    total = initial_size[seed_species[b]] + initial_size[seed_species[a]] + padding[a]
+    planted = numpy.ones(len(sx), dtype=bool)
+    planted[a[earlier & BatchEngine._too_close(sx[a] - sx[b], sy[a] - sy[b], radius[a], total)]] = False
+
+    own_seeds = (sy >= top) & (sy < bottom)
+    counts["seeds_too_close"] = int(numpy.count_nonzero(own & too_close)) + int(numpy.count_nonzero(own_seeds & ~planted))
+    planted &= own_seeds
+
+    return parent_uid[planted], number[planted], seed_species[planted], sx[planted], sy[planted]
+
+
+def _uniform(key, tick, uid, number, draw):
+    """
+        A uniform float in [0, 1) for each seed, which depends only on the key, tick, parent uid,
+        seed number and draw, from a splitmix64 hash of them.
+    """
+    z = numpy.full(len(uid), key, dtype=numpy.uint64)
+    v = numpy.empty(len(uid), dtype=numpy.uint64)
+    for value in (tick, uid, number, draw):
+        v[...] = value
+        z = _mix(z + v * numpy.uint64(GOLDEN))
+
+    return (z >> numpy.uint64(11)).astype(numpy.float64) * (1.0 / (1 << 53))
+
+
+def _mix(z):
+    z = (z ^ (z >> numpy.uint64(30))) * numpy.uint64(MIX[0])
+    z = (z ^ (z >> numpy.uint64(27))) * numpy.uint64(MIX[1])
+
+    return z ^ (z >> numpy.uint64(31))
@@ -0,0 +1,130 @@
+import bisect
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class PlantabilityMap:
+    """
+        Every pixel of a forest on which a species can grow, i.e. where the terrain's max slope is
+        no more than the species' slope threshold, as a bitmap with one bit per pixel packed eight
+        to a byte (most significant bit first) in row order.
+
+        The index of plantable pixels used to answer whole map queries is built from the bitmap
+        the first time it is needed. Like the spatial index it is a flat array of the column of
+        every plantable pixel ordered by row, along with the offset at which each row starts.
+    """
+
+    def __init__(self, max_slope, width, height, slope_threshold):
+        self.width = width
+        self.height = height
+        self.slope_threshold = slope_threshold
+        self.row_start = None
+        self.cols = None
+
+        if numpy is not None:
+            plantable = numpy.asarray(max_slope, dtype=numpy.float64)[:height, :width] <= slope_threshold
+            self.bits = numpy.packbits(plantable, axis=None).tobytes()
+        else:
+            bits = bytearray((width * height + 7) // 8)
+            for y in range(height):
+                row = max_slope[y]
+                i = y * width
+                for x in range(width):
+                    if row[x] <= slope_threshold:
+                        bits[i >> 3] |= 0x80 >> (i & 7)
+                    i += 1
+            self.bits = bytes(bits)
+
+    def __len__(self):
+        """
+            The number of plantable pixels.
+        """
+        return self.get_index()[0][-1]
+
+    def is_plantable(self, x, y):
+        i = y * self.width + x
+
+        return self.bits[i >> 3] & (0x80 >> (i & 7)) != 0
+
+    def are_plantable(self, x, y):
+        """
+            Array version of is_plantable for numpy arrays of points.
+        """
+        i = y * self.width + x
+        bits = numpy.frombuffer(self.bits, dtype=numpy.uint8)
+
+        return (bits[i >> 3] & (0x80 >> (i & 7))) != 0
+
+    def get_index(self):
+        if self.row_start is None:
+            typecode = "H" if self.width <= 1 << 16 else "l"
+            if numpy is not None:
+                plantable = numpy.unpackbits(numpy.frombuffer(self.bits, dtype=numpy.uint8),
+                                             count=self.width * self.height).reshape(self.height, self.width)
+                rows, cols = numpy.nonzero(plantable)
+                row_start = numpy.zeros(self.height + 1, dtype=numpy.int64)
+                numpy.cumsum(numpy.bincount(rows, minlength=self.height), out=row_start[1:])
+                self.row_start = array("q", row_start.tobytes())
+                self.cols = array(typecode, cols.astype(numpy.dtype(typecode)).tobytes())
+            else:
+                self.row_start = array("q", [0])
+                self.cols = array(typecode)
+                for y in range(self.height):
+                    self.cols.extend(x for x in range(self.width) if self.is_plantable(x, y))
+                    self.row_start.append(len(self.cols))
+
+        return self.row_start, self.cols
+
+    def get_points(self, x=0, y=0, width=None, height=None):
+        """
+            The (x, y) of every plantable pixel in a rectangle (the whole map by default), in row
+            order. Only the rows of the rectangle are visited and the columns within each row are
+            found by bisection.
+        """
+        row_start, cols = self.get_index()
+        width = self.width - x if width is None else width
+        height = self.height - y if height is None else height
+
+        points = []
+        for row in range(max(0, y), min(self.height, y + height)):
+            start, end = row_start[row], row_start[row + 1]
+            first = bisect.bisect_left(cols, x, start, end)
+            last = bisect.bisect_left(cols, x + width, first, end)
+            points.extend((col, row) for col in cols[first:last])
+
+        return points
+
+    def get_random_point(self, r):
+        """
+            A plantable pixel chosen uniformly at random using the random.Random r, or None if
+            there aren't any.
+        """
+        row_start, cols = self.get_index()
+        if row_start[-1] == 0:
+            return None
+
+        i = r.randrange(row_start[-1])
+
+        return cols[i], bisect.bisect_right(row_start, i) - 1
+
+
+def calculate_padding(max_slope, width, height):
+    """
+        The extra space a seed needs around it on each pixel, int(10 * slope / 0.05), which only
+        depends on the terrain so is shared by every species. Stored flat in row order in the
+        smallest array type which fits.
+    """
+    if numpy is not None:
+        padding = (10 * numpy.asarray(max_slope, dtype=numpy.float64)[:height, :width] / 0.05).astype(numpy.int64)
+        typecode = "B" if padding.max(initial=0) < 1 << 8 else "H" if padding.max(initial=0) < 1 << 16 else "l"
+
+        return array(typecode, padding.astype(numpy.dtype(typecode)).tobytes())
+
+    padding = [int(10 * max_slope[y][x] / 0.05) for y in range(height) for x in range(width)]
+    typecode = "B" if max(padding, default=0) < 1 << 8 else "H" if max(padding, default=0) < 1 << 16 else "l"
+
+    return array(typecode, padding)
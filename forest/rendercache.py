@@ -0,0 +1,151 @@
+import weakref
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class RenderCache:
+    """
+        A least recently used cache of surfaces (or anything else which is expensive to draw) which
+        holds at most max_bytes of them.
+
+        Entries can be owned by another object, such as the terrain they were drawn from, in which
+        case they are keyed by that object's identity and dropped as soon as it is garbage
+        collected so a new object reusing the same id never sees them.
+
+        Hits and misses are counted so the budget can be sized for a session.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.owned = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, create, owner=None):
+        """
+            Returns the value for key, calling create to make it if it isn't in the cache.
+        """
+        full_key = self._get_key(key, owner)
+        try:
+            value = self.entries[full_key][0]
+        except KeyError:
+            self.misses += 1
+            value = create()
+            self._put(full_key, value, get_size(value), owner)
+
+            return value
+
+        self.hits += 1
+        self.entries.move_to_end(full_key)
+
+        return value
+
+    def put(self, key, value, size=None, owner=None):
+        """
+            Add a value to the cache, evicting the least recently used values until it fits. A
+            value bigger than the whole budget isn't stored.
+        """
+        self._put(self._get_key(key, owner), value, get_size(value) if size is None else size, owner)
+
+    def invalidate(self, owner):
+        """
+            Drop every entry owned by an object, e.g. after it has changed.
+        """
+        keys, finalizer = self.owned.pop(id(owner), (set(), None))
+        if finalizer is not None:
+            finalizer.detach()
+
+        for key in list(keys):
+            self._remove(key)
+
+    def clear(self):
+        for key in list(self.entries):
+            self._remove(key)
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    @staticmethod
+    def _get_key(key, owner):
+        return key if owner is None else (id(owner), key)
+
+    def _put(self, key, value, size, owner):
+        self._remove(key)
+        if size > self.max_bytes:
+            return
+
+        owner_id = None
+        if owner is not None:
+            owner_id = id(owner)
+            self._own(owner).add(key)
+
+        self.entries[key] = (value, size, owner_id)
+        self.bytes += size
+
+        while self.bytes > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def _own(self, owner):
+        """
+            The set of keys owned by an object, watching for it being garbage collected the first
+            time it owns anything.
+        """
+        try:
+            return self.owned[id(owner)][0]
+        except KeyError:
+            pass
+
+        try:
+            finalizer = weakref.finalize(owner, self._forget, id(owner))
+        except TypeError:  # Can't be weakly referenced so can't tell when it's gone
+            finalizer = None
+        self.owned[id(owner)] = (set(), finalizer)
+
+        return self.owned[id(owner)][0]
+
+    def _forget(self, owner_id):
+        for key in list(self.owned.pop(owner_id, (set(), None))[0]):
+            self._remove(key)
+
+    def _remove(self, key):
+        try:
+            _, size, owner_id = self.entries.pop(key)
+        except KeyError:
+            return
+
+        self.bytes -= size
+        if owner_id in self.owned:
+            keys, finalizer = self.owned[owner_id]
+            keys.discard(key)
+            if not keys:
+                del self.owned[owner_id]
+                if finalizer is not None:
+                    finalizer.detach()
+
+
+def get_size(surface):
+    """
+        The number of bytes of pixel data held by a surface, or a list of surfaces.
+    """
+    if isinstance(surface, (list, tuple)):
+        return sum(get_size(s) for s in surface)
+
+    return surface.get_pitch() * surface.get_height()
@@ -1,16 +1,66 @@
+import math
 import pygame
 from pygame.locals import *
+from forest.camera import Camera
+from forest.rendercache import RenderCache
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 HEIGHTMAP_MODE = 0
 SLOPE_MODE = 1
 
+# Trees are drawn into square tiles of this many pixels, fixed to the world at each zoom, which are
+# kept while they are on the screen and only drawn again when a tree touching them changes.
+TILE_SIZE = 128
+
+# Below this zoom the number of trees in each part of the forest is drawn rather than the trees
+DENSITY_ZOOM = 0.25
+# Each tree counts as covering this much of the world when drawing the density
+DENSITY_TREE_AREA = 50
+DENSITY_PALETTE = [(0, 200 - 150 * i // 255, 0) for i in range(256)]
+
+PAN_STEP = 50
+ZOOM_STEP = 1.25
+
+# The colour trees of each species are drawn in, by species name. Species which aren't in the table
+# are drawn in DEFAULT_TREE_COLOUR.
+TREE_COLOURS = {"birch": (255, 0, 0), "oak": (0, 255, 0)}
+DEFAULT_TREE_COLOUR = (0, 0, 0)
+
+# The largest radius in pixels of the trees in the atlas. When zoomed in far enough for trees to be
+# bigger than this they're drawn as circles, but then there are few trees on the screen.
+MAX_SPRITE_RADIUS = 32
+
 
 class Renderer:
-    def __init__(self, width, height):
-        self.surface = pygame.display.set_mode((width, height))
+    def __init__(self, width, height, cache=None, colours=None, surface=None):
+        """
+            colours maps species names to the colour their trees are drawn in, TREE_COLOURS by
+            default.
+
+            Draws on the display unless given a surface to draw on instead, which only needs the
+            display to be initialised rather than a window to be opened.
+        """
+        self.offscreen = surface is not None
+        self.surface = pygame.display.set_mode((width, height)) if surface is None else surface
+        self.cache = RenderCache() if cache is None else cache
+        self.colours = TREE_COLOURS if colours is None else colours
+        self.atlas = None
         self.width = width
         self.height = height
         self.mode = HEIGHTMAP_MODE
+        self.camera = Camera(width, height)
+        self.drawn_version = None
+        self.drawn_background = None
+        self.drawn_view = None
+        self.background = None
+        self.tiles = {}
+        self.tiles_key = None
+        self.tiles_version = None
+        self.tiles_trees = None
 
     def handle_event(self, event):
         if event.type == KEYUP:
@@ -18,88 +68,507 @@ class Renderer:
                 self.mode = SLOPE_MODE
             elif event.key == K_h:
                 self.mode = HEIGHTMAP_MODE
+            elif event.key == K_HOME:
+                self.camera = Camera(self.width, self.height)
+        elif event.type == KEYDOWN:
+            if event.key in (K_EQUALS, K_PLUS, K_KP_PLUS):
+                self.camera.zoom_at(ZOOM_STEP, self.width / 2, self.height / 2)
+            elif event.key in (K_MINUS, K_KP_MINUS):
+                self.camera.zoom_at(1 / ZOOM_STEP, self.width / 2, self.height / 2)
+            elif event.key == K_LEFT:
+                self.camera.pan(-PAN_STEP, 0)
+            elif event.key == K_RIGHT:
+                self.camera.pan(PAN_STEP, 0)
+            elif event.key == K_UP:
+                self.camera.pan(0, -PAN_STEP)
+            elif event.key == K_DOWN:
+                self.camera.pan(0, PAN_STEP)
+        elif event.type == MOUSEWHEEL:
+            self.camera.zoom_at(ZOOM_STEP ** event.y, *pygame.mouse.get_pos())
+        elif event.type == MOUSEMOTION and event.buttons[0]:
+            self.camera.pan(-event.rel[0], -event.rel[1])
+
+    def render(self, forest):
+        """
+            Draw the part of the forest seen by the camera. Nothing is drawn at all if neither the
+            forest nor the camera have changed.
+
+            The trees are drawn into tiles (see TILE_SIZE) which are kept while they are on the
+            screen, so moving the camera only draws the tiles which come into view and a change to
+            the trees only redraws the tiles it touches. Only the trees which might be seen are
+            looked at, so how long a frame takes depends on the number of trees on the screen
+            rather than in the forest.
+        """
+        view = (self.mode, self.camera.view)
+        background = self._get_background(forest)
+        trees = forest.trees
+
+        moved = self.drawn_version is None or view != self.drawn_view or background is not self.drawn_background
+        if not moved and trees.version == self.drawn_version:
+            return
 
-    def render(self, forest, paused):
+        if numpy is None or self._is_drawing_density():
+            self._render_all(forest, background)
+            rects = None
+        else:
+            rects = self._render_tiles(forest, background, moved)
+
+        if not self.offscreen:
+            if rects is None:
+                pygame.display.update()
+            else:
+                pygame.display.update(rects)
+
+        self.drawn_version = trees.version
+        self.drawn_background = background
+        self.drawn_view = view
+
+    def _is_drawing_density(self):
+        return numpy is not None and self.camera.zoom < DENSITY_ZOOM
+
+    def _render_all(self, forest, background):
         self.surface.fill(pygame.Color(255, 255, 255))
+        self.surface.blit(background, (0, 0))
+
+        if self._is_drawing_density():
+            self._render_density(forest)
+        else:
+            self._render_trees(self.surface, forest.trees, self._get_visible_slots(forest), self._get_origin())
+
+    def _get_origin(self):
+        """
+            The pixel at the top left of the screen. Trees are drawn on a grid of pixels fixed to
+            the world at each zoom, with the tree at (x, y) in the pixel (floor(x * zoom),
+            floor(y * zoom)), so that tiles of them can be drawn once and used wherever the camera
+            is.
+        """
+        zoom = self.camera.zoom
+
+        return math.floor(self.camera.x * zoom), math.floor(self.camera.y * zoom)
+
+    def _get_tile_range(self):
+        """
+            The columns and rows of the tiles on the screen.
+        """
+        left, top = self._get_origin()
+
+        return (range(left // TILE_SIZE, (left + self.width - 1) // TILE_SIZE + 1),
+                range(top // TILE_SIZE, (top + self.height - 1) // TILE_SIZE + 1))
+
+    def _get_visible_cells(self, forest, left, top, right, bottom):
+        """
+            The spatial index and the first and last column and row of its cells holding the trees
+            which might be seen in a rectangle of the world.
+        """
+        index = forest.get_index()
+        # Trees are drawn up to a couple of pixels bigger than they are, from rounding
+        margin = max([species.max_size for species in forest.trees.species], default=0) + 2 / self.camera.zoom
+        min_col, max_col = max(0, int((left - margin) // index.cell_size)), min(index.cols - 1, int((right + margin) // index.cell_size))
+        min_row, max_row = max(0, int((top - margin) // index.cell_size)), min(index.rows - 1, int((bottom + margin) // index.cell_size))
+        if min_col > max_col:  # No rows then, rather than a range of columns which runs backwards
+            max_row = min_row - 1
+
+        return index, min_col, max_col, min_row, max_row
+
+    def _get_visible_slots(self, forest):
+        """
+            The slots of the trees which might be seen by the camera in slot order, found from the
+            cells of the spatial index which are in view rather than by checking every tree.
+        """
+        index, min_col, max_col, min_row, max_row = self._get_visible_cells(forest, *self.camera.get_world_rect())
+
+        slots = []
+        for row in range(min_row, max_row + 1):
+            start, end = index.cell_start[row * index.cols + min_col], index.cell_start[row * index.cols + max_col + 1]
+            slots.extend(index.slots[start:end])
+        slots.sort()
+
+        return slots
+
+    def _get_visible_trees(self, forest):
+        """
+            The slot, species index, radius in pixels and pixel (see _get_origin) of the trees which
+            might be seen in the tiles on the screen, as arrays in slot order.
+
+            The slots in the visible cells of the spatial index are marked rather than sorted,
+            unless there are few enough of them for sorting to be quicker.
+        """
+        store = forest.trees
+        zoom = self.camera.zoom
+        cols, rows = self._get_tile_range()
+        index, min_col, max_col, min_row, max_row = self._get_visible_cells(
+            forest, cols.start * TILE_SIZE / zoom, rows.start * TILE_SIZE / zoom,
+            cols.stop * TILE_SIZE / zoom, rows.stop * TILE_SIZE / zoom)
+
+        cell_start = numpy.frombuffer(index.cell_start, dtype=index.cell_start.typecode)
+        index_slots = numpy.frombuffer(index.slots, dtype=index.slots.typecode)
+        row_start = numpy.arange(min_row, max_row + 1) * index.cols
+        starts, ends = cell_start[row_start + min_col].tolist(), cell_start[row_start + max_col + 1].tolist()
+        if min_col == 0 and max_col == index.cols - 1 and starts:  # Whole rows, which follow each other
+            starts, ends = starts[:1], ends[-1:]
+
+        if sum(max(0, end - start) for (start, end) in zip(starts, ends)) * 16 < len(store.species_index):
+            slots = numpy.sort(numpy.concatenate([index_slots[start:end] for (start, end) in zip(starts, ends)] +
+                                                 [numpy.zeros(0, dtype=index_slots.dtype)]))
+        else:
+            marked = numpy.zeros(len(store.species_index), dtype=bool)
+            for (start, end) in zip(starts, ends):
+                marked[index_slots[start:end]] = True
+            slots = numpy.flatnonzero(marked)
+
+        return (slots, numpy.frombuffer(store.species_index, dtype=numpy.int16)[slots],
+                numpy.rint(numpy.frombuffer(store.size)[slots] * zoom).astype(numpy.int64),
+                numpy.floor(numpy.frombuffer(store.x)[slots] * zoom).astype(numpy.int64),
+                numpy.floor(numpy.frombuffer(store.y)[slots] * zoom).astype(numpy.int64))
+
+    def _render_density(self, forest):
+        """
+            Shade each block of cells of the spatial index by the number of trees in it. A block is
+            about a pixel across, or a single cell when that is bigger, so this takes about the
+            same time however many trees there are.
+        """
+        index = forest.get_index()
+        cell_size = index.cell_size
+        step = max(1, int(1 / (self.camera.zoom * cell_size)))
+        left, top, right, bottom = self.camera.get_world_rect()
+        min_col, max_col = max(0, int(left // cell_size)), min(index.cols, int(math.ceil(right / cell_size)))
+        min_row, max_row = max(0, int(top // cell_size)), min(index.rows, int(math.ceil(bottom / cell_size)))
+        if min_col >= max_col or min_row >= max_row:
+            return
+
+        # Cells in a row are consecutive in the index so the number of trees in a run of them is
+        # the difference between the start of the run and the start of the next one
+        cell_start = numpy.frombuffer(index.cell_start, dtype=index.cell_start.typecode)
+        edges = numpy.append(numpy.arange(min_col, max_col, step), max_col)
+        rows = numpy.arange(min_row, max_row)
+        runs = numpy.diff(cell_start[rows[:, None] * index.cols + edges[None, :]], axis=1)
+        counts = numpy.add.reduceat(runs, numpy.arange(0, len(rows), step), axis=0)
+
+        shade = numpy.ceil(counts * (255 * DENSITY_TREE_AREA / (step * cell_size) ** 2))
+        shade = numpy.ascontiguousarray(numpy.clip(shade, 0, 255).astype(numpy.uint8))
+        density = pygame.image.frombuffer(shade.tobytes(), (shade.shape[1], shade.shape[0]), "P")
+        density.set_palette(DENSITY_PALETTE)
+        density.set_colorkey(0)
+
+        rect = self._get_screen_rect(min_col * cell_size, min_row * cell_size, max_col * cell_size, max_row * cell_size)
+        self.surface.blit(pygame.transform.scale(density, rect.size), rect)
+
+    def _get_screen_rect(self, left, top, right, bottom):
+        """
+            The rectangle on the screen covered by a rectangle in the world.
+        """
+        left, top = [round(v) for v in self.camera.to_screen(left, top)]
+        right, bottom = [round(v) for v in self.camera.to_screen(right, bottom)]
+
+        return pygame.Rect(left, top, right - left, bottom - top)
 
-        if self.mode == HEIGHTMAP_MODE:
-            self._render_terrain(forest)
-        elif self.mode == SLOPE_MODE:
-            self._render_slopes(forest)
+    def _render_tiles(self, forest, background, moved):
+        """
+            Bring the tiles of trees on the screen up to date and draw them over the background,
+            either all of them or, if the camera hasn't moved and most are unchanged, only those
+            which were drawn again.
+            Returns the rectangles of the screen which were drawn, or None if all of it was.
+        """
+        trees = forest.trees
+        visible = self._get_visible_trees(forest)
+        colours = self._get_colours(trees)
+        key = (self.camera.zoom, colours, self._is_drawing_circles(trees))
+        if key != self.tiles_key:
+            self.tiles = {}
+            self.tiles_key = key
+        elif trees.version != self.tiles_version:
+            self._invalidate_tiles(self.tiles_trees, visible)
+        self.tiles_version = trees.version
+        self.tiles_trees = visible
+
+        cols, rows = self._get_tile_range()
+        self.tiles = {tile: surface for (tile, surface) in self.tiles.items() if tile[0] in cols and tile[1] in rows}
+        missing = [(col, row) for row in rows for col in cols if (col, row) not in self.tiles]
+        self._draw_tiles(visible, colours, missing, cols, rows)
+
+        left, top = self._get_origin()
+        if moved or len(missing) > len(self.tiles) / 2:
+            self.surface.fill(pygame.Color(255, 255, 255))
+            self.surface.blit(background, (0, 0))
+            self.surface.blits([(surface, (col * TILE_SIZE - left, row * TILE_SIZE - top))
+                                for ((col, row), surface) in self.tiles.items() if surface is not None], doreturn=False)
+
+            return None
+
+        rects = []
+        for (col, row) in missing:
+            rect = pygame.Rect(col * TILE_SIZE - left, row * TILE_SIZE - top, TILE_SIZE, TILE_SIZE)
+            clipped = rect.clip(self.surface.get_rect())
+            self.surface.fill(pygame.Color(255, 255, 255), clipped)
+            self.surface.blit(background, clipped, clipped)
+            if self.tiles[(col, row)] is not None:
+                self.surface.blit(self.tiles[(col, row)], rect)
+            rects.append(clipped)
+
+        return rects
+
+    def _invalidate_tiles(self, drawn, visible):
+        """
+            Drop the tiles touched by a tree which has been added, removed or would be drawn
+            differently between the trees the tiles were drawn from and those to be drawn now, as
+            given by _get_visible_trees. Those trees cover every tile which is kept.
+        """
+        if not self.tiles:
+            return
+
+        # Both are in slot order, so where each old slot is among the new ones is a binary search
+        old_slots, new_slots = drawn[0], visible[0]
+        position = numpy.minimum(numpy.searchsorted(new_slots, old_slots), max(0, len(new_slots) - 1))
+        same = numpy.zeros(len(old_slots), dtype=bool)
+        if len(new_slots):
+            same = new_slots[position] == old_slots
+            for (old, new) in zip(drawn[1:], visible[1:]):
+                same &= old == new[position]
+        unchanged = numpy.zeros(len(new_slots), dtype=bool)
+        unchanged[position[same]] = True
+
+        min_col, min_row = min(col for (col, _) in self.tiles), min(row for (_, row) in self.tiles)
+        max_col, max_row = max(col for (col, _) in self.tiles), max(row for (_, row) in self.tiles)
+        width = max_col - min_col + 1
+        for (trees, changed) in ((drawn, ~same), (visible, ~unchanged)):
+            _, cols, rows = _get_tiles_touched(*[values[changed] for values in trees[2:]])
+            inside = (cols >= min_col) & (cols <= max_col) & (rows >= min_row) & (rows <= max_row)
+            for tile in numpy.unique((rows[inside] - min_row) * width + cols[inside] - min_col).tolist():
+                self.tiles.pop((min_col + tile % width, min_row + tile // width), None)
+
+    def _draw_tiles(self, visible, colours, missing, cols, rows):
+        """
+            Draw each missing tile of the screen with every visible tree which touches it, in slot
+            order. A tile with no trees on it is None.
+        """
+        if not missing:
+            return
+
+        # Only the trees near the missing tiles are looked at
+        _, species_index, radius, x, y = visible
+        near = (((x + radius) // TILE_SIZE >= min(col for (col, _) in missing)) &
+                ((x - radius) // TILE_SIZE <= max(col for (col, _) in missing)) &
+                ((y + radius) // TILE_SIZE >= min(row for (_, row) in missing)) &
+                ((y - radius) // TILE_SIZE <= max(row for (_, row) in missing)))
+        species_index, radius, x, y = species_index[near], radius[near], x[near], y[near]
+
+        wanted = numpy.zeros(len(cols) * len(rows), dtype=bool)
+        wanted[[(row - rows.start) * len(cols) + col - cols.start for (col, row) in missing]] = True
+        tree, col, row = _get_tiles_touched(radius, x, y)
+        on_screen = (col >= cols.start) & (col < cols.stop) & (row >= rows.start) & (row < rows.stop)
+        tile = (row - rows.start) * len(cols) + col - cols.start
+        keep = on_screen & wanted[numpy.where(on_screen, tile, 0)]
+        tree, col, row, tile = tree[keep], col[keep], row[keep], tile[keep]
+
+        # A stable sort keeps each tile's trees in slot order, and is a radix sort for small types
+        order = numpy.argsort(tile.astype(numpy.int16) if len(wanted) < 2 ** 15 else tile, kind="stable")
+        tree, col, row, tile = tree[order], col[order], row[order], tile[order]
+        bounds = numpy.searchsorted(tile, numpy.arange(len(wanted) + 1)).tolist()
+        x, y, radius, species_index = x[tree] - col * TILE_SIZE, y[tree] - row * TILE_SIZE, radius[tree], species_index[tree]
+
+        circles = self.tiles_key[2]
+        if circles:
+            x, y, radius, species_index = x.tolist(), y.tolist(), radius.tolist(), species_index.tolist()
+        else:
+            atlas = self._get_atlas(colours)
+            sprites = (species_index * (MAX_SPRITE_RADIUS + 1) + radius).tolist()
+            left, top = (x - radius).tolist(), (y - radius).tolist()
+        transparent = _get_transparent(colours)
+        for (col, row) in missing:
+            i = (row - rows.start) * len(cols) + col - cols.start
+            start, end = bounds[i], bounds[i + 1]
+            if start == end:
+                self.tiles[(col, row)] = None
+                continue
+
+            surface = pygame.Surface((TILE_SIZE, TILE_SIZE)).convert(self.surface)
+            surface.fill(transparent)
+            if circles:
+                for j in range(start, end):
+                    pygame.draw.circle(surface, colours[species_index[j]], (x[j], y[j]), radius[j], 0)
+            else:
+                surface.blits(zip(map(atlas.__getitem__, sprites[start:end]), zip(left[start:end], top[start:end])),
+                              doreturn=False)
+            surface.set_colorkey(transparent, RLEACCEL)
+            self.tiles[(col, row)] = surface
 
-        for tree in forest.trees:
-            self._render_tree(tree)
+    def _get_background(self, forest):
+        """
+            The heightmap or slope map of the part of the forest's terrain seen by the camera, for
+            the current mode. Only the one for the current view is kept, since the view changes on
+            every frame while panning, and it is drawn again from the cached mip pyramid.
+        """
+        key = (self.mode, self.camera.view)
+        if self.background is None or self.background[0] != key or self.background[1] is not forest.terrain:
+            self.background = (key, forest.terrain, self._create_background(forest.terrain, self.mode))
 
-        pygame.display.update()
+        return self.background[2]
 
-    def _create_surface_from_2d_array(self, arr, f):
+    def _create_background(self, terrain, mode):
         """
-            Utility function to create a grey map from a 2d array of values between 0 and 1.
+            Draw the part of the terrain seen by the camera from the smallest level of its mip
+            pyramid which still has a pixel for every pixel on the screen.
         """
-        surface = pygame.Surface((self.width, self.height))
-        px_array = pygame.PixelArray(surface)
+        levels = self.cache.get(("pyramid", mode), lambda: self._create_pyramid(terrain, mode), owner=terrain)
+        level = levels[self.camera.get_mip_level(len(levels))]
+        scale_x, scale_y = level.get_width() / levels[0].get_width(), level.get_height() / levels[0].get_height()
 
-        try:
-            for row in range(self.height):
-                for col in range(self.width):
-                    if row >= len(arr) or col >= len(arr[0]):
-                        px_array[col, row] = pygame.Color(0, 0, 0)
-                    else:
-                        t = f(arr[row][col])
+        left, top, right, bottom = self.camera.get_world_rect()
+        left, top = max(0, int(math.floor(left * scale_x))), max(0, int(math.floor(top * scale_y)))
+        right, bottom = min(level.get_width(), int(math.ceil(right * scale_x))), min(level.get_height(), int(math.ceil(bottom * scale_y)))
 
-                        px_array[col, row] = pygame.Color(t, t, t)
-        finally:
-            del px_array
+        surface = pygame.Surface((self.width, self.height)).convert(self.surface)
+        surface.fill(pygame.Color(0, 0, 0))
+        if left < right and top < bottom:
+            rect = self._get_screen_rect(left / scale_x, top / scale_y, right / scale_x, bottom / scale_y)
+            area = level.subsurface((left, top, right - left, bottom - top))
+            if area.get_size() != rect.size:
+                area = pygame.transform.scale(area, rect.size)
+            surface.blit(area, rect)
 
         return surface
 
-    def _render_slopes(self, forest):
-        try:
-            surface = forest.terrain.cached_slope_map_surface
-        except AttributeError:
-            def f(x):
-                return int(min(255, x * 255 / 0.04))
+    def _create_pyramid(self, terrain, mode):
+        """
+            The heightmap or slope map of the whole terrain followed by copies of it, each half the
+            size of the one before, down to a single pixel.
+        """
+        if mode == SLOPE_MODE:
+            levels = [self._create_surface_from_2d_array(terrain.max_slope, 0.04)]
+        else:
+            levels = [self._create_surface_from_2d_array(terrain.normalized_points, 1)]
+
+        while levels[-1].get_width() > 1 or levels[-1].get_height() > 1:
+            width, height = levels[-1].get_size()
+            levels.append(pygame.transform.smoothscale(levels[-1], (max(1, width // 2), max(1, height // 2))))
+
+        return levels
 
-            surface = self._create_surface_from_2d_array(forest.terrain.max_slope, f)
-            forest.terrain.cached_slope_map_surface = surface
+    def _create_surface_from_2d_array(self, arr, maximum):
+        """
+            Utility function to create a grey map from a 2d array of values between 0 and maximum,
+            with a pixel for each value.
+
+            The grey level of every pixel is worked out in one go and the surface created from
+            those bytes with a grey palette, rather than setting each pixel individually.
+        """
+        height, width = len(arr), len(arr[0])
+        if numpy is not None:
+            values = numpy.asarray(arr, dtype=numpy.float64)
+            data = numpy.clip(values * 255 / maximum, 0, 255).astype(numpy.uint8).tobytes()
+        else:
+            data = b"".join(bytes(int(min(255, v * 255 / maximum)) for v in row) for row in arr)
+
+        surface = pygame.image.frombuffer(data, (width, height), "P")
+        surface.set_palette([(i, i, i) for i in range(256)])
+
+        return surface.convert(self.surface)
+
+    def _get_colours(self, trees):
+        return tuple(self.colours.get(species.name, DEFAULT_TREE_COLOUR) for species in trees.species)
 
-        self.surface.blit(surface, (0, 0))
+    def _is_drawing_circles(self, trees):
+        """
+            Whether trees are too big for the atlas at the current zoom, so are drawn as circles.
+        """
+        return round(max([species.max_size for species in trees.species], default=0) * self.camera.zoom) > MAX_SPRITE_RADIUS
 
-    def _render_terrain(self, forest):
-        try:
-            surface = forest.terrain.cached_normalized_points_surface
-        except AttributeError:
-            def f(x):
-                return int(x * 255)
+    def _get_atlas(self, colours):
+        """
+            The atlas of sprites for the colour of each species. Only the one for the current
+            colours is kept, since they only change when a species is added.
+        """
+        if self.atlas is None or self.atlas[0] != colours:
+            self.atlas = (colours, self._create_atlas(colours, self.surface))
+
+        return self.atlas[1]
+
+    def _render_trees(self, surface, trees, slots, origin):
+        """
+            Draw trees in slot order straight onto a surface with origin (see _get_origin) at its
+            top left, from the atlas of pre-rendered sprites with a single Surface.blits call unless
+            they're too big for it.
 
-            surface = self._create_surface_from_2d_array(forest.terrain.normalized_points, f)
-            forest.terrain.cached_normalized_points_surface = surface
+            Each tree is a circle of radius round(size * zoom) pixels, exactly as pygame.draw.circle
+            would draw it centred on the tree's pixel.
+        """
+        colours = self._get_colours(trees)
+        zoom = self.camera.zoom
+        left, top = origin
+        if self._is_drawing_circles(trees):
+            for slot in slots:
+                centre = (math.floor(trees.x[slot] * zoom) - left, math.floor(trees.y[slot] * zoom) - top)
+                pygame.draw.circle(surface, colours[trees.species_index[slot]], centre, round(trees.size[slot] * zoom), 0)
+            return
 
-        self.surface.blit(surface, (0, 0))
+        atlas = self._get_atlas(colours)
+        positions, sprites = [], []
+        for slot in slots:
+            r = round(trees.size[slot] * zoom)
+            positions.append((math.floor(trees.x[slot] * zoom) - left - r, math.floor(trees.y[slot] * zoom) - top - r))
+            sprites.append(trees.species_index[slot] * (MAX_SPRITE_RADIUS + 1) + r)
 
-    def _render_tree(self, tree):
-        color = Renderer._get_tree_color(tree)
-        pygame.draw.circle(self.surface, color, (tree.x, tree.y), round(tree.size), 0)
+        surface.blits(zip(map(atlas.__getitem__, sprites), positions), doreturn=False)
 
     @staticmethod
-    def _get_tree_color(tree):
-        r = tree.size / tree.species.max_size
-        alpha = int(255 - 255 * r)
-
-        if tree.species.name == "birch":
-            return pygame.Color(255, 0, 0, alpha)
-        elif tree.species.name == "oak":
-            return pygame.Color(0, 255, 0, alpha)
-        else:
-            return pygame.Color(0, 0, 0, alpha)
+    def _create_atlas(colours, target):
+        """
+            A sprite of a circle of every radius up to MAX_SPRITE_RADIUS in the colour of each
+            species, with the circle of radius r for species i at index i * (MAX_SPRITE_RADIUS + 1)
+            + r. Everything but the circle is transparent.
+
+            Each sprite is its own run length encoded surface rather than an area of one big
+            surface, since SDL blits those fastest.
+        """
+        transparent = _get_transparent(colours)
+        atlas = []
+        for colour in colours:
+            for radius in range(MAX_SPRITE_RADIUS + 1):
+                sprite = pygame.Surface((2 * radius + 1, 2 * radius + 1)).convert(target)
+                sprite.fill(transparent)
+                pygame.draw.circle(sprite, colour, (radius, radius), radius, 0)
+                sprite.set_colorkey(transparent, RLEACCEL)
+                atlas.append(sprite)
+
+        return atlas
+
+
+def _get_transparent(colours):
+    """
+        A colour which no species is drawn in, for the colour key of sprites and tiles.
+    """
+    return next(c for c in ((255, 0, 255), (0, 255, 255), (255, 255, 0)) if c not in colours)
+
+
+def _get_tiles_touched(radius, x, y):
+    """
+        The tiles touched by trees of a radius drawn at a pixel, as arrays of the index of the tree
+        and the column and row of each tile it touches, in the order of the trees.
+    """
+    if len(x) == 0:
+        return (numpy.zeros(0, dtype=numpy.int64),) * 3
+
+    col0, row0 = (x - radius) // TILE_SIZE, (y - radius) // TILE_SIZE
+    cols, rows = (x + radius) // TILE_SIZE - col0, (y + radius) // TILE_SIZE - row0
+
+    # Most trees are in a single tile, so those which reach into each further tile are added after
+    # them and a stable sort by tree, which merges the runs, puts the tiles back in tree order
+    trees, touched_cols, touched_rows = [numpy.arange(len(x))], [col0], [row0]
+    for dy in range(int(rows.max()) + 1):
+        for dx in range(int(cols.max()) + 1):
+            if dx or dy:
+                reaching = numpy.flatnonzero((cols >= dx) & (rows >= dy))
+                trees.append(reaching)
+                touched_cols.append(col0[reaching] + dx)
+                touched_rows.append(row0[reaching] + dy)
+    order = numpy.argsort(numpy.concatenate(trees), kind="stable")
+
+    return tuple(numpy.concatenate(values)[order] for values in (trees, touched_cols, touched_rows))
 
 
 class ImageCache:
-    def __init__(self):
-        self.cache = {}
+    def __init__(self, cache=None):
+        self.cache = RenderCache() if cache is None else cache
 
     def get_image(self, image_location):
-        if image_location not in self.cache.keys:
-            self.cache[image_location] = pygame.image.load(image_location)
-
-        return self.cache[image_location]
+        return self.cache.get(("image", image_location), lambda: pygame.image.load(image_location))
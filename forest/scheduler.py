@@ -0,0 +1,262 @@
+import heapq
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MATURE = 0
+OVERLAP = 1
+
+
+class EventScheduler:
+    """
+        Used by Forest.advance to jump over the ticks on which nothing happens other than the
+        trees growing.
+
+        Whichever engine is used, a tick only does anything more than grow every tree if a tree is
+        mature (mature trees spread seeds on every tick, so a mature tree's next seed burst is
+        always the next tick) or two trees overlap. Both only depend on how the trees grow until
+        then, so a priority queue of the tick on which each tree will mature and each pair of
+        nearby trees will begin to overlap gives the next tick which has to be iterated. The ticks
+        before it are skipped by growing each tree to the size it would have reached.
+
+        The tick of each event is found in closed form from the sizes and growth rates. Since
+        adding growth_rate k times doesn't always give exactly the same float as adding
+        k * growth_rate, each is rounded down a tick so that it is never later than the real
+        event. Iterating a tick on which nothing turns out to happen is harmless, and the skipped
+        ticks themselves grow the trees one growth at a time exactly as iterate would.
+
+        After a tick is iterated only the events of the trees which did something other than grow
+        (were added, removed or absorbed another tree) are worked out again. Each slot has a stamp
+        which changes when that happens and events for an earlier stamp are discarded when they
+        reach the front of the queue.
+    """
+
+    def __init__(self, forest):
+        self.forest = forest
+        self.events = None
+        self.stamps = {}
+        self.version = None
+
+    def advance(self, n):
+        forest = self.forest
+        end = forest.tick + n
+        while forest.tick < end:
+            next_event = self.get_next_event()
+            quiet = (end if next_event is None else min(next_event, end)) - forest.tick - 1
+            if quiet > 0:
+                self._grow(quiet)
+                forest.tick += quiet
+                self.version = self._get_version()
+
+            if forest.tick < end:
+                before = _copy_state(forest.trees)
+                forest.iterate()
+                self._update(before)
+
+    def get_next_event(self):
+        """
+            The earliest tick on which something other than growth could happen, or None if
+            nothing ever will.
+        """
+        if self.events is None or self.version != self._get_version():
+            self._create_events()
+
+        events = self.events
+        while events and not self._is_current(events[0]):
+            heapq.heappop(events)
+
+        return events[0][0] if events else None
+
+    def _get_version(self):
+        """
+            Changes if the forest is changed other than by advance, e.g. by iterate, add_tree or
+            setting a tree's size. It is taken again after advance's own changes to the trees.
+        """
+        store = self.forest.trees
+
+        return store, store.version, store.next_uid, len(store), self.forest.tick
+
+    def _is_current(self, event):
+        _, _, slots, stamps = event
+
+        return all(self.stamps.get(slot, 0) == stamp for (slot, stamp) in zip(slots, stamps))
+
+    def _push(self, ticks, kind, slots):
+        if ticks is not None:
+            heapq.heappush(self.events, (self.forest.tick + ticks, kind, slots,
+                                         tuple(self.stamps.get(slot, 0) for slot in slots)))
+
+    def _create_events(self):
+        store = self.forest.trees
+        self.events = []
+        self.stamps = {}
+        for slot in range(len(store.species_index)):
+            if store.species_index[slot] >= 0:
+                self._schedule(slot)
+        self.version = self._get_version()
+
+    def _schedule(self, a, skip=()):
+        """
+            Add the events for a tree: when it will mature and when it will overlap each of the
+            trees near it, other than those in skip.
+        """
+        forest = self.forest
+        store = forest.trees
+        self._push(self._get_ticks_to_mature(a), MATURE, (a,))
+
+        reach = store.species[store.species_index[a]].max_size + forest.max_tree_size
+        for b in forest.get_index().query(store.x[a], store.y[a], reach):
+            if b != a and b not in skip:
+                pair = (a, b) if a < b else (b, a)
+                self._push(self._get_ticks_to_overlap(*pair), OVERLAP, pair)
+
+    def _update(self, before):
+        """
+            Bring the queue up to date after a tick has been iterated.
+        """
+        forest = self.forest
+        changed = _get_changed(before, forest.trees)
+        for slot in changed:
+            self.stamps[slot] = self.stamps.get(slot, 0) + 1
+
+        # The events which were due and still apply happen later than the bound first given
+        events = self.events
+        while events and events[0][0] <= forest.tick:
+            event = heapq.heappop(events)
+            if self._is_current(event):
+                _, kind, slots, _ = event
+                ticks = self._get_ticks_to_mature(*slots) if kind == MATURE else self._get_ticks_to_overlap(*slots)
+                self._push(ticks, kind, slots)
+
+        scheduled = set()
+        for slot in changed:
+            if forest.trees.species_index[slot] >= 0:
+                self._schedule(slot, scheduled)
+                scheduled.add(slot)
+
+        self.version = self._get_version()
+
+    def _get_ticks_to_mature(self, slot):
+        """
+            A number of ticks which is no more than it will take the tree to mature, or None if it
+            never will.
+        """
+        store = self.forest.trees
+        species = store.species[store.species_index[slot]]
+        size = store.size[slot]
+        if size >= species.max_size:
+            return 1
+        if species.growth_rate <= 0:
+            return None
+
+        return max(1, int((species.max_size - size) / species.growth_rate) - 1)
+
+    def _get_ticks_to_overlap(self, a, b):
+        """
+            A number of ticks which is no more than it will take two trees to overlap, by the same
+            test as Tree.overlapping, or None if they never will.
+        """
+        store = self.forest.trees
+        first, second = store.species[store.species_index[a]], store.species[store.species_index[b]]
+        d = math.sqrt(math.pow(store.x[a] - store.x[b], 2) + math.pow(store.y[a] - store.y[b], 2))
+        size = store.size[a] + store.size[b]
+        if d <= size:
+            return 1
+        if d > max(first.max_size, store.size[a]) + max(second.max_size, store.size[b]):
+            return None
+        if first.growth_rate + second.growth_rate <= 0:
+            return None
+
+        # Neither tree can grow by more than its growth rate on each tick
+        return max(1, int((d - size) / (first.growth_rate + second.growth_rate)) - 1)
+
+    def _grow(self, ticks):
+        """
+            Grow every tree as it would over a number of ticks on which nothing else happens,
+            computing min(size + growth_rate, max_size) once per tick exactly as Tree.grow does.
+        """
+        store = self.forest.trees
+        if numpy is not None:
+            species_index = numpy.frombuffer(store.species_index, dtype=numpy.int16)
+            live = numpy.flatnonzero(species_index >= 0)
+            growth_rate, max_size = _get_growth(store)
+            growth_rate, max_size = growth_rate[species_index[live]], max_size[species_index[live]]
+            size = numpy.frombuffer(store.size)[live]
+            for _ in range(ticks):
+                growing = size != max_size
+                if not growing.any():
+                    break
+                size[growing] = numpy.minimum(size[growing] + growth_rate[growing], max_size[growing])
+            numpy.frombuffer(store.size)[live] = size
+            store.changed()
+
+            return
+
+        size = store.size
+        for slot in range(len(store.species_index)):
+            if store.species_index[slot] < 0:
+                continue
+
+            species = store.species[store.species_index[slot]]
+            s = size[slot]
+            for _ in range(ticks):
+                if s == species.max_size:
+                    break
+                s = min(s + species.growth_rate, species.max_size)
+            size[slot] = s
+        store.changed()
+
+
+def _copy_state(store):
+    return store.uid[:], store.size[:], store.species_index[:]
+
+
+def _get_changed(before, store):
+    """
+        The slots which have had a tree added or removed since the state was copied, or whose
+        tree's size is other than growing once would have made it.
+    """
+    old_uid, old_size, old_species_index = before
+    slots = len(store.species_index)
+    if numpy is not None:
+        old_alive, new_alive = _pad(old_species_index, slots, -1) >= 0, _pad(store.species_index, slots, -1) >= 0
+        species_index = numpy.frombuffer(store.species_index, dtype=numpy.int16)
+        growth_rate, max_size = _get_growth(store)
+        grown = numpy.minimum(_pad(old_size, slots, 0) + growth_rate[species_index], max_size[species_index])
+        same = old_alive & new_alive & (_pad(old_uid, slots, -1) == numpy.frombuffer(store.uid, dtype=numpy.int64))
+        same &= numpy.frombuffer(store.size) == grown
+
+        return numpy.flatnonzero((old_alive | new_alive) & ~same).tolist()
+
+    changed = []
+    for slot in range(slots):
+        old_alive = slot < len(old_uid) and old_species_index[slot] >= 0
+        new_alive = store.species_index[slot] >= 0
+        if not old_alive and not new_alive:
+            continue
+        if old_alive and new_alive and old_uid[slot] == store.uid[slot]:
+            species = store.species[store.species_index[slot]]
+            if store.size[slot] == min(old_size[slot] + species.growth_rate, species.max_size):
+                continue
+        changed.append(slot)
+
+    return changed
+
+
+def _get_growth(store):
+    """
+        The growth rate and max size of each species, with an extra entry at the end for the
+        species index -1 of an empty slot.
+    """
+    return (numpy.array([s.growth_rate for s in store.species] + [0.0], dtype=numpy.float64),
+            numpy.array([s.max_size for s in store.species] + [0.0], dtype=numpy.float64))
+
+
+def _pad(values, length, empty):
+    a = numpy.full(length, empty, dtype=values.typecode)
+    a[:len(values)] = numpy.frombuffer(values, dtype=values.typecode)
+
+    return a
@@ -0,0 +1,144 @@
+import json
+import multiprocessing
+import os
+import time
+from forest import forestfile
+from forest.forest import Forest, SCALAR_ENGINE, PARALLEL_ENGINE
+from forest.stats import IterationStats
+from forest.terrain import TerrainGenerator
+from forest.terraincache import TerrainCache
+from forest.tree import Tree
+from forest.treespecies import TreeSpecies
+
+
+def create_base_forest(seed, width, height, cache_dir=None, engine=SCALAR_ENGINE, processes=None):
+    """
+        Placeholder for creating the base forest until I decide how to tie that in.
+
+        If a cache directory is given then the terrain is loaded from there when it has been
+        generated before.
+    """
+    if cache_dir is None:
+        terrain = TerrainGenerator(seed).generate(width, height)
+    else:
+        terrain = TerrainCache(cache_dir).get_or_generate(seed, width, height)
+    forest = Forest(seed, terrain, width, height, engine=engine, processes=processes)
+
+    oak = TreeSpecies("oak", 0.1, 10, 1, 0.2, 100, 5, 0.030)
+    birch = TreeSpecies("birch", 0.3, 5, 1, 0.2, 30, 5, 0.033)
+    pine = TreeSpecies("pine", 0.2, 6, 1, 0.1, 50, 3, 0.05)
+    r = forest.create_random("placement")
+    for i in range(0, 2):
+        forest.add_tree(Tree(birch, r.randint(0, width - 1), r.randint(0, height - 1)))
+
+    for i in range(0, 4):
+        forest.add_tree(Tree(pine, r.randint(0, width - 1), r.randint(0, height - 1)))
+
+    for i in range(0, 4):
+        forest.add_tree(Tree(oak, r.randint(0, width - 1), r.randint(0, height - 1)))
+
+    return forest
+
+
+def simulate(seed, width, height, iterations, output_dir=None, cache_dir=None, engine=SCALAR_ENGINE,
+             snapshot_dir=None, stats_dir=None, processes=None):
+    """
+        Create the base forest for a seed and run it for a number of iterations as fast as
+        possible, without any display.
+
+        Returns a dict describing the run including how long it took. If an output directory is
+        given the final forest is written there as forest_<seed>.json.
+
+        If a snapshot directory is given the final forest is saved there and a later run for the
+        same seed and size resumes from it, only running the iterations it hasn't already done.
+
+        If a stats directory is given the time taken by each phase of every iteration is written
+        there as stats_<seed>.jsonl and the totals are included in the result.
+
+        processes is the number of processes used by the parallel engine, one per CPU by default.
+    """
+    start = time.perf_counter()
+    snapshot = None
+    if snapshot_dir is not None:
+        snapshot = os.path.join(snapshot_dir, "forest_%s_%dx%d_%s.bin" % (seed, width, height, engine))
+
+    if snapshot is not None and os.path.exists(snapshot):
+        forest = forestfile.load(snapshot, cache_dir=cache_dir, processes=processes)
+    else:
+        forest = create_base_forest(seed, width, height, cache_dir, engine, processes)
+    try:
+        created = time.perf_counter()
+
+        sink = None
+        if stats_dir is not None:
+            sink = open(os.path.join(stats_dir, "stats_%s.jsonl" % seed), "w")
+            forest.stats = IterationStats(sink)
+
+        try:
+            forest.advance(max(0, iterations - forest.tick))
+        finally:
+            if sink is not None:
+                sink.close()
+        finished = time.perf_counter()
+
+        result = {
+            "seed": seed,
+            "width": width,
+            "height": height,
+            "iterations": iterations,
+            "trees": len(forest.trees),
+            "setup_time": created - start,
+            "simulation_time": finished - created,
+        }
+
+        if output_dir is not None:
+            result["output"] = os.path.join(output_dir, "forest_%s.json" % seed)
+            write_forest(forest, result["output"])
+
+        if forest.stats is not None:
+            result["stats"] = forest.stats.totals
+
+        if snapshot is not None:
+            forestfile.save(forest, snapshot)
+
+        return result
+    finally:
+        if forest.engine_name == PARALLEL_ENGINE:
+            forest.engine.close()
+
+
+def simulate_many(seeds, width, height, iterations, processes=None, output_dir=None, cache_dir=None,
+                  engine=SCALAR_ENGINE, snapshot_dir=None, stats_dir=None):
+    """
+        Simulate one forest per seed, spread over a pool of processes (one per CPU by default).
+
+        Yields the result of each run, as returned by simulate, as soon as it completes so the
+        results won't necessarily be in the same order as the seeds.
+    """
+    for directory in (output_dir, snapshot_dir, stats_dir):
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    args = [(seed, width, height, iterations, output_dir, cache_dir, engine, snapshot_dir, stats_dir) for seed in seeds]
+    with multiprocessing.Pool(processes) as pool:
+        for result in pool.imap_unordered(_simulate, args):
+            yield result
+
+
+def _simulate(args):
+    # Pool workers are daemonic so can't start the parallel engine's own pool of processes
+    return simulate(*args, processes=1)
+
+
+def write_forest(forest, path):
+    """
+        Write the trees in a forest out as json, one [species, x, y, size] list per tree.
+    """
+    with open(path, "w") as f:
+        json.dump({
+            "seed": forest.random_seed,
+            "width": forest.width,
+            "height": forest.height,
+            "tick": forest.tick,
+            "trees": [[tree.species.name, tree.x, tree.y, tree.size] for tree in forest.trees],
+        }, f)
@@ -0,0 +1,75 @@
+import threading
+import time
+
+
+class SimulationThread(threading.Thread):
+    """
+        Iterates a forest on a background thread so that a slow iteration doesn't hold up
+        rendering and input handling, and a slow frame doesn't hold up the simulation.
+
+        After every iteration an immutable snapshot of the forest is published as latest, which the
+        renderer can draw at whatever frame rate it likes. The forest itself should not be touched
+        by any other thread while this is running.
+
+        If an iteration fails the thread stops and the error is raised from latest and stop.
+    """
+
+    def __init__(self, forest, ticks_per_second=None):
+        """
+            Iterates at most ticks_per_second times a second, or as fast as possible if None.
+        """
+        super().__init__(daemon=True)
+        self.forest = forest
+        self.ticks_per_second = ticks_per_second
+        self._latest = forest.snapshot()
+        self.error = None
+        self.running = threading.Event()
+        self.running.set()
+        self.stopped = threading.Event()
+
+    @property
+    def latest(self):
+        self._raise_error()
+
+        return self._latest
+
+    @property
+    def paused(self):
+        return not self.running.is_set()
+
+    def pause(self):
+        self.running.clear()
+
+    def resume(self):
+        self.running.set()
+
+    def stop(self):
+        """
+            Stop the thread after the current iteration and wait for it to finish.
+        """
+        self.stopped.set()
+        self.running.set()
+        if self.is_alive():
+            self.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise RuntimeError("The simulation failed") from self.error
+
+    def run(self):
+        next_tick = time.perf_counter()
+        try:
+            while not self.stopped.is_set():
+                self.running.wait()
+                if self.stopped.is_set():
+                    break
+
+                self.forest.iterate()
+                self._latest = self.forest.snapshot()
+
+                if self.ticks_per_second:
+                    next_tick = max(next_tick + 1.0 / self.ticks_per_second, time.perf_counter() - 1.0)
+                    self.stopped.wait(max(0.0, next_tick - time.perf_counter()))
+        except BaseException as e:
+            self.error = e
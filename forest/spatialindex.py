@@ -0,0 +1,72 @@
+import math
+from array import array
+
+
+class SpatialIndex:
+    """
+        A uniform grid over the forest used to find the trees near a point.
+
+        Rather than a list per cell, the slots of the trees in a TreeStore are stored in a single
+        flat array ordered by cell along with the offset at which each cell's trees start, so
+        building the index creates two objects regardless of the number of cells. The index is
+        immutable, the forest builds a new one when its trees change.
+    """
+
+    def __init__(self, width, height, cell_size, store):
+        self.width = width
+        self.height = height
+        self.cell_size = cell_size
+        self.rows = int(math.ceil(height / cell_size))
+        self.cols = int(math.ceil(width / cell_size))
+
+        self.x = store.x
+        self.y = store.y
+
+        # Counting sort of the trees by the cell they're in
+        slots = [slot for slot in range(len(store.species_index)) if store.species_index[slot] >= 0]
+        cells = [self.get_cell_index(self.x[slot], self.y[slot]) for slot in slots]
+        self.cell_start = array("l", [0] * (self.rows * self.cols + 1))
+        for cell in cells:
+            self.cell_start[cell + 1] += 1
+        for cell in range(len(self.cell_start) - 1):
+            self.cell_start[cell + 1] += self.cell_start[cell]
+
+        self.slots = array("l", [0] * len(cells))
+        position = self.cell_start[:-1]
+        for (slot, cell) in zip(slots, cells):
+            self.slots[position[cell]] = slot
+            position[cell] += 1
+
+    def get_cell_index(self, x, y):
+        return int(y / self.cell_size) * self.cols + int(x / self.cell_size)
+
+    def get_cell(self, row, col):
+        """
+            Get the slots of the trees which begin in a single cell.
+        """
+        cell = row * self.cols + col
+
+        return self.slots[self.cell_start[cell]:self.cell_start[cell + 1]].tolist()
+
+    def query(self, x, y, radius):
+        """
+            Get the slots of all the trees which begin within radius of a point, ordered by their
+            distance from it (nearest first). Trees at the same distance are returned in a
+            consistent order.
+        """
+        min_col, max_col = max(0, int((x - radius) / self.cell_size)), min(self.cols - 1, int((x + radius) / self.cell_size))
+        min_row, max_row = max(0, int((y - radius) / self.cell_size)), min(self.rows - 1, int((y + radius) / self.cell_size))
+        r2 = radius * radius
+
+        candidates = []
+        for row in range(min_row, max_row + 1):
+            start, end = self.cell_start[row * self.cols + min_col], self.cell_start[row * self.cols + max_col + 1]
+            for slot in self.slots[start:end]:
+                dx, dy = self.x[slot] - x, self.y[slot] - y
+                d2 = dx * dx + dy * dy
+                if d2 <= r2:
+                    candidates.append((d2, slot))
+
+        candidates.sort()
+
+        return [slot for (_, slot) in candidates]
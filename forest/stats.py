@@ -0,0 +1,87 @@
+import json
+import time
+
+PHASES = ("grow", "collisions", "seeds", "bookkeeping")
+COUNTERS = ("neighbour_candidates", "overlap_tests", "seeds_attempted", "seeds_outside", "seeds_too_steep",
+            "seeds_too_close", "trees_added", "trees_removed")
+
+
+class IterationStats:
+    """
+        Collects how long each phase of Forest.iterate takes and how much work it does, per tick.
+        Set forest.stats to an instance to start collecting, while it is None the forest doesn't
+        time or count anything.
+
+        The time taken by each phase is in seconds. The phases of the scalar engine are
+        interleaved tree by tree, so the time spent in each is summed over all the trees.
+
+        If a sink is given each tick is written to it as a line of json as soon as it finishes.
+    """
+
+    def __init__(self, sink=None):
+        self.sink = sink
+        self.ticks = 0
+        self.totals = _create_record()
+        self.latest = None
+        self.current = None
+        self.last = None
+
+    def start(self, tick):
+        self.current = _create_record()
+        self.current["tick"] = tick
+        self.last = time.perf_counter()
+
+    def lap(self, phase):
+        """
+            Add the time since the last lap (or the start of the tick) to a phase.
+        """
+        now = time.perf_counter()
+        self.current[phase] += now - self.last
+        self.last = now
+
+    def count(self, counter, n=1):
+        self.current[counter] += n
+
+    def add(self, name, value):
+        """
+            Add a time or count measured elsewhere, e.g. by a worker process, to a phase or
+            counter. The time since the last lap was spent waiting for it so is dropped.
+        """
+        self.current[name] += value
+        self.last = time.perf_counter()
+
+    def finish(self):
+        record = self.current
+        record["total"] = sum(record[phase] for phase in PHASES)
+        for (key, value) in record.items():
+            if key != "tick":
+                self.totals[key] += value
+        self.ticks += 1
+        self.latest = record
+        self.current = None
+
+        if self.sink is not None:
+            self.sink.write(json.dumps(record) + "\n")
+
+    def mean(self):
+        """
+            The average of each phase and counter over every tick so far.
+        """
+        return {key: value / max(1, self.ticks) for (key, value) in self.totals.items() if key != "tick"}
+
+    def __str__(self):
+        lines = ["%d ticks" % self.ticks]
+        for phase in PHASES + ("total",):
+            lines.append("%-22s %10.3fms per tick" % (phase, 1000 * self.totals[phase] / max(1, self.ticks)))
+        for counter in COUNTERS:
+            lines.append("%-22s %10d" % (counter, self.totals[counter]))
+
+        return "\n".join(lines)
+
+
+def _create_record():
+    record = {"tick": None, "total": 0.0}
+    record.update((phase, 0.0) for phase in PHASES)
+    record.update((counter, 0) for counter in COUNTERS)
+
+    return record
@@ -1,6 +1,14 @@
 import itertools
 import math
+import multiprocessing
+import os
 import random
+import tempfile
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 grad = [(1, 1, 0), (-1, 1, 0), (1, -1, 0), (-1, -1, 0),
@@ -9,24 +17,59 @@ grad = [(1, 1, 0), (-1, 1, 0), (1, -1, 0), (-1, -1, 0),
 F = 0.5 * (math.sqrt(3) - 1.0)
 G = (3.0 - math.sqrt(3)) / 6.0
 
+# Changes whenever a change to the generation algorithm means a seed no longer gives the same
+# terrain, so that anything stored from an earlier version can be detected.
+ALGORITHM_VERSION = 1
+
+# Number of rows generated per batch by the array backend. Bounds the size of the temporary
+# arrays so that very large maps don't need several full size copies of the grid in memory.
+BATCH_ROWS = 256
+
+# Where the buffers shared between terrain generation worker processes are created. Files in
+# /dev/shm are only ever held in memory.
+SHARED_MEMORY_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+# The (column, row) offsets of the neighbours which are considered when calculating the slope at a
+# point.
+SLOPE_NEIGHBOURS = [(i, j) for (i, j) in itertools.combinations_with_replacement([-1, 0, 1], 2)
+                    if not i == 0 == j]
+
 
 class Terrain:
+    """
+        Holds the height of every point on the map along with the values derived from it.
+
+        With numpy installed each layer is a single contiguous float64 array rather than a list of
+        lists of floats. Both support the same terrain.max_slope[y][x] style access.
+
+        Terrain created by a TerrainGenerator records the generator's seed so it can be generated
+        again, it is None otherwise.
+    """
 
-    def __init__(self, points):
-        self.points = points
-        self.normalized_points = [[1.0 - (x + 1.0) / 2.0 for x in row] for row in self.points]
-        self.max_slope = [[0.0 for _ in row] for row in self.points]
-        self._calculate_max_slopes()
+    def __init__(self, points, max_slope=None, normalized_points=None, seed=None):
+        self.seed = seed
+        if numpy is None:
+            self.points = points
+            self.normalized_points = [[1.0 - (x + 1.0) / 2.0 for x in row] for row in self.points]
+            self.max_slope = [[0.0 for _ in row] for row in self.points]
+            self._calculate_max_slopes()
+        else:
+            self.points = numpy.ascontiguousarray(points, dtype=numpy.float64)
+            if normalized_points is None:
+                self.normalized_points = 1.0 - (self.points + 1.0) / 2.0
+            else:
+                self.normalized_points = numpy.ascontiguousarray(normalized_points, dtype=numpy.float64)
+            if max_slope is None:
+                self.max_slope = calculate_max_slopes(self.points)
+            else:
+                self.max_slope = numpy.ascontiguousarray(max_slope, dtype=numpy.float64)
 
     def _calculate_max_slopes(self):
         for row in range(len(self.points)):
             for col in range(len(self.points[0])):
                 max_slope = 0.0
 
-                for (i, j) in itertools.combinations_with_replacement([-1, 0, 1], 2):
-                    if i == 0 == j:
-                        continue
-
+                for (i, j) in SLOPE_NEIGHBOURS:
                     x = col + i
                     y = row + j
 
@@ -37,6 +80,28 @@ class Terrain:
                 self.max_slope[row][col] = max_slope
 
 
+def calculate_max_slopes(points):
+    """
+        Array version of Terrain._calculate_max_slopes. Rather than visiting each neighbour of each
+        point in turn, the whole grid is compared against a shifted copy of itself once for each
+        neighbour offset.
+
+        Points on the edge of the array only consider the neighbours which exist, exactly as the
+        scalar version does.
+    """
+    height, width = points.shape
+    max_slope = numpy.zeros((height, width))
+
+    for (i, j) in SLOPE_NEIGHBOURS:
+        rows = slice(max(0, -j), min(height, height - j))
+        cols = slice(max(0, -i), min(width, width - i))
+        neighbours = points[max(0, j):min(height, height + j), max(0, i):min(width, width + i)]
+
+        numpy.maximum(max_slope[rows, cols], points[rows, cols] - neighbours, out=max_slope[rows, cols])
+
+    return max_slope
+
+
 class TerrainGenerator:
     """
         This is a basic Simplex Noise generation algorithm based on the reference implementation
@@ -45,25 +110,137 @@ class TerrainGenerator:
 
         Rewritten in pure python to remove dependency on c++ compiler required when attempting to
         install the noise library.
+
+        When numpy is installed the whole grid is generated with array operations instead, which
+        gives bit for bit the same values as the pure python path since the floating point
+        operations are performed in exactly the same order.
     """
 
     def __init__(self, seed):
         self.seed = seed
-        random.seed(seed)
+        self.random = random.Random(seed)
         self._randomize_permutation_table()
 
-    def generate(self, width, height):
+    def generate(self, width, height, workers=1):
         """
             Generate an entire 2d map of simplex noise based on the permutation table which was
             created when the class was instantiated.
+
+            If numpy is installed then passing workers > 1 splits the map into bands of rows which
+            are generated by a pool of that many processes.
         """
-        r = [[0.0 for _ in range(width)] for _ in range(height)]
         f = 3.0 / max(height, width)
-        for row in range(height):
-            for col in range(width):
-                r[row][col] = self._generate_point(col * f, row * f)
 
-        return Terrain(r)
+        if numpy is not None and workers > 1:
+            return self._generate_parallel(width, height, workers)
+        elif numpy is None:
+            r = [[0.0 for _ in range(width)] for _ in range(height)]
+            for row in range(height):
+                for col in range(width):
+                    r[row][col] = self._generate_point(col * f, row * f)
+        else:
+            r = numpy.empty((height, width))
+            for row in range(0, height, BATCH_ROWS):
+                rows = min(BATCH_ROWS, height - row)
+                r[row:row + rows] = self._generate_block(0, row, width, rows, f)
+
+        return Terrain(r, seed=self.seed)
+
+    def _generate_parallel(self, width, height, workers):
+        """
+            Generate the map in a process pool. The workers write their bands of points and then
+            max slopes directly into memory mapped files which become the arrays in the returned
+            Terrain, so nothing is copied back to this process.
+
+            The permutation table is sent to each worker once when the pool starts rather than
+            with every band.
+        """
+        bands = [(row, min(BATCH_ROWS, height - row)) for row in range(0, height, BATCH_ROWS)]
+
+        with tempfile.TemporaryDirectory(dir=SHARED_MEMORY_DIR, ignore_cleanup_errors=True) as directory:
+            points_path = os.path.join(directory, "points")
+            max_slope_path = os.path.join(directory, "max_slope")
+            points = numpy.memmap(points_path, dtype=numpy.float64, mode="w+", shape=(height, width))
+            max_slope = numpy.memmap(max_slope_path, dtype=numpy.float64, mode="w+", shape=(height, width))
+
+            with multiprocessing.Pool(workers, initializer=_init_worker,
+                                      initargs=(self.permutation_table, points_path, max_slope_path, width, height)) as pool:
+                pool.starmap(_generate_band, bands)
+                pool.starmap(_max_slope_band, bands)
+
+        return Terrain(points, max_slope, seed=self.seed)
+
+    def generate_tile(self, tx, ty, tile_size, width, height):
+        """
+            Generate a single tile_size x tile_size tile of a width x height map, tiles on the
+            bottom and right edges are cropped to the map.
+
+            The noise is scaled by the size of the whole map and the max slope is calculated using a
+            one pixel halo around the tile so a tile is identical to the same region of the map
+            returned by generate. Requires numpy.
+        """
+        col, row = tx * tile_size, ty * tile_size
+        if tx < 0 or ty < 0 or col >= width or row >= height:
+            raise ValueError("Tile (%d, %d) is outside of a %dx%d map" % (tx, ty, width, height))
+
+        cols, rows = min(tile_size, width - col), min(tile_size, height - row)
+        left, top = min(col, 1), min(row, 1)
+        right, bottom = min(width - col - cols, 1), min(height - row - rows, 1)
+
+        block = self._generate_block(col - left, row - top, cols + left + right, rows + top + bottom,
+                                     3.0 / max(height, width))
+        max_slope = calculate_max_slopes(block)
+
+        return Terrain(block[top:top + rows, left:left + cols], max_slope[top:top + rows, left:left + cols])
+
+    def _generate_block(self, col, row, width, height, f):
+        """
+            Array version of _generate_point which generates a width x height block of simplex
+            noise with its top left corner at (col, row) in a single batched pass.
+
+            Every operation mirrors the scalar implementation so the results are identical.
+        """
+        x = (numpy.arange(col, col + width) * f)[numpy.newaxis, :]
+        y = (numpy.arange(row, row + height) * f)[:, numpy.newaxis]
+
+        s = (x + y) * F
+        i = (x + s).astype(numpy.int64)  # Truncate like int(), coordinates are never negative
+        j = (y + s).astype(numpy.int64)
+
+        t = (i + j) * G
+        x0, y0 = x - i + t, y - j + t
+
+        i1 = (x0 > y0).astype(numpy.int64)
+        j1 = 1 - i1
+
+        x1 = x0 - i1 + G
+        y1 = y0 - j1 + G
+        x2 = x0 - 1.0 + 2.0 * G
+        y2 = y0 - 1.0 + 2.0 * G
+
+        p = numpy.array(self.permutation_table)
+        p_mod_12 = numpy.array(self.permutation_table_mod_12)
+        ii, jj = i & 255, j & 255
+        gi0 = p_mod_12[ii + p[jj]]
+        gi1 = p_mod_12[ii + i1 + p[jj + j1]]
+        gi2 = p_mod_12[ii + 1 + p[jj + 1]]
+
+        return 70.0 * (self._corner(gi0, x0, y0) + self._corner(gi1, x1, y1) + self._corner(gi2, x2, y2))
+
+    @staticmethod
+    def _corner(gi, x, y):
+        """
+            The contribution of a single simplex corner to every point in a block, zero where the
+            point lies outside of the corner's radius.
+        """
+        grad_x = numpy.array([g[0] for g in grad], dtype=numpy.float64)
+        grad_y = numpy.array([g[1] for g in grad], dtype=numpy.float64)
+
+        t = 0.5 - x * x - y * y
+        t2 = t * t
+        n = t2 * t2 * (grad_x[gi] * x + grad_y[gi] * y)
+
+        return numpy.where(t < 0, 0.0, n)
 
     def _generate_point(self, x, y):
         """
@@ -120,6 +297,37 @@ class TerrainGenerator:
             table. This function randomizes the table given the passed in seed.
         """
         p = list(range(256))
-        random.shuffle(p)
+        self.random.shuffle(p)
         self.permutation_table = p * 2
         self.permutation_table_mod_12 = [x % 12 for x in self.permutation_table]
+
+
+# State for each process in the pool used by TerrainGenerator._generate_parallel, set up once per
+# process by _init_worker.
+_worker = {}
+
+
+def _init_worker(permutation_table, points_path, max_slope_path, width, height):
+    generator = TerrainGenerator.__new__(TerrainGenerator)
+    generator.permutation_table = permutation_table
+    generator.permutation_table_mod_12 = [x % 12 for x in permutation_table]
+
+    _worker["generator"] = generator
+    _worker["points"] = numpy.memmap(points_path, dtype=numpy.float64, mode="r+", shape=(height, width))
+    _worker["max_slope"] = numpy.memmap(max_slope_path, dtype=numpy.float64, mode="r+", shape=(height, width))
+
+
+def _generate_band(row, rows):
+    points = _worker["points"]
+    height, width = points.shape
+    points[row:row + rows] = _worker["generator"]._generate_block(0, row, width, rows, 3.0 / max(height, width))
+
+
+def _max_slope_band(row, rows):
+    """
+        Calculates the max slope for a band of rows, including the rows either side of it so that
+        the result is the same as calculating it for the whole map at once.
+    """
+    points = _worker["points"]
+    top, bottom = min(row, 1), min(len(points) - row - rows, 1)
+    _worker["max_slope"][row:row + rows] = calculate_max_slopes(points[row - top:row + rows + bottom])[top:top + rows]
@@ -0,0 +1,145 @@
+import os
+import re
+import struct
+import tempfile
+import zlib
+from forest import terrain
+from forest.terrain import Terrain, TerrainGenerator
+
+# Cache file layout: a fixed size header followed by the points, normalized points and max slope
+# layers, each stored as a row major height x width array of little endian float64. The header
+# holds the CRC of all the layers and the CRC of a sample of blocks from them.
+MAGIC = b"PFTC"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<4sHHqIIII")
+HEADER_SIZE = 64  # Header is padded so the arrays start on an aligned boundary
+LAYERS = ("points", "normalized_points", "max_slope")
+SAMPLE_BLOCKS = 16
+SAMPLE_BLOCK_SIZE = 4096
+
+
+class TerrainCache:
+    """
+        Persists generated terrain on disk so that it only needs to be generated once for a given
+        seed and size.
+
+        Entries are memory mapped when they are loaded so a hit costs almost nothing and the
+        terrain is paged in from the file as it is used. Entries which are truncated, corrupt or
+        were written by a different version of the terrain generator are regenerated.
+
+        A hit only checks the CRC of a few blocks spread through the entry, which is all of a small
+        one. Checking the CRC of the whole of a large entry reads all of it, so hits only do so
+        when verify is set. Entries can also be checked in full and removed with repair.
+    """
+
+    def __init__(self, directory, verify=False):
+        self.directory = directory
+        self.verify = verify
+        os.makedirs(directory, exist_ok=True)
+
+    def get_or_generate(self, seed, width, height, workers=1):
+        """
+            Load the terrain for this seed and size from the cache, generating and storing it if
+            there is no valid entry.
+        """
+        if terrain.numpy is None or seed is None:  # Can't map the file, or can't reproduce the terrain
+            return TerrainGenerator(seed).generate(width, height, workers=workers)
+
+        t = self.get(seed, width, height)
+        if t is None:
+            t = TerrainGenerator(seed).generate(width, height, workers=workers)
+            self.put(seed, width, height, t)
+
+        return t
+
+    def path(self, seed, width, height):
+        return os.path.join(self.directory, "terrain_%d_%dx%d.bin" % (seed, width, height))
+
+    def get(self, seed, width, height):
+        """
+            Returns the cached terrain or None if there isn't a valid entry for it. Invalid entries
+            are removed.
+        """
+        return self._load(seed, width, height, self.verify)
+
+    def repair(self):
+        """
+            Check the CRC of every entry and remove those which are corrupt, returning their paths.
+        """
+        removed = []
+        for name in sorted(os.listdir(self.directory)):
+            match = re.fullmatch(r"terrain_(-?\d+)_(\d+)x(\d+)\.bin", name)
+            if match is not None and self._load(*[int(v) for v in match.groups()], verify=True) is None:
+                removed.append(os.path.join(self.directory, name))
+
+        return removed
+
+    def _load(self, seed, width, height, verify):
+        path = self.path(seed, width, height)
+        size = len(LAYERS) * width * height * 8
+        try:
+            with open(path, "rb") as f:
+                header = f.read(HEADER.size)
+                valid = (len(header) == HEADER.size and
+                         HEADER.unpack(header)[:6] == (MAGIC, FORMAT_VERSION, terrain.ALGORITHM_VERSION, seed, width, height) and
+                         os.fstat(f.fileno()).st_size == HEADER_SIZE + size and
+                         _sample_crc(f, size) == HEADER.unpack(header)[7])
+        except FileNotFoundError:
+            return None
+
+        if not valid:
+            os.remove(path)
+            return None
+
+        data = terrain.numpy.memmap(path, dtype="<f8", mode="r", offset=HEADER_SIZE,
+                                    shape=(len(LAYERS), height, width))
+        if verify and zlib.crc32(data) != HEADER.unpack(header)[6]:
+            del data
+            os.remove(path)
+            return None
+
+        return Terrain(data[0], max_slope=data[2], normalized_points=data[1], seed=seed)
+
+    def put(self, seed, width, height, t):
+        """
+            Store a terrain in the cache. The file is written to a temporary location first and
+            then moved into place so a partially written entry is never visible.
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, "w+b") as f:
+                f.seek(HEADER_SIZE)
+                crc = 0
+                for layer in LAYERS:
+                    data = memoryview(terrain.numpy.ascontiguousarray(getattr(t, layer), dtype="<f8")).cast("B")
+                    crc = zlib.crc32(data, crc)
+                    f.write(data)
+
+                sample_crc = _sample_crc(f, len(LAYERS) * width * height * 8)
+                f.seek(0)
+                f.write(HEADER.pack(MAGIC, FORMAT_VERSION, terrain.ALGORITHM_VERSION, seed, width, height, crc,
+                                    sample_crc))
+
+            os.replace(temp_path, self.path(seed, width, height))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+
+def _sample_crc(f, size):
+    """
+        The CRC of SAMPLE_BLOCKS blocks spread evenly through the size bytes of layers in an open
+        cache file, including the first and last, or of all of them if they are no bigger.
+    """
+    if size <= SAMPLE_BLOCKS * SAMPLE_BLOCK_SIZE:
+        offsets, block_size = [0], size
+    else:
+        offsets = [i * (size - SAMPLE_BLOCK_SIZE) // (SAMPLE_BLOCKS - 1) for i in range(SAMPLE_BLOCKS)]
+        block_size = SAMPLE_BLOCK_SIZE
+
+    crc = 0
+    for offset in offsets:
+        f.seek(HEADER_SIZE + offset)
+        crc = zlib.crc32(f.read(block_size), crc)
+
+    return crc
@@ -0,0 +1,79 @@
+import collections
+
+
+class TiledTerrain:
+    """
+        A terrain which is generated lazily one tile at a time as points on it are accessed.
+
+        Only the max_tiles most recently used tiles are kept in memory so maps much larger than
+        the available RAM can be used. The points, normalized_points and max_slope layers support
+        the same layer[y][x] access as Terrain so this can be passed to a Forest in its place.
+    """
+
+    def __init__(self, generator, width, height, tile_size=256, max_tiles=64):
+        self.generator = generator
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        self.tiles = collections.OrderedDict()
+        self.points = TiledLayer(self, "points")
+        self.normalized_points = TiledLayer(self, "normalized_points")
+        self.max_slope = TiledLayer(self, "max_slope")
+
+    def get_tile(self, tx, ty):
+        """
+            Get the Terrain for a single tile, generating it if it isn't already in memory and
+            evicting the least recently used tile if there are now too many.
+        """
+        key = (tx, ty)
+        try:
+            self.tiles.move_to_end(key)
+            return self.tiles[key]
+        except KeyError:
+            tile = self.generator.generate_tile(tx, ty, self.tile_size, self.width, self.height)
+            self.tiles[key] = tile
+            if len(self.tiles) > self.max_tiles:
+                self.tiles.popitem(last=False)
+
+            return tile
+
+    def get_value(self, layer, x, y):
+        """
+            Get the value of a single point on the named layer.
+        """
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            raise IndexError("Point (%d, %d) is outside of the terrain" % (x, y))
+
+        tile = self.get_tile(x // self.tile_size, y // self.tile_size)
+
+        return getattr(tile, layer)[y % self.tile_size][x % self.tile_size]
+
+
+class TiledLayer:
+    """
+        Gives list of lists style access to one layer of a TiledTerrain.
+    """
+
+    def __init__(self, terrain, layer):
+        self.terrain = terrain
+        self.layer = layer
+
+    def __len__(self):
+        return self.terrain.height
+
+    def __getitem__(self, y):
+        return TiledRow(self, y)
+
+
+class TiledRow:
+
+    def __init__(self, layer, y):
+        self.layer = layer
+        self.y = y
+
+    def __len__(self):
+        return self.layer.terrain.width
+
+    def __getitem__(self, x):
+        return self.layer.terrain.get_value(self.layer.layer, x, self.y)
@@ -2,12 +2,81 @@ import math
 
 
 class Tree:
+    """
+        A single tree. A tree which hasn't been added to a forest holds its own values, once it has
+        been added it is a handle onto a slot in the forest's TreeStore and reads and writes the
+        values there. Handles for the same tree in a store compare equal.
+    """
+    __slots__ = ("store", "slot", "uid", "_species", "_size", "_x", "_y")
 
     def __init__(self, species, x, y):
-        self.species = species
-        self.size = species.initial_size
-        self.x = x
-        self.y = y
+        self.store = None
+        self.slot = None
+        self.uid = None
+        self._species = species
+        self._size = species.initial_size
+        self._x = x
+        self._y = y
+
+    @classmethod
+    def handle(cls, store, slot):
+        """
+            Create a handle onto a tree which is already in a store.
+        """
+        tree = cls.__new__(cls)
+        tree.store = store
+        tree.slot = slot
+        tree.uid = store.uid[slot]
+
+        return tree
+
+    @property
+    def species(self):
+        if self.store is None:
+            return self._species
+
+        return self.store.species[self.store.species_index[self.slot]]
+
+    @property
+    def size(self):
+        if self.store is None:
+            return self._size
+
+        return self.store.size[self.slot]
+
+    @size.setter
+    def size(self, size):
+        if self.store is None:
+            self._size = size
+        else:
+            self.store.size[self.slot] = size
+            self.store.changed()
+
+    @property
+    def x(self):
+        if self.store is None:
+            return self._x
+
+        return self.store.x[self.slot]
+
+    @property
+    def y(self):
+        if self.store is None:
+            return self._y
+
+        return self.store.y[self.slot]
+
+    def __eq__(self, other):
+        if self.store is None or not isinstance(other, Tree):
+            return self is other
+
+        return self.store is other.store and self.uid == other.uid
+
+    def __hash__(self):
+        if self.store is None:
+            return id(self)
+
+        return hash(self.uid)
 
     def absorb(self, victim):
         """
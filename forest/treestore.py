@@ -0,0 +1,135 @@
+import itertools
+from array import array
+from forest.tree import Tree
+
+_versions = itertools.count()
+
+
+class TreeStore:
+    """
+        Holds every tree in a forest as a set of parallel arrays (structure of arrays) rather than
+        as individual objects, which takes around 40 bytes per tree.
+
+        Each tree occupies a slot in the arrays. Removed trees leave a free slot, marked by a
+        species index of -1, which is reused by the next tree added so removal is O(1) and the
+        slot of a tree never changes while it is in the store. Every tree is also given a uid
+        which is never reused.
+
+        Iterating over the store gives a Tree handle for each tree in slot order.
+
+        The version changes whenever the trees do and is unique to that state of the trees, which
+        copies share, so whether anything worked out from a store is out of date can be told from
+        the version alone.
+    """
+
+    def __init__(self):
+        self.species = []
+        self.species_ids = {}
+        self.x = array("d")
+        self.y = array("d")
+        self.size = array("d")
+        self.species_index = array("h")
+        self.uid = array("q")
+        self.free = array("l")
+        self.next_uid = 0
+        self.version = next(_versions)
+
+    def __len__(self):
+        return len(self.species_index) - len(self.free)
+
+    def __iter__(self):
+        species_index = self.species_index
+        for slot in range(len(species_index)):
+            if species_index[slot] >= 0:
+                yield Tree.handle(self, slot)
+
+    def __contains__(self, tree):
+        return tree.store is self and self.species_index[tree.slot] >= 0 and self.uid[tree.slot] == tree.uid
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def changed(self):
+        """
+            Must be called after changing the arrays directly rather than by add or remove.
+        """
+        self.version = next(_versions)
+
+    def get_species_index(self, species):
+        """
+            Each species in the forest is given an index in the species table the first time a
+            tree of that species is added.
+        """
+        try:
+            return self.species_ids[species]
+        except KeyError:
+            self.species_ids[species] = len(self.species)
+            self.species.append(species)
+
+            return self.species_ids[species]
+
+    def add(self, species, x, y, size):
+        """
+            Add a tree to the store, returning the slot it was put in.
+        """
+        species_index = self.get_species_index(species)
+        uid = self.next_uid
+        self.next_uid += 1
+        self.version = next(_versions)
+
+        if self.free:
+            slot = self.free.pop()
+            self.x[slot], self.y[slot], self.size[slot] = x, y, size
+            self.species_index[slot], self.uid[slot] = species_index, uid
+        else:
+            slot = len(self.species_index)
+            self.x.append(x)
+            self.y.append(y)
+            self.size.append(size)
+            self.species_index.append(species_index)
+            self.uid.append(uid)
+
+        return slot
+
+    def remove(self, slot):
+        self.species_index[slot] = -1
+        self.free.append(slot)
+        self.version = next(_versions)
+
+    def attach(self, tree):
+        """
+            Move a tree which isn't in a store into this one, the tree object becomes a handle to
+            the new slot.
+        """
+        if tree.store is not None:
+            raise ValueError("Tree is already in a forest")
+
+        slot = self.add(tree.species, tree.x, tree.y, tree.size)
+        tree.store, tree.slot, tree.uid = self, slot, self.uid[slot]
+
+    def detach(self, tree):
+        """
+            Remove a tree from this store, the tree object keeps the values it had at the time.
+        """
+        if tree not in self:
+            raise ValueError("Tree is not in this forest")
+
+        tree._species, tree._size, tree._x, tree._y = tree.species, tree.size, tree.x, tree.y
+        self.remove(tree.slot)
+        tree.store, tree.slot, tree.uid = None, None, None
+
+    def get_tree(self, slot):
+        return Tree.handle(self, slot)
+
+    def copy(self):
+        """
+            A copy of the store which won't change as this one does. The species table is shared.
+        """
+        store = TreeStore()
+        store.species, store.species_ids = self.species, self.species_ids
+        store.x, store.y, store.size = self.x[:], self.y[:], self.size[:]
+        store.species_index, store.uid, store.free = self.species_index[:], self.uid[:], self.free[:]
+        store.next_uid = self.next_uid
+        store.version = self.version
+
+        return store
@@ -2,27 +2,36 @@ import argparse
 import pygame
 from pygame.locals import *
 import sys
-import random
 from forest.renderer import Renderer
-from forest.treespecies import TreeSpecies
-from forest.tree import Tree
-from forest.forest import Forest
-from forest.terrain import TerrainGenerator
+from forest.simulation import create_base_forest
+from forest.simulationthread import SimulationThread
 
 WIDTH = 800
 HEIGHT = 600
 
 
-def run(seed):
+def run(seed, cache_dir=None, threaded=False, tick_rate=10, width=WIDTH, height=HEIGHT):
+    """
+        Display a forest as it grows. Normally the forest is iterated every 6th frame, in threaded
+        mode it is iterated tick_rate times a second (or as fast as possible if 0) on a separate
+        thread and the latest state is drawn each frame.
+
+        The forest is width x height, which can be bigger than the window.
+    """
     pygame.init()
     fps_clock = pygame.time.Clock()
 
     running = True
 
     renderer = Renderer(WIDTH, HEIGHT)
-    forest = create_base_forest(seed, WIDTH, HEIGHT)
+    forest = create_base_forest(seed, width, height, cache_dir)
     ticks_since_iterate = 0
 
+    simulation = None
+    if threaded:
+        simulation = SimulationThread(forest, tick_rate or None)
+        simulation.start()
+
     paused = False
     while running:
         for event in pygame.event.get():
@@ -32,49 +41,42 @@ def run(seed):
             elif event.type == KEYUP:
                 if event.key == K_SPACE:
                     paused = not paused
+                    if simulation is not None:
+                        if paused:
+                            simulation.pause()
+                        else:
+                            simulation.resume()
 
             renderer.handle_event(event)
 
-        if not paused:
-            ticks_since_iterate += 1
-            if ticks_since_iterate == 6:
-                forest.iterate()
-                ticks_since_iterate = 0
+        if simulation is not None:
+            renderer.render(simulation.latest)
+        else:
+            if not paused:
+                ticks_since_iterate += 1
+                if ticks_since_iterate == 6:
+                    forest.iterate()
+                    ticks_since_iterate = 0
 
-        renderer.render(forest, paused)
+            renderer.render(forest)
 
         fps_clock.tick(60)
 
+    if simulation is not None:
+        simulation.stop()
+
     pygame.quit()
     return 0
 
 
-def create_base_forest(seed, width, height):
-    """
-        Placeholder for creating the base forest until I decide how to tie that in.
-    """
-    terrain_gen = TerrainGenerator(seed)
-    terrain = terrain_gen.generate(width, height)
-    forest = Forest(seed, terrain, width, height)
-
-    oak = TreeSpecies("oak", 0.1, 10, 1, 0.2, 100, 5, 0.030)
-    birch = TreeSpecies("birch", 0.3, 5, 1, 0.2, 30, 5, 0.033)
-    pine = TreeSpecies("pine", 0.2, 6, 1, 0.1, 50, 3, 0.05)
-    for i in range(0, 2):
-        forest.add_tree(Tree(birch, random.randint(0, width - 1), random.randint(0, height - 1)))
-
-    for i in range(0, 4):
-        forest.add_tree(Tree(pine, random.randint(0, width - 1), random.randint(0, height - 1)))
-
-    for i in range(0, 4):
-        forest.add_tree(Tree(oak, random.randint(0, width - 1), random.randint(0, height - 1)))
-
-    return forest
-
-
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate a procedural forest')
     parser.add_argument('--seed', '-s', type=int, help='The seed for the random number generator. Two forests with the same seed will be identical')
+    parser.add_argument('--cache-dir', help='Directory in which generated terrain is cached between runs')
+    parser.add_argument('--threaded', action='store_true', help='Simulate on a separate thread to rendering')
+    parser.add_argument('--tick-rate', type=int, default=10, help='Iterations per second when threaded, 0 for as fast as possible')
+    parser.add_argument('--width', type=int, default=WIDTH, help='Width of the forest, which can be bigger than the window')
+    parser.add_argument('--height', type=int, default=HEIGHT, help='Height of the forest, which can be bigger than the window')
     args = parser.parse_args()
 
-    sys.exit(run(args.seed))
+    sys.exit(run(args.seed, args.cache_dir, args.threaded, args.tick_rate, args.width, args.height))
@@ -0,0 +1,149 @@
+import math
+import random
+import unittest
+from forest import batchengine
+from forest.forest import Forest, SCALAR_ENGINE, BATCHED_ENGINE
+from forest.terrain import Terrain, TerrainGenerator
+from forest.tree import Tree
+from forest.treespecies import TreeSpecies
+
+
+def reference_iterate(forest):
+    """
+        A direct, tree by tree implementation of the rule documented on BatchEngine.
+    """
+    forest.tick += 1
+    trees = list(forest.trees)
+    for tree in trees:
+        tree.grow()
+
+    removed = set()
+    for tree in trees:
+        if tree in removed:
+            continue
+
+        for other in forest.get_trees_near_point(tree.x, tree.y, tree.species.max_size + forest.max_tree_size):
+            if other not in removed and other != tree and other.overlapping(tree):
+                if other.smaller_than(tree):
+                    tree.absorb(other)
+                    removed.add(other)
+                else:
+                    other.absorb(tree)
+                    removed.add(tree)
+                    break
+
+    mature = [tree for tree in trees if tree not in removed and tree.is_mature()]
+    for tree in sorted(removed, key=lambda t: t.slot):
+        forest.remove_tree(tree)
+
+    if not mature:
+        return
+
+    draws = forest.engine.seed_generator(forest.tick).random((len(mature), max(t.species.seed_rate for t in mature), 3))
+    seeds = []
+    for (n, tree) in enumerate(mature):
+        for i in range(tree.species.seed_rate):
+            survive, distance, direction = draws[n][i]
+            if survive < tree.species.seed_survivability:
+                d = tree.size + (tree.species.seed_spread_distance - tree.size) * distance
+                x = int(tree.x) + round(d * math.cos(2 * math.pi * direction))
+                y = int(tree.y) + round(d * math.sin(2 * math.pi * direction))
+
+                if forest._can_plant_seed(x, y, tree.species) and not too_close_to_seed(forest, seeds, x, y, tree.species):
+                    seeds.append(Tree(tree.species, x, y))
+
+    for tree in seeds:
+        forest.add_tree(tree)
+
+
+def too_close_to_seed(forest, seeds, x, y, species):
+    d = int(10 * forest.terrain.max_slope[y][x] / 0.05)
+    radius = forest.max_tree_size + species.initial_size + d
+
+    for seed in seeds:
+        total_distance = seed.size + species.initial_size + d
+        if ((seed.x - x) ** 2 + (seed.y - y) ** 2 <= radius * radius and
+                (abs(seed.x - x) < total_distance or abs(seed.y - y) < total_distance)):
+            return True
+
+    return False
+
+
+def plant_below(forest, species, x, y):
+    """
+        Deterministic seeding for comparing the engines, whose seeds come from different random
+        streams: one seed 60 below the parent if it can be planted there.
+    """
+    if forest._can_plant_seed(int(x), int(y) + 60, species):
+        return [(species, int(x), int(y) + 60)]
+
+    return []
+
+
+@unittest.skipIf(batchengine.numpy is None, "numpy not installed")
+class TestBatchEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.species = [TreeSpecies("oak", 0.1, 10, 1, 0.2, 30, 5, 0.030),
+                        TreeSpecies("birch", 0.3, 5, 1, 0.2, 20, 5, 0.033),
+                        TreeSpecies("pine", 0.2, 6, 1, 0.1, 25, 3, 0.05)]
+        self.terrain = TerrainGenerator(2).generate(200, 150)
+
+    def create_forest(self, engine):
+        f = Forest(1, self.terrain, 200, 150, engine=engine)
+        r = random.Random(3)
+        for _ in range(400):
+            t = Tree(r.choice(self.species), r.randint(0, 199), r.randint(0, 149))
+            t.size = r.uniform(1, t.species.max_size)
+            f.add_tree(t)
+
+        return f
+
+    def test_matches_reference(self):
+        expected = self.create_forest(BATCHED_ENGINE)
+        actual = self.create_forest(BATCHED_ENGINE)
+
+        for i in range(20):
+            reference_iterate(expected)
+            actual.iterate()
+
+            self.assertEqual([(t.slot, t.x, t.y, t.size, t.species) for t in expected.trees],
+                             [(t.slot, t.x, t.y, t.size, t.species) for t in actual.trees])
+
+    def test_matches_scalar_engine(self):
+        # Trees too far apart to ever overlap, so the order in which they are handled can't matter
+        def create(engine):
+            f = Forest(1, Terrain([[0.0] * 200 for _ in range(150)]), 200, 150, engine=engine)
+            for (n, x) in enumerate(range(10, 200, 40)):
+                f.add_tree(Tree(self.species[n % 3], x, 10))
+            return f
+
+        scalar, batched = create(SCALAR_ENGINE), create(BATCHED_ENGINE)
+        scalar.spread_tree_seed = lambda tree: [Tree(*seed) for seed in
+                                                plant_below(scalar, tree.species, tree.x, tree.y)]
+
+        def spread_seeds(mature):
+            trees = [batched.trees.get_tree(slot) for slot in mature.tolist()]
+            return [seed for tree in trees for seed in plant_below(batched, tree.species, tree.x, tree.y)]
+        batched.engine._spread_seeds = spread_seeds
+
+        for _ in range(150):
+            scalar.iterate()
+            batched.iterate()
+
+            self.assertEqual([(t.uid, t.x, t.y, t.size, t.species) for t in scalar.trees],
+                             [(t.uid, t.x, t.y, t.size, t.species) for t in batched.trees])
+        self.assertEqual(13, len(scalar.trees))  # Only the oaks' seeds haven't seeded yet
+
+    def test_larger_absorbs_smaller(self):
+        f = Forest(1, self.terrain, 200, 150, engine=BATCHED_ENGINE)
+        t1 = Tree(self.species[0], 10, 10)
+        t2 = Tree(self.species[0], 15, 10)
+        t1.size, t2.size = 2, 3
+        f.add_tree(t1)
+        f.add_tree(t2)
+
+        f.iterate()
+
+        self.assertEqual([t2], list(f.trees))
+        self.assertEqual(5.2, t2.size)
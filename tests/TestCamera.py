@@ -0,0 +1,45 @@
+import unittest
+from forest.camera import Camera, MIN_ZOOM
+
+
+class TestCamera(unittest.TestCase):
+
+    def test_default(self):
+        camera = Camera(800, 600)
+
+        self.assertEqual((0, 0, 800, 600), camera.get_world_rect())
+        self.assertEqual((10, 20), camera.to_screen(10, 20))
+        self.assertEqual(0, camera.get_mip_level(5))
+
+    def test_pan(self):
+        camera = Camera(800, 600, zoom=2)
+        camera.pan(100, -50)
+
+        self.assertEqual((50, -25, 450, 275), camera.get_world_rect())
+
+    def test_zoom_at(self):
+        camera = Camera(800, 600, x=100, y=100)
+        point = camera.to_world(200, 300)
+        camera.zoom_at(4, 200, 300)
+
+        self.assertEqual(4, camera.zoom)
+        self.assertEqual(point, camera.to_world(200, 300))
+        self.assertEqual((200, 300), camera.to_screen(*point))
+
+    def test_zoom_limits(self):
+        camera = Camera(800, 600)
+        camera.zoom_at(1 / 1000, 0, 0)
+
+        self.assertEqual(MIN_ZOOM, camera.zoom)
+
+    def test_mip_level(self):
+        camera = Camera(800, 600, zoom=0.3)
+
+        self.assertEqual(1, camera.get_mip_level(5))
+        self.assertEqual(0, camera.get_mip_level(1))
+        camera.zoom = 0.25
+        self.assertEqual(2, camera.get_mip_level(5))
+
+
+if __name__ == '__main__':
+    unittest.main()
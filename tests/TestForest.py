@@ -1,14 +1,17 @@
 import math
+import random
 import unittest
 from forest.treespecies import TreeSpecies
 from forest.tree import Tree
 from forest.forest import Forest
+from forest.terrain import Terrain
+from forest.simulation import create_base_forest
 
 
 class TestForest(unittest.TestCase):
 
     def setUp(self):
-        self.species = TreeSpecies("birch", 0.1, 10, 3, 0.8, 79, 2)
+        self.species = TreeSpecies("birch", 0.1, 10, 3, 0.8, 79, 2, 0.008)
 
     def test_create(self):
         f = Forest(1, None, 100, 200)
@@ -77,3 +80,58 @@ class TestForest(unittest.TestCase):
         cells = f.get_all_nboring_cells_by_tree(t1)
         self.assertEqual(6, len(cells))
         self.assertEqual(sorted([cell for row in f.cells for cell in row]), sorted(cells))
+
+    def test_get_trees_near_point(self):
+        f = Forest(1, None, 100, 100)
+        t1 = Tree(self.species, 50, 50)
+        t2 = Tree(self.species, 50, 72)
+        t3 = Tree(self.species, 35, 50)
+        t4 = Tree(self.species, 90, 90)
+        for t in [t1, t2, t3, t4]:
+            f.add_tree(t)
+
+        self.assertEqual([t1, t3, t2], f.get_trees_near_point(50, 50, 25))
+        self.assertEqual([t3, t1], f.get_trees_near_point(40, 50, 10))
+        self.assertEqual([], f.get_trees_near_point(0, 0, 10))
+
+    def test_collision_beyond_neighbouring_cells(self):
+        f = Forest(1, Terrain([[0.0] * 100 for _ in range(100)]), 100, 100)
+        t1 = Tree(self.species, 10, 10)
+        t2 = Tree(self.species, 30, 10)
+        t1.size = t2.size = 9.95
+        f.add_tree(t1)
+        f.add_tree(t2)
+
+        f.iterate()
+
+        self.assertIn(t1, f.trees)
+        self.assertNotIn(t2, f.trees)
+        self.assertEqual(10, t1.size)
+
+    def test_automatic_cell_size(self):
+        f = Forest(1, None, 100, 100, cell_size=None)
+        f.add_tree(Tree(self.species, 0, 0))
+
+        self.assertEqual(20, f.cell_size)
+        self.assertEqual(5, len(f.cells))
+        self.assertEqual(5, len(f.cells[0]))
+
+    def test_independent_random_streams(self):
+        def state(forest):
+            return sorted((t.x, t.y, t.size) for t in forest.trees)
+
+        expected = create_base_forest(4, 200, 150)
+        for _ in range(100):
+            expected.iterate()
+
+        random.seed(0)
+        global_state = random.getstate()
+        f1 = create_base_forest(4, 200, 150)
+        f2 = create_base_forest(4, 200, 150)
+        for _ in range(100):
+            f1.iterate()
+            f2.iterate()
+            f2.iterate()
+
+        self.assertEqual(state(expected), state(f1))
+        self.assertEqual(global_state, random.getstate())
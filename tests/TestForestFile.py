@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+from forest import forestfile, terrain
+from forest.forest import Forest, SCALAR_ENGINE, BATCHED_ENGINE, PARALLEL_ENGINE
+from forest.simulation import create_base_forest
+from forest.terrain import Terrain, TerrainGenerator
+from forest.tiledterrain import TiledTerrain
+from forest.tree import Tree
+from forest.treespecies import TreeSpecies
+
+
+class TestForestFile(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "forest.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assertForestEqual(self, expected, actual):
+        self.assertEqual(expected.tick, actual.tick)
+        self.assertEqual([(t.uid, t.species.name, t.x, t.y, t.size) for t in expected.trees],
+                         [(t.uid, t.species.name, t.x, t.y, t.size) for t in actual.trees])
+        self.assertEqual(list(expected.trees.free), list(actual.trees.free))
+
+    def assertResumes(self, engine):
+        uninterrupted = create_base_forest(4, 60, 50, engine=engine)
+        for _ in range(40):
+            uninterrupted.iterate()
+
+        forest = create_base_forest(4, 60, 50, engine=engine)
+        for _ in range(20):
+            forest.iterate()
+        forestfile.save(forest, self.path)
+        resumed = forestfile.load(self.path, forest.terrain)
+        self.assertForestEqual(forest, resumed)
+
+        for _ in range(20):
+            resumed.iterate()
+        self.assertForestEqual(uninterrupted, resumed)
+
+    def test_resume(self):
+        self.assertResumes(SCALAR_ENGINE)
+
+    @unittest.skipIf(terrain.numpy is None, "numpy not installed")
+    def test_resume_batched(self):
+        self.assertResumes(BATCHED_ENGINE)
+
+    @unittest.skipIf(terrain.numpy is None, "numpy not installed")
+    def test_resume_parallel(self):
+        self.assertResumes(PARALLEL_ENGINE)
+
+    def test_terrain_generated_again(self):
+        forest = create_base_forest(4, 30, 20)
+        forestfile.save(forest, self.path)
+        loaded = forestfile.load(self.path)
+
+        self.assertEqual(4, loaded.terrain.seed)
+        self.assertEqual([list(row) for row in forest.terrain.points], [list(row) for row in loaded.terrain.points])
+
+    def test_tiled_terrain(self):
+        forest = Forest(4, TiledTerrain(TerrainGenerator(5), 53, 37, tile_size=16, max_tiles=4), 53, 37)
+        forest.add_tree(Tree(TreeSpecies("yew", 0.013, 8, 1, 0.2, 40, 3, 1.0), 10, 10))
+        forestfile.save(forest, self.path)
+        loaded = forestfile.load(self.path)
+
+        self.assertForestEqual(forest, loaded)
+        self.assertIsInstance(loaded.terrain, TiledTerrain)
+        self.assertEqual((5, 16, 4), (loaded.terrain.generator.seed, loaded.terrain.tile_size, loaded.terrain.max_tiles))
+        self.assertEqual([list(forest.terrain.points[y]) for y in range(37)],
+                         [list(loaded.terrain.points[y]) for y in range(37)])
+
+    def test_terrain_without_seed(self):
+        t = Terrain([[0.0] * 30 for _ in range(20)])
+        forest = Forest(4, t, 30, 20)
+        forestfile.save(forest, self.path)
+
+        self.assertRaises(ValueError, forestfile.load, self.path)
+        self.assertIs(t, forestfile.load(self.path, t).terrain)
+
+    def test_not_a_forest_file(self):
+        with open(self.path, "wb") as f:
+            f.write(b"\x00" * 100)
+
+        self.assertRaises(ValueError, forestfile.load, self.path)
+
+    def test_corrupt(self):
+        forest = create_base_forest(4, 30, 20)
+        forestfile.save(forest, self.path)
+        with open(self.path, "r+b") as f:
+            f.seek(-12, os.SEEK_END)
+            f.write(b"\xff" * 4)
+
+        self.assertRaises(ValueError, forestfile.load, self.path)
+
+    def test_truncated(self):
+        forest = create_base_forest(4, 30, 20)
+        forestfile.save(forest, self.path)
+        with open(self.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.path) - 8)
+
+        self.assertRaises(ValueError, forestfile.load, self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import io
+import os
+import tempfile
+import threading
+import unittest
+from forest.simulation import create_base_forest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+try:
+    import pygame
+    from forest.frameexport import FrameExporter
+    from forest.renderer import Renderer
+except ImportError:
+    pygame = None
+
+
+class GatedPipe(io.BytesIO):
+    """
+        A pipe which doesn't accept anything until it is opened, like one to a stalled encoder.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.open = threading.Event()
+
+    def write(self, data):
+        self.open.wait()
+        return super().write(data)
+
+
+class BrokenPipe(io.BytesIO):
+
+    def write(self, data):
+        raise BrokenPipeError()
+
+
+@unittest.skipIf(pygame is None, "pygame is not installed")
+class TestFrameExport(unittest.TestCase):
+
+    def setUp(self):
+        pygame.display.init()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        pygame.display.quit()
+        self.directory.cleanup()
+
+    def export(self, ticks, **kwargs):
+        """
+            Run a forest with an exporter attached and return what each frame should look like.
+        """
+        forest = create_base_forest(3, 120, 90)
+        renderer = Renderer(120, 90, surface=pygame.Surface((120, 90)))
+        expected = []
+        with FrameExporter(120, 90, **kwargs) as exporter:
+            exporter.attach(forest)
+            for _ in range(ticks + 1):
+                if forest.tick % exporter.interval == 0:
+                    renderer.render(forest.snapshot())
+                    expected.append(pygame.image.tostring(renderer.surface, "RGB"))
+                if forest.tick < ticks:
+                    forest.iterate()
+            exporter.detach(forest)
+
+        self.assertEqual(len(expected), exporter.frames)
+
+        return expected
+
+    def test_png_frames(self):
+        expected = self.export(30, interval=10, output_dir=self.directory.name, processes=1)
+
+        self.assertEqual(["frame_%06d.png" % i for i in range(4)], sorted(os.listdir(self.directory.name)))
+        for (i, frame) in enumerate(expected):
+            image = pygame.image.load(os.path.join(self.directory.name, "frame_%06d.png" % i))
+            self.assertEqual(frame, pygame.image.tostring(image, "RGB"))
+
+    def test_raw_pipe(self):
+        pipe = io.BytesIO()
+        expected = self.export(12, interval=3, pipe=pipe, queue_size=2)
+
+        self.assertEqual(5, len(expected))
+        self.assertEqual(b"".join(expected), pipe.getvalue())
+
+    def test_backpressure(self):
+        forest = create_base_forest(3, 120, 90)
+        pipe = GatedPipe()
+        exporter = FrameExporter(120, 90, pipe=pipe, queue_size=1)
+        exporter.capture(forest)  # Taken by the writer, which waits on the pipe
+        exporter.capture(forest)  # Fills the queue
+
+        blocked = threading.Thread(target=exporter.capture, args=(forest,))
+        blocked.start()
+        blocked.join(0.3)
+        self.assertTrue(blocked.is_alive())
+
+        pipe.open.set()
+        blocked.join()
+        exporter.close()
+
+        self.assertEqual(3, exporter.frames)
+        self.assertGreater(exporter.blocked_time, 0.2)
+
+    def test_error_raised(self):
+        forest = create_base_forest(3, 120, 90)
+        exporter = FrameExporter(120, 90, pipe=BrokenPipe())
+        exporter.capture(forest)
+
+        with self.assertRaises(RuntimeError) as context:
+            exporter.close()
+        self.assertIsInstance(context.exception.__cause__, BrokenPipeError)
+
+
+if __name__ == '__main__':
+    unittest.main()
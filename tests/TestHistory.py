@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+from forest import history, terrain
+from forest.forest import SCALAR_ENGINE, BATCHED_ENGINE
+from forest.history import HistoryRecorder, HistoryReader
+from forest.simulation import create_base_forest
+
+
+def trees(store):
+    return sorted((t.uid, t.species.name, t.x, t.y, t.size) for t in store)
+
+
+class TestHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "history.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def record(self, ticks, engine=SCALAR_ENGINE):
+        forest = create_base_forest(5, 80, 60, engine=engine)
+        expected = {0: trees(forest.trees)}
+        with HistoryRecorder(self.path, keyframe_interval=10) as recorder:
+            recorder.attach(forest)
+            for _ in range(ticks):
+                forest.iterate()
+                expected[forest.tick] = trees(forest.trees)
+
+        return expected
+
+    def assertHistory(self, expected):
+        reader = HistoryReader(self.path)
+        self.assertEqual(sorted(expected), reader.ticks)
+        for tick in expected:
+            self.assertEqual(expected[tick], trees(reader.seek(tick)))
+
+        self.assertEqual([(tick, expected[tick]) for tick in range(15, 26)],
+                         [(tick, trees(store)) for (tick, store) in reader.replay(15, 25)])
+
+    def test_record_and_seek(self):
+        self.assertHistory(self.record(60))
+
+    @unittest.skipIf(terrain.numpy is None, "numpy not installed")
+    def test_record_batched(self):
+        self.assertHistory(self.record(60, BATCHED_ENGINE))
+
+    def test_without_numpy(self):
+        numpy, history.numpy = history.numpy, None
+        try:
+            self.assertHistory(self.record(30))
+        finally:
+            history.numpy = numpy
+
+    def test_partial_record_ignored(self):
+        expected = self.record(30)
+        with open(self.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.path) - 3)
+
+        reader = HistoryReader(self.path)
+        self.assertEqual(list(range(30)), reader.ticks)
+        self.assertEqual(expected[29], trees(reader.seek(29)))
+
+    def test_before_start(self):
+        self.record(5)
+
+        self.assertRaises(ValueError, HistoryReader(self.path).seek, -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
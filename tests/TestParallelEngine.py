@@ -0,0 +1,71 @@
+import unittest
+from forest import terrain
+from forest.forest import PARALLEL_ENGINE
+from forest.simulation import create_base_forest
+
+if terrain.numpy is not None:
+    from forest.parallelengine import ParallelEngine, _uniform
+
+
+def trees(forest):
+    return [(t.uid, t.species.name, t.x, t.y, t.size) for t in forest.trees]
+
+
+@unittest.skipIf(terrain.numpy is None, "numpy not installed")
+class TestParallelEngine(unittest.TestCase):
+
+    def simulate(self, processes, strips, ticks=120):
+        forest = create_base_forest(7, 200, 240, engine=PARALLEL_ENGINE)
+        forest.engine = ParallelEngine(forest, processes, strips)
+        try:
+            for _ in range(ticks):
+                forest.iterate()
+        finally:
+            forest.engine.close()
+
+        return forest
+
+    def test_independent_of_strips(self):
+        expected = trees(self.simulate(1, 1))
+
+        self.assertGreater(len(expected), 10)
+        self.assertEqual(expected, trees(self.simulate(1, 5)))
+
+    def test_independent_of_processes(self):
+        self.assertEqual(trees(self.simulate(1, 1, 60)), trees(self.simulate(2, 3, 60)))
+
+    def test_advance_matches_iterate(self):
+        expected = self.simulate(1, 2, 80)
+        forest = create_base_forest(7, 200, 240, engine=PARALLEL_ENGINE)
+        forest.engine = ParallelEngine(forest, 1, 3)
+        forest.advance(80)
+
+        self.assertEqual(trees(expected), trees(forest))
+
+    def test_iterate_after_close(self):
+        expected = self.simulate(1, 2, 20)
+        forest = create_base_forest(7, 200, 240, engine=PARALLEL_ENGINE)
+        forest.engine = ParallelEngine(forest, 2, 2)
+        try:
+            for _ in range(10):
+                forest.iterate()
+            forest.engine.close()
+            for _ in range(10):
+                forest.iterate()
+        finally:
+            forest.engine.close()
+
+        self.assertEqual(trees(expected), trees(forest))
+
+    def test_uniform(self):
+        uid = terrain.numpy.arange(1000)
+        a = _uniform(1, 5, uid, uid % 3, 0)
+
+        self.assertEqual(a.tolist(), _uniform(1, 5, uid, uid % 3, 0).tolist())
+        self.assertNotEqual(a.tolist(), _uniform(1, 6, uid, uid % 3, 0).tolist())
+        self.assertTrue(((a >= 0) & (a < 1)).all())
+        self.assertAlmostEqual(0.5, a.mean(), delta=0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import random
+import unittest
+from forest import plantability
+from forest.forest import Forest
+from forest.plantability import PlantabilityMap, calculate_padding
+from forest.terrain import TerrainGenerator
+from forest.tiledterrain import TiledTerrain
+from forest.treespecies import TreeSpecies
+
+
+class TestPlantability(unittest.TestCase):
+
+    def setUp(self):
+        self.terrain = TerrainGenerator(4).generate(53, 37)
+        self.slopes = [list(row) for row in self.terrain.max_slope]
+        self.threshold = sorted(s for row in self.slopes for s in row)[len(self.slopes) * len(self.slopes[0]) // 2]
+
+    def assertMatchesTerrain(self):
+        plantable = PlantabilityMap(self.terrain.max_slope, 53, 37, self.threshold)
+        expected = [(x, y) for y in range(37) for x in range(53) if self.slopes[y][x] <= self.threshold]
+
+        self.assertEqual(expected, [(x, y) for y in range(37) for x in range(53) if plantable.is_plantable(x, y)])
+        self.assertEqual(expected, plantable.get_points())
+        self.assertEqual(len(expected), len(plantable))
+        self.assertEqual([(x, y) for (x, y) in expected if 10 <= x < 30 and 5 <= y < 12],
+                         plantable.get_points(10, 5, 20, 7))
+
+        padding = calculate_padding(self.terrain.max_slope, 53, 37)
+        self.assertEqual([int(10 * s / 0.05) for row in self.slopes for s in row], padding.tolist())
+
+    def test_matches_terrain(self):
+        self.assertMatchesTerrain()
+
+    def test_without_numpy(self):
+        numpy, plantability.numpy = plantability.numpy, None
+        try:
+            self.assertMatchesTerrain()
+        finally:
+            plantability.numpy = numpy
+
+    def test_random_point(self):
+        plantable = PlantabilityMap(self.terrain.max_slope, 53, 37, self.threshold)
+        r = random.Random(1)
+        points = set(plantable.get_points())
+        for _ in range(100):
+            self.assertIn(plantable.get_random_point(r), points)
+
+        self.assertIsNone(PlantabilityMap(self.terrain.max_slope, 53, 37, -1).get_random_point(r))
+
+    def test_forest_shares_maps(self):
+        forest = Forest(1, self.terrain, 53, 37)
+        a = TreeSpecies("a", 0.1, 5, 1, 0.5, 10, 2, self.threshold)
+        b = TreeSpecies("b", 0.2, 3, 1, 0.5, 10, 2, self.threshold)
+
+        self.assertIs(forest.get_plantability(a), forest.get_plantability(b))
+        self.assertIsNot(forest.get_plantability(a), forest.get_plantability(TreeSpecies("c", 0.1, 5, 1, 0.5, 10, 2, 0)))
+
+    def test_tiled_terrain_reads_slopes(self):
+        forest = Forest(1, TiledTerrain(TerrainGenerator(4), 53, 37, tile_size=16), 53, 37)
+        species = TreeSpecies("a", 0.1, 5, 1, 0.5, 10, 2, self.threshold)
+
+        self.assertIsNone(forest.get_plantability(species))
+        self.assertEqual(self.slopes[3][4] > self.threshold, forest._get_seed_rejection(4, 3, species) == "seeds_too_steep")
+
+
+if __name__ == '__main__':
+    unittest.main()
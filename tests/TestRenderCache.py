@@ -0,0 +1,70 @@
+import gc
+import unittest
+from forest.rendercache import RenderCache
+
+
+class Surface:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+    def get_pitch(self):
+        return self.width * 4
+
+    def get_height(self):
+        return self.height
+
+
+class Terrain:
+    pass
+
+
+class TestRenderCache(unittest.TestCase):
+
+    def test_hits_and_misses(self):
+        cache = RenderCache()
+        first = cache.get("a", lambda: Surface(10, 10))
+
+        self.assertIs(first, cache.get("a", lambda: Surface(10, 10)))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.misses)
+        self.assertEqual(400, cache.bytes)
+
+    def test_lru_eviction(self):
+        cache = RenderCache(max_bytes=1000)
+        cache.get("a", lambda: Surface(10, 10))
+        cache.get("b", lambda: Surface(10, 10))
+        cache.get("a", lambda: Surface(10, 10))
+        cache.get("c", lambda: Surface(10, 10))
+
+        self.assertEqual(["a", "c"], list(cache.entries))
+        self.assertEqual(800, cache.bytes)
+        self.assertEqual(1, cache.evictions)
+
+    def test_too_big_not_stored(self):
+        cache = RenderCache(max_bytes=100)
+        cache.get("a", lambda: Surface(10, 10))
+
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.bytes)
+
+    def test_owner(self):
+        cache = RenderCache()
+        t1, t2 = Terrain(), Terrain()
+        cache.get("heightmap", lambda: Surface(1, 1), owner=t1)
+        cache.get("heightmap", lambda: Surface(1, 1), owner=t2)
+        cache.get("slopes", lambda: Surface(1, 1), owner=t2)
+        self.assertEqual(3, len(cache))
+
+        cache.invalidate(t2)
+        self.assertEqual([(id(t1), "heightmap")], list(cache.entries))
+
+        del t1
+        gc.collect()
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.bytes)
+        self.assertEqual({}, cache.owned)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,233 @@
+import math
+import os
+import random
+import unittest
+from forest.forest import Forest
+from forest.terrain import Terrain
+from forest.tree import Tree
+from forest.treespecies import TreeSpecies
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+try:
+    import pygame
+    from forest.renderer import Renderer
+except ImportError:
+    pygame = None
+
+
+@unittest.skipIf(pygame is None, "pygame is not installed")
+class TestRenderer(unittest.TestCase):
+
+    def setUp(self):
+        pygame.display.init()
+        self.species = TreeSpecies("oak", 0.1, 10, 3, 0.8, 79, 2, 0.008)
+        self.forest = Forest(1, Terrain([[(x + y) / 350 for x in range(200)] for y in range(150)]), 200, 150)
+        r = random.Random(1)
+        self.trees = [Tree(self.species, r.randint(0, 199), r.randint(0, 149)) for _ in range(40)]
+        for tree in self.trees:
+            self.forest.add_tree(tree)
+
+    def tearDown(self):
+        pygame.display.quit()
+
+    def assertMatchesFullRender(self, renderer):
+        full = Renderer(renderer.width, renderer.height, surface=pygame.Surface(renderer.surface.get_size()))
+        full.camera = renderer.camera
+        full.render(self.forest)
+
+        self.assertEqual(pygame.image.tostring(full.surface, "RGB"), pygame.image.tostring(renderer.surface, "RGB"))
+
+    def test_incremental_render(self):
+        renderer = Renderer(200, 150)
+        renderer.render(self.forest)
+
+        self.forest.remove_tree(self.trees[3])
+        self.trees[7].size = 6
+        self.forest.add_tree(Tree(self.species, 50, 60))
+        renderer.render(self.forest)
+
+        self.assertMatchesFullRender(renderer)
+
+    def test_unchanged_forest_not_redrawn(self):
+        renderer = Renderer(200, 150)
+        renderer.render(self.forest)
+        renderer.surface.fill(pygame.Color(1, 2, 3))
+        renderer.render(self.forest)
+
+        self.assertEqual((1, 2, 3, 255), tuple(renderer.surface.get_at((0, 0))))
+
+    def test_unchanged_snapshot_not_redrawn(self):
+        renderer = Renderer(200, 150)
+        renderer.render(self.forest.snapshot())
+        renderer.surface.fill(pygame.Color(1, 2, 3))
+        renderer.render(self.forest.snapshot())
+
+        self.assertEqual((1, 2, 3, 255), tuple(renderer.surface.get_at((0, 0))))
+
+    def test_backgrounds_cached(self):
+        from forest.renderer import SLOPE_MODE, HEIGHTMAP_MODE
+        renderer = Renderer(200, 150)
+        for mode in (HEIGHTMAP_MODE, SLOPE_MODE, HEIGHTMAP_MODE, SLOPE_MODE):
+            renderer.mode = mode
+            renderer.render(self.forest)
+
+        self.assertEqual(2, renderer.cache.misses)  # The mip pyramid for each mode
+        self.assertEqual(2, renderer.cache.hits)
+
+        for _ in range(5):
+            renderer.camera.pan(7, 5)
+            renderer.render(self.forest)
+        self.assertEqual(2, len(renderer.cache))
+
+    def test_terrain_surface(self):
+        renderer = Renderer(6, 4)
+        slopes = [[0.0, 0.01, 0.02, 0.03, 0.04], [0.05, 0.013, 0.001, 1.0, 0.039], [0.0] * 5]
+        surface = renderer._create_surface_from_2d_array(slopes, 0.04)
+
+        self.assertEqual((5, 3), surface.get_size())
+        for row in range(3):
+            for col in range(5):
+                expected = int(min(255, slopes[row][col] * 255 / 0.04))
+                self.assertEqual((expected, expected, expected), tuple(surface.get_at((col, row)))[:3])
+
+    def test_background_outside_terrain(self):
+        renderer = Renderer(200, 150)
+        renderer.camera.pan(150, 0)
+        background = renderer._get_background(self.forest)
+
+        self.assertEqual(tuple(renderer._create_pyramid(self.forest.terrain, 0)[0].get_at((160, 10))),
+                         tuple(background.get_at((10, 10))))
+        self.assertEqual((0, 0, 0), tuple(background.get_at((60, 10)))[:3])
+
+    def test_incremental_render_with_camera(self):
+        renderer = Renderer(200, 150)
+        renderer.camera.zoom_at(2, 40, 30)
+        renderer.render(self.forest)
+
+        self.forest.remove_tree(self.trees[3])
+        self.trees[7].size = 6
+        self.forest.add_tree(Tree(self.species, 50, 60))
+        renderer.render(self.forest)
+
+        self.assertMatchesFullRender(renderer)
+
+    def test_visible_slots(self):
+        renderer = Renderer(200, 150)
+        renderer.camera.zoom_at(4, 0, 0)
+        margin = self.species.max_size
+        visible = [t.slot for t in self.forest.trees if t.x < 50 + margin and t.y < 37.5 + margin]
+        slots = renderer._get_visible_slots(self.forest)
+
+        # Whole cells are checked so nearby trees which aren't visible may be included
+        self.assertEqual(sorted(slots), slots)
+        self.assertLessEqual(set(visible), set(slots))
+        self.assertLess(len(slots), len(self.trees) / 2)
+
+    def test_density(self):
+        renderer = Renderer(200, 150)
+        renderer.camera.zoom_at(0.1, 0, 0)
+        renderer.render(self.forest)
+
+        self.assertTrue(renderer._is_drawing_density())
+        colours = set(tuple(renderer.surface.get_at((x, y)))[:3] for x in range(20) for y in range(15))
+        self.assertTrue(any(r == 0 and g > 0 and b == 0 for (r, g, b) in colours))
+
+    def test_terrain_surface_without_numpy(self):
+        import forest.renderer
+        renderer = Renderer(200, 150)
+        with_numpy = renderer._create_surface_from_2d_array(self.forest.terrain.normalized_points, 1)
+        numpy, forest.renderer.numpy = forest.renderer.numpy, None
+        try:
+            without_numpy = renderer._create_surface_from_2d_array(self.forest.terrain.normalized_points, 1)
+        finally:
+            forest.renderer.numpy = numpy
+
+        self.assertEqual(pygame.image.tostring(with_numpy, "RGB"), pygame.image.tostring(without_numpy, "RGB"))
+
+    def assertMatchesCircles(self, renderer, colours):
+        renderer.render(self.forest)
+        expected = renderer._get_background(self.forest).copy()
+        zoom = renderer.camera.zoom
+        left, top = math.floor(renderer.camera.x * zoom), math.floor(renderer.camera.y * zoom)
+        for tree in self.forest.trees:
+            centre = (math.floor(tree.x * zoom) - left, math.floor(tree.y * zoom) - top)
+            pygame.draw.circle(expected, colours[tree.species.name], centre, round(tree.size * zoom), 0)
+
+        self.assertEqual(pygame.image.tostring(expected, "RGB"), pygame.image.tostring(renderer.surface, "RGB"))
+
+    def test_sprites_match_circles(self):
+        import forest.renderer
+        birch = TreeSpecies("birch", 0.2, 7, 3, 0.8, 79, 2, 0.008)
+        for x in range(0, 200, 20):
+            self.forest.add_tree(Tree(birch, x, x * 0.7))
+        for tree in self.trees[::3]:
+            tree.size = 7.5
+
+        for use_numpy in (True, False):
+            renderer = Renderer(200, 150)
+            renderer.camera.zoom_at(1.37, 40.3, 20.6)
+            numpy = forest.renderer.numpy
+            if not use_numpy:
+                forest.renderer.numpy = None
+            try:
+                self.assertMatchesCircles(renderer, {"oak": (0, 255, 0), "birch": (255, 0, 0)})
+            finally:
+                forest.renderer.numpy = numpy
+
+            self.assertEqual(((0, 255, 0), (255, 0, 0)), renderer.atlas[0])
+
+    def test_trees_partly_off_the_screen(self):
+        # Trees to the left of and above the camera are at negative pixels on the screen
+        for x in range(0, 200, 9):
+            self.forest.add_tree(Tree(self.species, x + 0.3, 3.6))
+            self.forest.add_tree(Tree(self.species, 2.7, x * 0.7 + 0.6))
+
+        renderer = Renderer(200, 150)
+        renderer.camera.zoom_at(1.5, 0, 0)
+        renderer.camera.pan(6.5, 5.25)
+        self.assertMatchesCircles(renderer, {"oak": (0, 255, 0)})
+
+    def test_colour_table(self):
+        renderer = Renderer(200, 150, colours={"oak": (10, 20, 30)})
+
+        self.assertMatchesCircles(renderer, {"oak": (10, 20, 30)})
+
+    def test_trees_too_big_for_atlas(self):
+        from forest.renderer import MAX_SPRITE_RADIUS
+        renderer = Renderer(200, 150)
+        renderer.camera.zoom_at(2 * MAX_SPRITE_RADIUS / self.species.max_size, 100, 75)
+
+        self.assertMatchesCircles(renderer, {"oak": (0, 255, 0)})
+        self.assertIsNone(renderer.atlas)
+
+    def test_tiles_kept_while_panning(self):
+        renderer = Renderer(200, 150)
+        renderer.render(self.forest)
+        tiles = dict(renderer.tiles)
+        renderer.camera.pan(30, 20)
+        renderer.render(self.forest)
+
+        for (tile, surface) in renderer.tiles.items():
+            if tile in tiles:
+                self.assertIs(tiles[tile], surface)
+        self.assertMatchesFullRender(renderer)
+
+    def test_only_changed_tiles_drawn_again(self):
+        from forest.renderer import TILE_SIZE
+        renderer = Renderer(2 * TILE_SIZE, 2 * TILE_SIZE)
+        renderer.render(self.forest)
+        tiles = dict(renderer.tiles)
+        self.trees[5].size = 9
+        renderer.render(self.forest)
+
+        tree = self.trees[5]
+        for (col, row) in tiles:
+            touched = (col * TILE_SIZE - 10 <= tree.x < (col + 1) * TILE_SIZE + 10 and
+                       row * TILE_SIZE - 10 <= tree.y < (row + 1) * TILE_SIZE + 10)
+            self.assertEqual(touched, tiles[(col, row)] is not renderer.tiles[(col, row)])
+        self.assertMatchesFullRender(renderer)
+
+
+if __name__ == '__main__':
+    unittest.main()
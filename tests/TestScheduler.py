@@ -0,0 +1,111 @@
+import random
+import unittest
+from forest import scheduler, terrain
+from forest.forest import Forest, SCALAR_ENGINE, BATCHED_ENGINE
+from forest.simulation import create_base_forest
+from forest.terrain import Terrain
+from forest.tree import Tree
+from forest.treespecies import TreeSpecies
+
+
+def state(forest):
+    store = forest.trees
+
+    return (forest.tick, store.uid.tolist(), store.species_index.tolist(), store.x.tolist(), store.y.tolist(),
+            store.size.tolist(), forest.seed_random.getstate())
+
+
+def create_sparse_forest(engine=SCALAR_ENGINE):
+    """
+        A few slow growing trees which take a long time to meet or mature.
+    """
+    forest = Forest(1, Terrain([[0.0] * 200 for _ in range(200)]), 200, 200, engine=engine)
+    yew = TreeSpecies("yew", 0.013, 8, 1, 0.2, 40, 3, 1.0)
+    r = random.Random(2)
+    for _ in range(20):
+        forest.add_tree(Tree(yew, r.randint(0, 199), r.randint(0, 199)))
+
+    return forest
+
+
+class TestScheduler(unittest.TestCase):
+
+    def assertAdvanceMatchesIterate(self, create, ticks, steps):
+        expected, actual = create(), create()
+        for _ in range(ticks):
+            expected.iterate()
+        for n in steps:
+            actual.advance(n)
+
+        self.assertEqual(state(expected), state(actual))
+
+    def test_base_forest(self):
+        self.assertAdvanceMatchesIterate(lambda: create_base_forest(3, 150, 100), 120, [7, 0, 113])
+
+    @unittest.skipIf(terrain.numpy is None, "numpy not installed")
+    def test_base_forest_batched(self):
+        self.assertAdvanceMatchesIterate(lambda: create_base_forest(3, 150, 100, engine=BATCHED_ENGINE), 120, [120])
+
+    def test_sparse_forest(self):
+        self.assertAdvanceMatchesIterate(create_sparse_forest, 560, [250, 310])
+
+    def test_without_numpy(self):
+        numpy, scheduler.numpy = scheduler.numpy, None
+        try:
+            self.assertAdvanceMatchesIterate(create_sparse_forest, 560, [560])
+        finally:
+            scheduler.numpy = numpy
+
+    def test_skips_quiet_ticks(self):
+        forest = create_sparse_forest()
+        ticks = []
+        iterate = forest.iterate
+        forest.iterate = lambda: (ticks.append(forest.tick + 1), iterate())
+        forest.advance(300)
+
+        self.assertEqual(300, forest.tick)
+        self.assertLess(len(ticks), 100)
+
+    def test_trees_which_never_grow(self):
+        def create():
+            forest = Forest(1, Terrain([[0.0] * 40 for _ in range(40)]), 40, 40)
+            rock = TreeSpecies("rock", 0.0, 8, 1, 0.2, 40, 3, 1.0)
+            for x in (10, 20):
+                forest.add_tree(Tree(rock, x, 10))
+            return forest
+
+        self.assertAdvanceMatchesIterate(create, 50, [50])
+
+    def test_forest_changed_between_advances(self):
+        expected, actual = create_sparse_forest(), create_sparse_forest()
+        for forest in (expected, actual):
+            forest.advance(100)
+            forest.iterate()
+            forest.add_tree(Tree(forest.trees.species[0], 100, 100))
+        for _ in range(200):
+            expected.iterate()
+        actual.advance(200)
+
+        self.assertEqual(state(expected), state(actual))
+
+    def test_tree_resized_between_advances(self):
+        def create():
+            forest = Forest(1, Terrain([[0.0] * 200 for _ in range(200)]), 200, 200)
+            yew = TreeSpecies("yew", 0.013, 8, 1, 0.2, 40, 3, 1.0)
+            for x in (50, 62):
+                forest.add_tree(Tree(yew, x, 100))
+            return forest
+
+        expected, actual = create(), create()
+        for forest in (expected, actual):
+            forest.advance(5)
+            next(iter(forest.trees)).size = 7.9
+        for _ in range(20):
+            expected.iterate()
+        actual.advance(20)
+
+        self.assertEqual(state(expected), state(actual))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import json
+import tempfile
+import unittest
+from unittest import mock
+from forest import terrain
+from forest.forest import PARALLEL_ENGINE
+from forest.simulation import simulate, simulate_many
+
+
+class TestSimulation(unittest.TestCase):
+
+    def test_simulate(self):
+        with tempfile.TemporaryDirectory() as directory:
+            result = simulate(3, 100, 80, 20, output_dir=directory)
+
+            with open(result["output"]) as f:
+                forest = json.load(f)
+
+        self.assertEqual(20, result["iterations"])
+        self.assertEqual(20, forest["tick"])
+        self.assertEqual(result["trees"], len(forest["trees"]))
+
+    def test_resume_from_snapshot(self):
+        with tempfile.TemporaryDirectory() as directory:
+            simulate(3, 100, 80, 10, snapshot_dir=directory)
+            resumed = simulate(3, 100, 80, 20, output_dir=directory, snapshot_dir=directory)
+            with open(resumed["output"]) as f:
+                resumed_trees = json.load(f)["trees"]
+
+            expected = simulate(3, 100, 80, 20, output_dir=directory)
+            with open(expected["output"]) as f:
+                expected_trees = json.load(f)["trees"]
+
+        self.assertEqual(expected_trees, resumed_trees)
+
+    def test_simulate_many_matches_simulate(self):
+        expected = {seed: simulate(seed, 100, 80, 20)["trees"] for seed in [1, 2, 3]}
+        actual = {r["seed"]: r["trees"] for r in simulate_many([1, 2, 3], 100, 80, 20, processes=2)}
+
+        self.assertEqual(expected, actual)
+
+    @unittest.skipIf(terrain.numpy is None, "numpy not installed")
+    def test_simulate_many_parallel_engine(self):
+        expected = {seed: simulate(seed, 100, 80, 20, engine=PARALLEL_ENGINE, processes=2)["trees"] for seed in [1, 2]}
+        # The parallel engine would use a pool of its own in each worker on a machine with several CPUs
+        with mock.patch("os.cpu_count", return_value=4):
+            actual = {r["seed"]: r["trees"] for r in simulate_many([1, 2], 100, 80, 20, processes=2,
+                                                                   engine=PARALLEL_ENGINE)}
+
+        self.assertEqual(expected, actual)
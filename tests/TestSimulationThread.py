@@ -0,0 +1,48 @@
+import time
+import unittest
+from forest.simulation import create_base_forest
+from forest.simulationthread import SimulationThread
+
+
+class TestSimulationThread(unittest.TestCase):
+
+    def test_publishes_snapshots(self):
+        forest = create_base_forest(2, 100, 80)
+        simulation = SimulationThread(forest)
+        first = simulation.latest
+        simulation.start()
+
+        deadline = time.perf_counter() + 10
+        while simulation.latest.tick < 20 and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        simulation.stop()
+
+        self.assertEqual(0, first.tick)
+        self.assertEqual(10, len(first.trees))
+        self.assertEqual([1] * 10, [t.size for t in first.trees])
+        self.assertEqual(forest.tick, simulation.latest.tick)
+        self.assertEqual([(t.x, t.y, t.size) for t in forest.trees],
+                         [(t.x, t.y, t.size) for t in simulation.latest.trees])
+
+    def test_pause(self):
+        simulation = SimulationThread(create_base_forest(2, 100, 80))
+        simulation.pause()
+        simulation.start()
+        time.sleep(0.05)
+
+        self.assertEqual(0, simulation.latest.tick)
+        simulation.stop()
+        self.assertFalse(simulation.is_alive())
+
+    def test_error_raised(self):
+        forest = create_base_forest(2, 100, 80)
+        forest.iterate = lambda: 1 / 0
+        simulation = SimulationThread(forest)
+        simulation.start()
+        simulation.join(10)
+
+        self.assertFalse(simulation.is_alive())
+        with self.assertRaises(RuntimeError) as context:
+            simulation.latest
+        self.assertIsInstance(context.exception.__cause__, ZeroDivisionError)
+        self.assertRaises(RuntimeError, simulation.stop)
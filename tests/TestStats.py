@@ -0,0 +1,56 @@
+import io
+import json
+import unittest
+from forest import terrain
+from forest.forest import SCALAR_ENGINE, BATCHED_ENGINE, PARALLEL_ENGINE
+from forest.simulation import create_base_forest
+from forest.stats import IterationStats, PHASES
+
+
+class TestStats(unittest.TestCase):
+
+    def assertStatsConsistent(self, engine):
+        forest = create_base_forest(6, 120, 90, engine=engine)
+        sink = io.StringIO()
+        forest.stats = IterationStats(sink)
+        trees = len(forest.trees)
+        for _ in range(60):
+            forest.iterate()
+
+        stats = forest.stats
+        self.assertEqual(60, stats.ticks)
+        self.assertEqual(len(forest.trees) - trees, stats.totals["trees_added"] - stats.totals["trees_removed"])
+        self.assertEqual(stats.totals["seeds_attempted"] - stats.totals["trees_added"],
+                         stats.totals["seeds_outside"] + stats.totals["seeds_too_steep"] + stats.totals["seeds_too_close"])
+        self.assertGreater(stats.totals["seeds_attempted"], 0)
+        self.assertGreaterEqual(stats.totals["neighbour_candidates"], stats.totals["overlap_tests"])
+        self.assertAlmostEqual(stats.totals["total"], sum(stats.totals[phase] for phase in PHASES))
+
+        lines = [json.loads(line) for line in sink.getvalue().splitlines()]
+        self.assertEqual(list(range(1, 61)), [line["tick"] for line in lines])
+        self.assertEqual(stats.totals["trees_added"], sum(line["trees_added"] for line in lines))
+
+    def test_scalar(self):
+        self.assertStatsConsistent(SCALAR_ENGINE)
+
+    @unittest.skipIf(terrain.numpy is None, "numpy not installed")
+    def test_batched(self):
+        self.assertStatsConsistent(BATCHED_ENGINE)
+
+    @unittest.skipIf(terrain.numpy is None, "numpy not installed")
+    def test_parallel(self):
+        self.assertStatsConsistent(PARALLEL_ENGINE)
+
+    def test_stats_dont_change_forest(self):
+        forest = create_base_forest(6, 120, 90)
+        profiled = create_base_forest(6, 120, 90)
+        profiled.stats = IterationStats()
+        for _ in range(40):
+            forest.iterate()
+            profiled.iterate()
+
+        self.assertEqual([(t.x, t.y, t.size) for t in forest.trees], [(t.x, t.y, t.size) for t in profiled.trees])
+
+
+if __name__ == '__main__':
+    unittest.main()
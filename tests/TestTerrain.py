@@ -0,0 +1,59 @@
+import unittest
+from forest import terrain
+from forest.terrain import TerrainGenerator
+
+
+class TestTerrainGenerator(unittest.TestCase):
+
+    @unittest.skipIf(terrain.numpy is None, "numpy not installed")
+    def test_array_backend_matches_scalar(self):
+        g = TerrainGenerator(5)
+        f = 3.0 / 37
+        block = g._generate_block(0, 0, 37, 23, f)
+
+        for row in range(23):
+            for col in range(37):
+                self.assertEqual(g._generate_point(col * f, row * f), block[row][col])
+
+    @unittest.skipIf(terrain.numpy is None, "numpy not installed")
+    def test_generate_matches_scalar(self):
+        g = TerrainGenerator(3)
+        points = g.generate(20, 30).points
+
+        f = 3.0 / 30
+        for row in range(30):
+            for col in range(20):
+                self.assertEqual(g._generate_point(col * f, row * f), points[row][col])
+
+    @unittest.skipIf(terrain.numpy is None, "numpy not installed")
+    def test_parallel_generate_matches_single_process(self):
+        g = TerrainGenerator(2)
+        expected = g.generate(40, terrain.BATCH_ROWS + 30)
+        t = g.generate(40, terrain.BATCH_ROWS + 30, workers=2)
+
+        self.assertEqual(expected.points.tolist(), t.points.tolist())
+        self.assertEqual(expected.max_slope.tolist(), t.max_slope.tolist())
+
+
+class TestTerrain(unittest.TestCase):
+
+    @unittest.skipIf(terrain.numpy is None, "numpy not installed")
+    def test_array_max_slopes_match_scalar(self):
+        points = TerrainGenerator(7).generate(23, 19).points.tolist()
+        t = terrain.Terrain(points)
+
+        expected = [[0.0 for _ in row] for row in points]
+        scalar = terrain.Terrain.__new__(terrain.Terrain)
+        scalar.points = points
+        scalar.max_slope = expected
+        scalar._calculate_max_slopes()
+
+        self.assertEqual(expected, t.max_slope.tolist())
+
+    def test_max_slope_accessor(self):
+        t = terrain.Terrain([[0.0, 0.5], [0.25, 0.0]])
+
+        self.assertEqual(0.0, t.max_slope[0][0])
+        self.assertEqual(0.5, t.max_slope[0][1])
+        self.assertEqual(0.0, t.max_slope[1][0])
+        self.assertEqual(0.0, t.max_slope[1][1])
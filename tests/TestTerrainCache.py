@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+from forest import terrain
+from forest.terrain import TerrainGenerator
+from forest.terraincache import TerrainCache
+
+
+@unittest.skipIf(terrain.numpy is None, "numpy not installed")
+class TestTerrainCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = TerrainCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assertTerrainEqual(self, expected, actual):
+        self.assertEqual(expected.points.tolist(), actual.points.tolist())
+        self.assertEqual(expected.normalized_points.tolist(), actual.normalized_points.tolist())
+        self.assertEqual(expected.max_slope.tolist(), actual.max_slope.tolist())
+
+    def test_miss_then_hit(self):
+        expected = TerrainGenerator(3).generate(30, 20)
+
+        self.assertIsNone(self.cache.get(3, 30, 20))
+        self.assertTerrainEqual(expected, self.cache.get_or_generate(3, 30, 20))
+        self.assertTerrainEqual(expected, self.cache.get(3, 30, 20))
+        self.assertIsNone(self.cache.get(3, 20, 30))
+
+    def corrupt(self, seed, width, height, offset):
+        with open(self.cache.path(seed, width, height), "r+b") as f:
+            f.seek(offset)
+            f.write(b"\xff" * 8)
+
+    def test_corrupt_entry_regenerated(self):
+        expected = self.cache.get_or_generate(3, 30, 20)
+        self.corrupt(3, 30, 20, os.path.getsize(self.cache.path(3, 30, 20)) // 2)
+
+        self.assertIsNone(self.cache.get(3, 30, 20))
+        self.assertFalse(os.path.exists(self.cache.path(3, 30, 20)))
+        self.assertTerrainEqual(expected, self.cache.get_or_generate(3, 30, 20))
+
+    def test_verify(self):
+        # Far enough between the sampled blocks of a large entry that only checking all of it finds it
+        self.cache.get_or_generate(3, 200, 150)
+        self.corrupt(3, 200, 150, 20000)
+
+        self.assertIsNotNone(self.cache.get(3, 200, 150))
+        self.assertIsNone(TerrainCache(self.directory.name, verify=True).get(3, 200, 150))
+
+    def test_repair(self):
+        self.cache.get_or_generate(3, 30, 20)
+        for seed in (4, 5):
+            self.cache.get_or_generate(seed, 200, 150)
+        self.corrupt(4, 200, 150, 20000)
+
+        self.assertEqual([self.cache.path(4, 200, 150)], self.cache.repair())
+        self.assertEqual(["terrain_3_30x20.bin", "terrain_5_200x150.bin"], sorted(os.listdir(self.directory.name)))
+
+    def test_stale_entry_regenerated(self):
+        self.cache.get_or_generate(3, 30, 20)
+        version = terrain.ALGORITHM_VERSION
+        try:
+            terrain.ALGORITHM_VERSION = version + 1
+            self.assertIsNone(self.cache.get(3, 30, 20))
+        finally:
+            terrain.ALGORITHM_VERSION = version
+
+    def test_truncated_entry(self):
+        self.cache.get_or_generate(3, 30, 20)
+        with open(self.cache.path(3, 30, 20), "r+b") as f:
+            f.truncate(100)
+
+        self.assertIsNone(self.cache.get(3, 30, 20))
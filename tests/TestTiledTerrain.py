@@ -0,0 +1,36 @@
+import unittest
+from forest import terrain
+from forest.terrain import TerrainGenerator
+from forest.tiledterrain import TiledTerrain
+
+
+@unittest.skipIf(terrain.numpy is None, "numpy not installed")
+class TestTiledTerrain(unittest.TestCase):
+
+    def setUp(self):
+        self.generator = TerrainGenerator(4)
+        self.full = self.generator.generate(45, 30)
+
+    def test_tiles_match_full_map(self):
+        for (tx, ty) in [(0, 0), (1, 0), (2, 1), (0, 1)]:
+            tile = self.generator.generate_tile(tx, ty, 16, 45, 30)
+            x, y = tx * 16, ty * 16
+
+            self.assertEqual(self.full.points[y:y + 16, x:x + 16].tolist(), tile.points.tolist())
+            self.assertEqual(self.full.max_slope[y:y + 16, x:x + 16].tolist(), tile.max_slope.tolist())
+
+    def test_tile_outside_map(self):
+        self.assertRaises(ValueError, self.generator.generate_tile, 3, 0, 16, 45, 30)
+
+    def test_tiled_terrain_access(self):
+        t = TiledTerrain(self.generator, 45, 30, tile_size=8, max_tiles=3)
+
+        for y in range(30):
+            for x in range(45):
+                self.assertEqual(self.full.max_slope[y][x], t.max_slope[y][x])
+                self.assertEqual(self.full.normalized_points[y][x], t.normalized_points[y][x])
+
+        self.assertEqual(3, len(t.tiles))
+        self.assertEqual(30, len(t.max_slope))
+        self.assertEqual(45, len(t.max_slope[0]))
+        self.assertRaises(IndexError, lambda: t.points[30][0])
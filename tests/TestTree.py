@@ -7,7 +7,7 @@ from forest.tree import Tree
 class TestTree(unittest.TestCase):
 
     def setUp(self):
-        self.species = TreeSpecies("birch", 0.1, 10, 3, 0.8, 79, 2)
+        self.species = TreeSpecies("birch", 0.1, 10, 3, 0.8, 79, 2, 0.008)
 
     def test_create(self):
         t = Tree(self.species, 100, 200)
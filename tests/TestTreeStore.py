@@ -0,0 +1,77 @@
+import unittest
+from forest.treespecies import TreeSpecies
+from forest.tree import Tree
+from forest.treestore import TreeStore
+
+
+class TestTreeStore(unittest.TestCase):
+
+    def setUp(self):
+        self.species = TreeSpecies("birch", 0.1, 10, 3, 0.8, 79, 2, 0.008)
+        self.store = TreeStore()
+
+    def test_attach(self):
+        t = Tree(self.species, 4, 5)
+        self.store.attach(t)
+
+        self.assertEqual(1, len(self.store))
+        self.assertEqual([t], list(self.store))
+        self.assertEqual(self.species, t.species)
+        self.assertEqual((4, 5, 3), (t.x, t.y, t.size))
+
+        t.grow()
+        self.assertEqual(3.1, self.store.get_tree(t.slot).size)
+        self.assertRaises(ValueError, self.store.attach, t)
+
+    def test_handles_equal(self):
+        t1 = Tree(self.species, 4, 5)
+        t2 = Tree(self.species, 4, 5)
+        self.store.attach(t1)
+        self.store.attach(t2)
+
+        self.assertEqual(t1, self.store.get_tree(t1.slot))
+        self.assertNotEqual(t2, self.store.get_tree(t1.slot))
+        self.assertEqual({t1, t2}, set(self.store))
+
+    def test_detach(self):
+        t1 = Tree(self.species, 4, 5)
+        t2 = Tree(self.species, 6, 7)
+        self.store.attach(t1)
+        self.store.attach(t2)
+        t1.grow()
+
+        self.store.detach(t1)
+
+        self.assertEqual([t2], list(self.store))
+        self.assertNotIn(t1, self.store)
+        self.assertEqual((4, 5, 3.1), (t1.x, t1.y, t1.size))
+        self.assertRaises(ValueError, self.store.detach, t1)
+
+    def test_slot_reuse(self):
+        t1 = Tree(self.species, 4, 5)
+        t2 = Tree(self.species, 6, 7)
+        self.store.attach(t1)
+        slot = t1.slot
+        handle = self.store.get_tree(slot)
+        self.store.detach(t1)
+        self.store.attach(t2)
+
+        self.assertEqual(slot, t2.slot)
+        self.assertNotEqual(t1.uid, t2.uid)
+        self.assertNotIn(handle, self.store)
+        self.assertEqual(1, len(self.store.x))
+
+    def test_version(self):
+        versions = [self.store.version]
+        tree = Tree(self.species, 4, 5)
+        self.store.attach(tree)
+        versions.append(self.store.version)
+        copy = self.store.copy()
+        tree.size = 2
+        versions.append(self.store.version)
+        self.store.detach(tree)
+        versions.append(self.store.version)
+
+        self.assertEqual(len(versions), len(set(versions)))
+        self.assertEqual(versions[1], copy.version)
+        self.assertNotEqual(TreeStore().version, TreeStore().version)
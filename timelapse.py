@@ -0,0 +1,57 @@
+import argparse
+import os
+import sys
+import time
+
+# No window is needed, and nothing but frames can go to stdout when it is piped to an encoder
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from forest.forest import SCALAR_ENGINE, BATCHED_ENGINE, PARALLEL_ENGINE
+from forest.frameexport import FrameExporter, DEFAULT_QUEUE_SIZE
+from forest.simulation import create_base_forest
+
+
+def timelapse(seed, iterations, interval, width, height, frame_width, frame_height, output_dir=None, raw=False,
+              processes=None, queue_size=DEFAULT_QUEUE_SIZE, cache_dir=None, engine=SCALAR_ENGINE):
+    """
+        Grow a forest without a display, drawing the whole of it every interval iterations into
+        PNGs in output_dir and/or as raw frames to stdout.
+    """
+    forest = create_base_forest(seed, width, height, cache_dir, engine)
+    start = time.perf_counter()
+    with FrameExporter(frame_width, frame_height, interval, output_dir, sys.stdout.buffer if raw else None,
+                       processes, queue_size) as exporter:
+        exporter.renderer.camera.zoom_at(min(frame_width / width, frame_height / height), 0, 0)
+        exporter.attach(forest)
+        forest.advance(iterations)
+        exporter.detach(forest)
+
+    print("%d frames of %d iterations in %.2fs, waited %.2fs for frames to be written" %
+          (exporter.frames, iterations, time.perf_counter() - start, exporter.blocked_time), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Export frames of a growing forest for a timelapse')
+    parser.add_argument('--seed', '-s', type=int, required=True)
+    parser.add_argument('--iterations', '-n', type=int, default=1000)
+    parser.add_argument('--interval', '-k', type=int, default=10, help='Iterations between frames')
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=600)
+    parser.add_argument('--frame-width', type=int, help='Width of each frame, defaults to the width of the forest')
+    parser.add_argument('--frame-height', type=int, help='Height of each frame, defaults to the height of the forest')
+    parser.add_argument('--output-dir', '-o', help='Directory to write each frame to as a PNG')
+    parser.add_argument('--raw', action='store_true', help='Write each frame to stdout as raw 24 bit RGB')
+    parser.add_argument('--processes', '-p', type=int, help='Number of PNG encoding processes, defaults to one per CPU')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE, help='Frames which can wait to be written before the simulation waits for them')
+    parser.add_argument('--cache-dir', help='Directory in which generated terrain is cached between runs')
+    parser.add_argument('--engine', choices=[SCALAR_ENGINE, BATCHED_ENGINE, PARALLEL_ENGINE], default=SCALAR_ENGINE)
+    args = parser.parse_args()
+
+    if args.output_dir is None and not args.raw:
+        parser.error("Specify --output-dir and/or --raw")
+
+    sys.exit(timelapse(args.seed, args.iterations, args.interval, args.width, args.height,
+                       args.frame_width or args.width, args.frame_height or args.height, args.output_dir, args.raw,
+                       args.processes, args.queue_size, args.cache_dir, args.engine))